@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Clustering Benchmark
+Compares capacity-balanced clustering with the legacy split-and-requeue clustering
+
+Usage: python benchmarks/bench_clustering.py [--repeat 5]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.instances import DEPOT_LOCATION, INSTANCE_SIZES, generate_packages
+from services.route_optimizer import RouteOptimizer
+
+
+def cluster_spread_km(optimizer: RouteOptimizer, clusters) -> float:
+    """Mean distance from each stop to its cluster centre"""
+    distances = []
+    for cluster in clusters:
+        center_lat = sum(p['latitude'] for p in cluster) / len(cluster)
+        center_lon = sum(p['longitude'] for p in cluster) / len(cluster)
+        distances.extend(
+            optimizer.calculate_distance(center_lat, center_lon, p['latitude'], p['longitude'])
+            for p in cluster
+        )
+    return statistics.mean(distances) if distances else 0.0
+
+
+def route_distance(optimizer: RouteOptimizer, clusters) -> float:
+    """Run the remaining hybrid steps on the given clusters and return the route length"""
+    ordered = [optimizer.optimize_cluster_order(cluster) for cluster in clusters]
+    ordered = optimizer.order_clusters_strategically(ordered, DEPOT_LOCATION)
+    return optimizer.construct_final_route(ordered, DEPOT_LOCATION)['total_distance']
+
+
+def run_method(optimizer: RouteOptimizer, method, packages, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        clusters = method(packages, DEPOT_LOCATION)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    sizes = [len(c) for c in clusters]
+    with contextlib.redirect_stdout(io.StringIO()):
+        distance = route_distance(optimizer, clusters)
+
+    return {
+        'time_ms': statistics.median(timings),
+        'clusters': len(clusters),
+        'size_stdev': statistics.pstdev(sizes),
+        'max_size': max(sizes),
+        'spread_km': cluster_spread_km(optimizer, clusters),
+        'route_km': distance
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='Timing repetitions per instance')
+    args = parser.parse_args()
+
+    optimizer = RouteOptimizer()
+    methods = {
+        'legacy': optimizer.create_geographic_clusters_legacy,
+        'capacitated': optimizer.create_geographic_clusters
+    }
+
+    print(f"{'size':>5} {'method':<12} {'time ms':>9} {'clusters':>9} {'size sd':>8} {'max':>4} {'spread km':>10} {'route km':>9}")
+    for size in INSTANCE_SIZES:
+        packages = generate_packages(size)
+        for name, method in methods.items():
+            r = run_method(optimizer, method, packages, args.repeat)
+            print(f"{size:>5} {name:<12} {r['time_ms']:>9.2f} {r['clusters']:>9} {r['size_stdev']:>8.2f} "
+                  f"{r['max_size']:>4} {r['spread_km']:>10.3f} {r['route_km']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
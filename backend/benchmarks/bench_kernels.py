@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Kernel Benchmark
+Per-kernel speedup of the Numba-compiled kernels over the Python/NumPy fallback
+
+Usage: python benchmarks/bench_kernels.py [--repeat 5]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.instances import DEPOT_LOCATION, INSTANCE_SIZES, generate_packages
+from services import kernels
+
+
+def measure(function, repeat: int) -> float:
+    """Median wall time in milliseconds"""
+    function()  # warm-up (also triggers JIT compilation)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def kernel_cases(size: int):
+    """(name, python callable, numba callable) for one instance size"""
+    locations = [DEPOT_LOCATION] + generate_packages(size)
+    lats = np.array([loc['latitude'] for loc in locations])
+    lons = np.array([loc['longitude'] for loc in locations])
+    matrix = kernels.np_distance_matrix_km(lats, lons)
+    rows = matrix.tolist()
+    order = list(range(len(locations)))
+    order_array = np.array(order, dtype=np.int64)
+    pairs = [(lats[i], lons[i], lats[j], lons[j]) for i in range(len(lats)) for j in range(len(lats))]
+
+    def haversine(fn):
+        return lambda: [fn(*pair) for pair in pairs]
+
+    def route_evaluation(fn, route, dist):
+        return lambda: [fn(route, dist, True) for _ in range(1000)]
+
+    def move_deltas(fn, route, dist):
+        n = len(order)
+        return lambda: [fn(route, dist, i, j, True) for i in range(1, n - 1) for j in range(i + 1, n)]
+
+    cases = [
+        ('haversine (n² calls)', haversine(kernels.py_haversine_km),
+         haversine(kernels.nb_haversine_km) if kernels.NUMBA_AVAILABLE else None),
+        ('distance matrix', lambda: kernels.np_distance_matrix_km(lats, lons),
+         (lambda: kernels.nb_distance_matrix_km(lats, lons)) if kernels.NUMBA_AVAILABLE else None),
+        ('route evaluation x1000', route_evaluation(kernels.py_route_length_km, order, rows),
+         route_evaluation(kernels.nb_route_length_km, order_array, matrix) if kernels.NUMBA_AVAILABLE else None),
+        ('2-opt deltas (all moves)', move_deltas(kernels.py_two_opt_delta, order, rows),
+         move_deltas(kernels.nb_two_opt_delta, order_array, matrix) if kernels.NUMBA_AVAILABLE else None),
+        ('2-opt local search', lambda: kernels.py_two_opt(list(order), rows, True, 50),
+         (lambda: kernels.nb_two_opt(order_array.copy(), matrix, True, 50)) if kernels.NUMBA_AVAILABLE else None),
+    ]
+    return cases
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='Timing repetitions per kernel')
+    args = parser.parse_args()
+
+    print(f"Kernel backend in use: {kernels.KERNEL_BACKEND}")
+    if not kernels.NUMBA_AVAILABLE:
+        print("numba is not installed - only the fallback timings are shown (pip install numba)")
+
+    print(f"{'size':>5} {'kernel':<26} {'python ms':>10} {'numba ms':>10} {'speedup':>8}")
+    for size in INSTANCE_SIZES:
+        for name, python_fn, numba_fn in kernel_cases(size):
+            python_ms = measure(python_fn, args.repeat)
+            if numba_fn is not None:
+                numba_ms = measure(numba_fn, args.repeat)
+                speedup = f"{python_ms / numba_ms:>7.1f}x" if numba_ms > 0 else '     n/a'
+                print(f"{size:>5} {name:<26} {python_ms:>10.3f} {numba_ms:>10.3f} {speedup:>8}")
+            else:
+                print(f"{size:>5} {name:<26} {python_ms:>10.3f} {'-':>10} {'-':>8}")
+
+
+if __name__ == "__main__":
+    main()
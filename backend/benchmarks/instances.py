@@ -0,0 +1,61 @@
+"""
+Benchmark Instances
+Reproducible delivery instances around the real Istanbul addresses
+"""
+
+import json
+import os
+import random
+from typing import List, Dict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEPOT_LOCATION = {
+    'id': 0,
+    'kargo_id': 'DEPOT',
+    'address': 'Kadıköy Kargo Merkezi, Moda Caddesi No:1, Kadıköy, İstanbul',
+    'recipient_name': 'Kargo Merkezi',
+    'delivery_type': 'depot',
+    'latitude': 40.9877,
+    'longitude': 29.0283
+}
+
+INSTANCE_SIZES = [10, 25, 50, 100]
+
+
+def load_seed_addresses() -> List[Dict]:
+    """Real address coordinates used as neighbourhood centres"""
+    with open(os.path.join(BACKEND_DIR, 'istanbul_addresses.json'), 'r', encoding='utf-8') as f:
+        addresses = json.load(f)
+    return [
+        {
+            'latitude': a['koordinatlar']['latitude'],
+            'longitude': a['koordinatlar']['longitude'],
+            'delivery_type': a.get('teslimat_turu', 'standard')
+        }
+        for a in addresses if a.get('koordinatlar')
+    ]
+
+
+def generate_packages(count: int, seed: int = 42) -> List[Dict]:
+    """Generate `count` packages scattered (~1 km) around the seed addresses"""
+    rng = random.Random(seed)
+    seeds = load_seed_addresses()
+    packages = []
+    for i in range(count):
+        base = rng.choice(seeds)
+        delivery_type = rng.choices(['express', 'scheduled', 'standard'], weights=[2, 2, 6])[0]
+        window_start = rng.choice(['09:00', '10:00', '12:00', '14:00'])
+        packages.append({
+            'id': i + 1,
+            'kargo_id': f'BENCH{i + 1:04d}',
+            'address': f'Benchmark address {i + 1}',
+            'recipient_name': f'Alıcı {i + 1}',
+            'delivery_type': delivery_type,
+            'time_window_start': window_start if delivery_type == 'scheduled' else None,
+            'time_window_end': f"{int(window_start[:2]) + 2:02d}:00" if delivery_type == 'scheduled' else None,
+            'latitude': base['latitude'] + rng.gauss(0, 0.01),
+            'longitude': base['longitude'] + rng.gauss(0, 0.01),
+            'weight': rng.choice([1, 1, 2, 3, 5])
+        })
+    return packages
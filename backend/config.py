@@ -43,7 +43,55 @@ class Settings:
     # Route Optimization Settings
     PREFER_GOOGLE_CLOUD = os.getenv("PREFER_GOOGLE_CLOUD", "true").lower() == "true"
     MAX_PACKAGES_FOR_GOOGLE = int(os.getenv("MAX_PACKAGES_FOR_GOOGLE", "100"))
+    GOOGLE_CLOUD_USE_REAL_API = os.getenv("GOOGLE_CLOUD_USE_REAL_API", "false").lower() == "true"
+    FLEET_ROUTING_ENDPOINT = os.getenv("FLEET_ROUTING_ENDPOINT")  # e.g. localhost:50051 for the local stand-in
+    FLEET_ROUTING_TIMEOUT_S = float(os.getenv("FLEET_ROUTING_TIMEOUT_S", "30"))
+    FLEET_ROUTING_MAX_RETRIES = int(os.getenv("FLEET_ROUTING_MAX_RETRIES", "2"))
+    FLEET_ROUTING_RETRY_BASE_S = float(os.getenv("FLEET_ROUTING_RETRY_BASE_S", "0.5"))
+    FLEET_ROUTING_BATCH_CONCURRENCY = int(os.getenv("FLEET_ROUTING_BATCH_CONCURRENCY", "8"))
+    CIRCUIT_BREAKER_FAILURE_RATE = float(os.getenv("CIRCUIT_BREAKER_FAILURE_RATE", "0.5"))
+    CIRCUIT_BREAKER_MIN_CALLS = int(os.getenv("CIRCUIT_BREAKER_MIN_CALLS", "5"))
+    CIRCUIT_BREAKER_WINDOW = int(os.getenv("CIRCUIT_BREAKER_WINDOW", "20"))
+    CIRCUIT_BREAKER_SLOW_CALL_MS = float(os.getenv("CIRCUIT_BREAKER_SLOW_CALL_MS", "10000"))
+    CIRCUIT_BREAKER_OPEN_S = float(os.getenv("CIRCUIT_BREAKER_OPEN_S", "30"))
+    SPLIT_OVERSIZE_PROBLEMS = os.getenv("SPLIT_OVERSIZE_PROBLEMS", "true").lower() == "true"
+    HYBRID_HEDGING = os.getenv("HYBRID_HEDGING", "false").lower() == "true"
+    HYBRID_HEDGE_GRACE_MS = float(os.getenv("HYBRID_HEDGE_GRACE_MS", "250"))
+    BENCHMARK_DB_PATH = os.getenv("BENCHMARK_DB_PATH", "benchmarks.db")
+    SHADOW_ALGORITHM = os.getenv("SHADOW_ALGORITHM", "")  # e.g. greedy_local_search, ortools, google
+    SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0.0"))
+    SHADOW_MAX_WORKERS = int(os.getenv("SHADOW_MAX_WORKERS", "1"))
+    SHADOW_ORTOOLS_TIME_LIMIT_S = float(os.getenv("SHADOW_ORTOOLS_TIME_LIMIT_S", "5"))
+    OPTIMIZER_CAPTURE_ENABLED = os.getenv("OPTIMIZER_CAPTURE_ENABLED", "false").lower() == "true"
+    OPTIMIZER_CAPTURE_DIR = os.getenv("OPTIMIZER_CAPTURE_DIR", "captures")
+    OPTIMIZER_CAPTURE_PRECISION = int(os.getenv("OPTIMIZER_CAPTURE_PRECISION", "3"))  # decimals kept (~100 m)
+    OPTIMIZATION_CACHE_TTL_S = float(os.getenv("OPTIMIZATION_CACHE_TTL_S", "900"))
+    OPTIMIZATION_CACHE_MAX_ENTRIES = int(os.getenv("OPTIMIZATION_CACHE_MAX_ENTRIES", "512"))
+    OPTIMIZATION_CACHE_DIR = os.getenv("OPTIMIZATION_CACHE_DIR", "")  # empty = memory only
+    RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "500"))
+    BATCH_PLANNING_TIME = os.getenv("BATCH_PLANNING_TIME", "")  # "HH:MM" daily run for the next day; empty = off
+    BATCH_PLANNING_WORKERS = int(os.getenv("BATCH_PLANNING_WORKERS", str(os.cpu_count() or 2)))
+    ROUTE_SNAPSHOT_KEEP_VERSIONS = int(os.getenv("ROUTE_SNAPSHOT_KEEP_VERSIONS", "5"))  # Per courier per route date
+    ROUTE_SNAPSHOT_RETENTION_INTERVAL_S = float(os.getenv("ROUTE_SNAPSHOT_RETENTION_INTERVAL_S", "0"))  # Opt-in; 0 = off
+    ROUTE_SNAPSHOT_ZSTD_LEVEL = int(os.getenv("ROUTE_SNAPSHOT_ZSTD_LEVEL", "3"))
+    ROUTE_SNAPSHOT_ZLIB_LEVEL = int(os.getenv("ROUTE_SNAPSHOT_ZLIB_LEVEL", "6"))
+    OPTIMIZER_MAX_CONCURRENT_SOLVES = int(os.getenv("OPTIMIZER_MAX_CONCURRENT_SOLVES", str(os.cpu_count() or 2)))
+    OPTIMIZER_QUEUE_SIZE = int(os.getenv("OPTIMIZER_QUEUE_SIZE", "50"))
+    OPTIMIZER_MAX_QUEUED_PER_COURIER = int(os.getenv("OPTIMIZER_MAX_QUEUED_PER_COURIER", "2"))
+    OPTIMIZER_MAX_QUEUE_WAIT_S = float(os.getenv("OPTIMIZER_MAX_QUEUE_WAIT_S", "60"))  # Reject (429) beyond this expected wait
+    OPTIMIZER_DISCONNECT_POLL_S = float(os.getenv("OPTIMIZER_DISCONNECT_POLL_S", "0.5"))  # Client disconnect check while solving
+    PRECOMPUTE_ENABLED = os.getenv("PRECOMPUTE_ENABLED", "true").lower() == "true"
+    PRECOMPUTE_DEBOUNCE_S = float(os.getenv("PRECOMPUTE_DEBOUNCE_S", "3"))  # Quiet time after the last scan
+    PRECOMPUTE_MAX_WORKERS = int(os.getenv("PRECOMPUTE_MAX_WORKERS", "1"))
+    PRECOMPUTE_WAIT_S = float(os.getenv("PRECOMPUTE_WAIT_S", "60"))  # /api/routes/ waits this long for an in-flight precompute
+    EVENT_HEARTBEAT_S = float(os.getenv("EVENT_HEARTBEAT_S", "25"))
+    EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "100"))  # Per open channel; oldest dropped when full
+    EVENT_REPLAY_BUFFER = int(os.getenv("EVENT_REPLAY_BUFFER", "100"))  # Recent events kept per courier for reconnects
     ENABLE_ALGORITHM_COMPARISON = os.getenv("ENABLE_ALGORITHM_COMPARISON", "false").lower() == "true"
+    OPTIMALITY_GAP_THRESHOLD = float(os.getenv("OPTIMALITY_GAP_THRESHOLD", "0.02"))  # Stop search below 2% gap
+    LOWER_BOUND_ITERATIONS = int(os.getenv("LOWER_BOUND_ITERATIONS", "50"))
+    CLUSTER_MAX_STOPS = int(os.getenv("CLUSTER_MAX_STOPS", "4"))
+    CLUSTER_MAX_WEIGHT = float(os.getenv("CLUSTER_MAX_WEIGHT", "0"))  # 0 = no weight limit
     
     # Weather Service (Optional)
     WEATHER_API_KEY = os.getenv("WEATHER_API_KEY", "demo_key")
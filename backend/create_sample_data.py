@@ -17,6 +17,7 @@ from database import SessionLocal, engine
 from models.courier import Courier
 from models.package import Package, DeliveryType, PackageStatus
 from models.delivery_route import DeliveryRoute
+from models.route_stop import bulk_insert_route_stops
 
 def create_sample_data():
     db = SessionLocal()
@@ -99,7 +100,7 @@ def create_sample_data():
         db.commit()
         print(f"✅ Created {len(packages_data)} sample packages")
         
-        # Create a sample optimized route
+        # Create a sample optimized route (stops go to route_stops, the JSON keeps the rest)
         route_data = {
             "stops": [
                 {
@@ -129,6 +130,7 @@ def create_sample_data():
             "estimated_duration": 180
         }
         
+        sample_stops = route_data.pop("stops")
         sample_route = DeliveryRoute(
             courier_id=sample_courier.id,
             route_data=json.dumps(route_data),
@@ -137,6 +139,8 @@ def create_sample_data():
             route_date=datetime.now()
         )
         db.add(sample_route)
+        db.flush()
+        bulk_insert_route_stops(db, sample_route.id, sample_stops, start_sequence=1)  # No depot stop
         db.commit()
         
         print("✅ Created sample optimized route")
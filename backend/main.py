@@ -1,20 +1,34 @@
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.security import HTTPBearer
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from sqlalchemy.orm import Session
 import uvicorn
 import os
+import asyncio
 from dotenv import load_dotenv
 
 from database import engine, SessionLocal, Base, get_db
-from routers import auth, packages, routes, chatbot
-from models import courier, package, delivery_route
+from routers import auth, packages, routes, chatbot, events
+from models import courier, package, delivery_route, route_stop
+from models.route_stop import backfill_route_stops
+from schema_upgrade import upgrade_schema
+from config import settings
+from services.route_planner import run_scheduled_planning
+from services.route_snapshot import run_snapshot_retention
 
 # Load environment variables
 load_dotenv()
 
-# Create database tables
+# Create database tables, then add columns introduced after a table was first created
 Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
+
+# Routes stored before route_stops existed keep their stops in the route JSON
+with SessionLocal() as _db:
+    _backfilled = backfill_route_stops(_db)
+    if _backfilled:
+        print(f"🧱 Backfilled route_stops for {_backfilled} legacy routes")
 
 app = FastAPI(
     title="Courier Delivery Management API",
@@ -29,8 +43,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+# Response compression: brotli when the client accepts it, gzip otherwise
+try:
+    from brotli_asgi import BrotliMiddleware
+    app.add_middleware(BrotliMiddleware, minimum_size=settings.RESPONSE_COMPRESSION_MIN_BYTES, gzip_fallback=True)
+except ImportError:
+    app.add_middleware(GZipMiddleware, minimum_size=settings.RESPONSE_COMPRESSION_MIN_BYTES)
+
 # Security
 security = HTTPBearer()
 
@@ -39,6 +61,19 @@ app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(packages.router, prefix="/api/packages", tags=["Packages"])
 app.include_router(routes.router, prefix="/api/routes", tags=["Routes"])
 app.include_router(chatbot.router, prefix="/api/chatbot", tags=["AI Chatbot"])
+app.include_router(events.router, prefix="/api/events", tags=["Events"])
+
+@app.on_event("startup")
+async def start_scheduled_planning():
+    # Nightly next-day route pre-planning (BATCH_PLANNING_TIME)
+    if settings.BATCH_PLANNING_TIME:
+        asyncio.create_task(run_scheduled_planning())
+
+@app.on_event("startup")
+async def start_snapshot_retention():
+    # Opt-in: keep only the last ROUTE_SNAPSHOT_KEEP_VERSIONS routes per courier per day
+    if settings.ROUTE_SNAPSHOT_RETENTION_INTERVAL_S > 0:
+        asyncio.create_task(run_snapshot_retention())
 
 @app.get("/")
 async def root():
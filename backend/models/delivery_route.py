@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Text, Index, LargeBinary
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from database import Base
@@ -10,14 +10,28 @@ class DeliveryRoute(Base):
     courier_id = Column(Integer, ForeignKey("couriers.id"), nullable=False)
     
     # Route details
-    route_data = Column(Text)  # JSON string containing optimized route
+    route_data = Column(Text)  # Legacy uncompressed JSON (read via services.route_snapshot.load_route_data)
+    route_data_compressed = Column(LargeBinary)  # zstd/zlib-compressed route JSON
     total_distance = Column(Float)  # Total distance in kilometers
     estimated_duration = Column(Integer)  # Estimated duration in minutes
     
+    # Versioning (ETags and route diffs)
+    fingerprint = Column(String(32), index=True)  # Hash of stop order, positions and ETAs
+    package_set_version = Column(String(32))  # Version of the package set the route was built from
+    
     # Timestamps
     created_at = Column(DateTime, server_default=func.now())
     route_date = Column(DateTime, nullable=False)
     
+    # History pages are read newest first per courier; the PostgreSQL INCLUDE
+    # columns make the summary projection an index-only scan
+    __table_args__ = (
+        Index(
+            "ix_delivery_routes_courier_created", "courier_id", "created_at", "id",
+            postgresql_include=["total_distance", "estimated_duration", "route_date"]
+        ),
+    )
+    
     # Relationships
     courier = relationship("Courier", back_populates="routes")
 
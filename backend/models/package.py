@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, Enum, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, DateTime, Float, Enum, ForeignKey
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from database import Base
@@ -39,6 +39,7 @@ class Package(Base):
     delivery_type = Column(Enum(DeliveryType), nullable=False)
     time_window_start = Column(String)  # Format: "HH:MM"
     time_window_end = Column(String)    # Format: "HH:MM"
+    delivery_date = Column(Date, index=True)  # NULL = deliver on any day
     
     # Coordinates for route optimization
     latitude = Column(Float)
@@ -0,0 +1,94 @@
+import json
+
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index, insert, exists
+from sqlalchemy.orm import relationship
+from database import Base
+
+class DeliveryRouteStop(Base):
+    __tablename__ = "route_stops"
+
+    id = Column(Integer, primary_key=True)
+    route_id = Column(Integer, ForeignKey("delivery_routes.id", ondelete="CASCADE"), nullable=False)
+    sequence = Column(Integer, nullable=False)  # 0 = depot
+    package_id = Column(Integer, ForeignKey("packages.id", ondelete="SET NULL"), nullable=True)  # NULL for the depot
+
+    # Stop details (denormalized so a route reads back without joining packages)
+    kargo_id = Column(String)
+    address = Column(String)
+    recipient_name = Column(String)
+    delivery_type = Column(String)
+    time_window_start = Column(String)
+    time_window_end = Column(String)
+    latitude = Column(Float)
+    longitude = Column(Float)
+
+    # Timing
+    eta = Column(String)  # Format: "HH:MM"
+    leg_distance_km = Column(Float)  # From the previous stop
+    leg_duration_min = Column(Float)
+
+    __table_args__ = (
+        Index("ix_route_stops_route_sequence", "route_id", "sequence", unique=True),
+        Index("ix_route_stops_package_id", "package_id"),
+    )
+
+    # Relationships
+    route = relationship("DeliveryRoute", back_populates="stops")
+
+
+def bulk_insert_route_stops(db, route_id: int, stops, start_sequence: int = 0):
+    """Insert all stops of a route with a single executemany INSERT (start_sequence=1 when there is no depot stop)"""
+    rows = [
+        {
+            'route_id': route_id,
+            'sequence': sequence,
+            'package_id': stop.get('id') or None,
+            'kargo_id': stop.get('kargo_id'),
+            'address': stop.get('address'),
+            'recipient_name': stop.get('recipient_name'),
+            'delivery_type': stop.get('delivery_type'),
+            'time_window_start': stop.get('time_window_start'),
+            'time_window_end': stop.get('time_window_end'),
+            'latitude': stop.get('latitude'),
+            'longitude': stop.get('longitude'),
+            'eta': stop.get('estimated_arrival') or stop.get('arrival_time'),
+            'leg_distance_km': stop.get('distance_from_previous'),
+            'leg_duration_min': stop.get('duration_from_previous')
+        }
+        for sequence, stop in enumerate(stops, start=start_sequence)
+    ]
+    if rows:
+        db.execute(insert(DeliveryRouteStop), rows)
+
+
+def backfill_route_stops(db) -> int:
+    """
+    Copy the stops of routes stored before route_stops existed (still inside
+    their route JSON) into route_stops; returns how many routes were filled.
+    Routes that already have stop rows are left alone, so this is idempotent.
+    """
+    legacy = db.query(DeliveryRoute.id, DeliveryRoute.route_data).filter(
+        DeliveryRoute.route_data.isnot(None),
+        ~exists().where(DeliveryRouteStop.route_id == DeliveryRoute.id)
+    ).all()
+    filled = 0
+    for route_id, route_data in legacy:
+        try:
+            stops = json.loads(route_data).get('stops') or []
+        except (ValueError, AttributeError):
+            continue
+        if not stops:
+            continue
+        has_depot = stops[0].get('delivery_type') == 'depot'
+        bulk_insert_route_stops(db, route_id, stops, start_sequence=0 if has_depot else 1)
+        filled += 1
+    db.commit()
+    return filled
+
+
+# Add relationship to DeliveryRoute model
+from models.delivery_route import DeliveryRoute
+DeliveryRoute.stops = relationship(
+    "DeliveryRouteStop", back_populates="route",
+    order_by=DeliveryRouteStop.sequence, cascade="all, delete-orphan", passive_deletes=True
+)
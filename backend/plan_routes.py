@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Batch Route Pre-Planning
+Precomputes and stores routes for every courier with packages due on a date,
+so the morning /api/routes/ calls are served from storage
+
+Usage:
+    python plan_routes.py                       # tomorrow, all couriers
+    python plan_routes.py --date 2025-01-15 --workers 8
+    python plan_routes.py --courier 3 --courier 7 --output plan.json
+"""
+
+import argparse
+import json
+import sys
+from datetime import date, timedelta
+
+from database import Base, engine
+from models import courier, package, delivery_route, route_stop
+from services.route_planner import plan_routes_for_date, DEFAULT_DEPOT
+from schema_upgrade import upgrade_schema
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--date', type=date.fromisoformat, default=date.today() + timedelta(days=1),
+                        help='Route date (default: tomorrow)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: BATCH_PLANNING_WORKERS)')
+    parser.add_argument('--courier', type=int, action='append', dest='courier_ids', help='Only plan these couriers')
+    parser.add_argument('--depot-lat', type=float, default=DEFAULT_DEPOT['latitude'])
+    parser.add_argument('--depot-lng', type=float, default=DEFAULT_DEPOT['longitude'])
+    parser.add_argument('--depot-address', default=DEFAULT_DEPOT['address'])
+    parser.add_argument('--output', help='Write per-courier results as JSON')
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
+    depot = {'latitude': args.depot_lat, 'longitude': args.depot_lng, 'address': args.depot_address}
+    report = plan_routes_for_date(args.date, workers=args.workers, courier_ids=args.courier_ids, depot=depot)
+
+    for result in report['results']:
+        if result['status'] == 'planned':
+            print(f"   courier {result['courier_id']:>5}: route {result['route_id']} "
+                  f"({result['stops']} stops, {result['algorithm']}, {result['seconds']}s)")
+        elif result['status'] == 'failed':
+            print(f"   courier {result['courier_id']:>5}: ❌ {result['error']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report written to {args.output}")
+
+    sys.exit(1 if report['summary']['failed'] else 0)
+
+
+if __name__ == "__main__":
+    main()
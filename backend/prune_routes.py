@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Route Snapshot Retention
+Deletes all but the newest route versions per courier per route date
+(the server does this periodically only when ROUTE_SNAPSHOT_RETENTION_INTERVAL_S
+is set > 0; retention is off by default)
+
+Usage:
+    python prune_routes.py                  # keep ROUTE_SNAPSHOT_KEEP_VERSIONS
+    python prune_routes.py --keep 3 --courier 7
+"""
+
+import argparse
+
+from database import Base, engine, SessionLocal
+from models import courier, package, delivery_route, route_stop
+from services.route_snapshot import prune_route_snapshots
+from schema_upgrade import upgrade_schema
+from config import settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--keep', type=int, default=settings.ROUTE_SNAPSHOT_KEEP_VERSIONS,
+                        help='Versions kept per courier per day (default: ROUTE_SNAPSHOT_KEEP_VERSIONS)')
+    parser.add_argument('--courier', type=int, default=None, help='Only prune this courier')
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
+    db = SessionLocal()
+    try:
+        deleted = prune_route_snapshots(db, keep=args.keep, courier_id=args.courier)
+    finally:
+        db.close()
+    print(f"🧹 Deleted {deleted} old route versions (kept {args.keep} per courier per day)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Replay Captured Optimization Requests
+Re-runs an algorithm over a captured corpus (OPTIMIZER_CAPTURE_ENABLED=true)
+in parallel and reports latency and route-length deltas against production
+
+Usage:
+    python replay_captures.py captures/ --algorithm greedy_local_search --workers 4
+    python replay_captures.py captures/captures-20250101.jsonl.gz --algorithm ortools --time-limit 2 --output report.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from services.kernels import haversine_km
+from services.request_capture import read_captures
+
+ALGORITHMS = ('greedy', 'greedy_local_search', 'ortools', 'google')
+
+_optimizer = None
+
+
+def path_length_km(depot, packages, order):
+    """Depot-to-last-stop length of a visiting order (same metric for every algorithm)"""
+    total = 0.0
+    lat, lon = depot['latitude'], depot['longitude']
+    for index in order:
+        package = packages[index]
+        total += haversine_km(lat, lon, package['latitude'], package['longitude'])
+        lat, lon = package['latitude'], package['longitude']
+    return total
+
+
+def window_violations(packages, order, arrivals):
+    """Stops arriving outside their delivery window"""
+    violations = 0
+    for index, arrival in zip(order, arrivals):
+        start = packages[index].get('time_window_start')
+        end = packages[index].get('time_window_end')
+        if arrival and ((start and arrival < start) or (end and arrival > end)):
+            violations += 1
+    return violations
+
+
+def _init_worker(algorithm):
+    """Create one quiet optimizer per worker process"""
+    global _optimizer
+    if algorithm == 'google':
+        from services.google_cloud_optimizer import GoogleCloudRouteOptimizer
+        _optimizer = GoogleCloudRouteOptimizer(verbose=False)
+    else:
+        from services.route_optimizer import RouteOptimizer
+        _optimizer = RouteOptimizer(verbose=False)
+
+
+def replay_record(args):
+    """Run one captured request; returns the measurements for the report"""
+    record, algorithm, time_limit_s = args
+    depot = record['depot']
+    packages = [
+        {**package, 'id': index + 1, 'kargo_id': f"P{index + 1}", 'address': '', 'recipient_name': ''}
+        for index, package in enumerate(record['packages'])
+    ]
+
+    started = time.perf_counter()
+    try:
+        if algorithm == 'google':
+            result = _optimizer.optimize_route(packages, depot)
+            stops = [stop['package'] for stop in result['optimized_stops']]
+            arrivals = [stop.get('arrival_time') for stop in result['optimized_stops']]
+        else:
+            result = _optimizer.optimize_route(packages, depot, strategy=algorithm, time_limit_s=time_limit_s)
+            stops = [stop for stop in result['stops'] if stop.get('kargo_id') != 'DEPOT']
+            arrivals = [stop.get('estimated_arrival') for stop in stops]
+    except Exception as e:
+        return {'status': 'failed', 'error': str(e), 'package_count': len(packages)}
+    latency_ms = (time.perf_counter() - started) * 1000
+
+    order = [stop['id'] - 1 for stop in stops]
+    production = record['output']
+    production_km = path_length_km(depot, record['packages'], production['order'])
+    replay_km = path_length_km(depot, record['packages'], order)
+    return {
+        'status': 'success',
+        'package_count': len(packages),
+        'captured_at': record.get('captured_at'),
+        'production_algorithm': production.get('algorithm'),
+        'production_latency_ms': production.get('latency_ms'),
+        'production_km': round(production_km, 3),
+        'replay_latency_ms': round(latency_ms, 1),
+        'replay_km': round(replay_km, 3),
+        'delta_km': round(replay_km - production_km, 3),
+        'delta_percent': round((replay_km - production_km) / production_km * 100, 2) if production_km else 0.0,
+        'replay_violations': window_violations(record['packages'], order, arrivals)
+    }
+
+
+def summarize(results):
+    """Aggregate latency and quality deltas"""
+    succeeded = [r for r in results if r['status'] == 'success']
+    if not succeeded:
+        return {'records': len(results), 'failed': len(results)}
+
+    replay_latency = sorted(r['replay_latency_ms'] for r in succeeded)
+    production_latency = sorted(r['production_latency_ms'] for r in succeeded if r['production_latency_ms'] is not None)
+
+    def percentile(values, q):
+        return values[min(len(values) - 1, int(round(q * (len(values) - 1))))] if values else None
+
+    return {
+        'records': len(results),
+        'failed': len(results) - len(succeeded),
+        'replay_p50_ms': percentile(replay_latency, 0.5),
+        'replay_p95_ms': percentile(replay_latency, 0.95),
+        'production_p50_ms': percentile(production_latency, 0.5),
+        'production_p95_ms': percentile(production_latency, 0.95),
+        'mean_delta_percent': round(statistics.mean(r['delta_percent'] for r in succeeded), 2),
+        'better': sum(1 for r in succeeded if r['delta_km'] < -1e-3),
+        'worse': sum(1 for r in succeeded if r['delta_km'] > 1e-3),
+        'violations': sum(r['replay_violations'] for r in succeeded)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+', help='Capture files (.jsonl.gz) or directories')
+    parser.add_argument('--algorithm', choices=ALGORITHMS, default='greedy_local_search')
+    parser.add_argument('--time-limit', type=float, default=None, help='OR-Tools time limit per request (s)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Parallel worker processes')
+    parser.add_argument('--limit', type=int, default=None, help='Replay at most this many records')
+    parser.add_argument('--output', help='Write per-record results and summary as JSON')
+    args = parser.parse_args()
+
+    records = []
+    for record in read_captures(args.paths):
+        records.append(record)
+        if args.limit and len(records) >= args.limit:
+            break
+    if not records:
+        print("❌ No captured requests found")
+        sys.exit(1)
+
+    print(f"🔁 Replaying {len(records)} requests with {args.algorithm} on {args.workers} workers...")
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(args.algorithm,)) as pool:
+        results = list(pool.map(replay_record, [(r, args.algorithm, args.time_limit) for r in records], chunksize=4))
+
+    summary = summarize(results)
+    print(f"{'size':>5} {'prod alg':<20} {'prod km':>9} {'replay km':>10} {'delta %':>8} {'prod ms':>9} {'replay ms':>10}")
+    for r in results:
+        if r['status'] != 'success':
+            print(f"{r['package_count']:>5} ❌ {r['error']}")
+            continue
+        production_ms = f"{r['production_latency_ms']:.1f}" if r['production_latency_ms'] is not None else '-'
+        print(f"{r['package_count']:>5} {str(r['production_algorithm']):<20} {r['production_km']:>9.2f} "
+              f"{r['replay_km']:>10.2f} {r['delta_percent']:>8.2f} {production_ms:>9} {r['replay_latency_ms']:>10.1f}")
+    print("\n📊 Summary")
+    for key, value in summary.items():
+        print(f"   {key}: {value}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'algorithm': args.algorithm, 'summary': summary, 'results': results}, f, indent=2)
+        print(f"💾 Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,7 @@ from jose import JWTError, jwt
 
 from database import get_db
 from models.courier import Courier
+from services.route_precompute import route_precomputer
 from schemas.courier import CourierCreate, CourierLogin, CourierResponse, CourierUpdate, ChangePasswordRequest, Token, TokenData
 
 router = APIRouter()
@@ -113,6 +114,8 @@ async def login_courier(courier: CourierLogin, db: Session = Depends(get_db)):
         )
     
     print(f"✅ Login successful for: {courier.email}")
+    # The first route view follows a login; start planning it now
+    route_precomputer.schedule(db_user.id, delay_s=0)
     # Create access token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
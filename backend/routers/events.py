@@ -0,0 +1,124 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, WebSocket, status
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from typing import Optional
+import asyncio
+import json
+
+from database import SessionLocal
+from models.courier import Courier
+from routers.auth import get_current_user, verify_token
+from services.event_broker import event_broker
+from config import settings
+
+router = APIRouter()
+optional_security = HTTPBearer(auto_error=False)
+
+def _courier_from_token(token: Optional[str]) -> Optional[Courier]:
+    """Resolve the courier of an access token (browsers cannot set headers on WebSocket/EventSource)"""
+    if not token:
+        return None
+    try:
+        token_data = verify_token(token, ValueError("invalid token"))
+    except ValueError:
+        return None
+    db = SessionLocal()
+    try:
+        return db.query(Courier).filter(Courier.email == token_data.email).first()
+    finally:
+        db.close()
+
+@router.websocket("/ws")
+async def courier_events_websocket(
+    websocket: WebSocket,
+    token: Optional[str] = None,
+    last_event_id: Optional[int] = None
+):
+    """
+    Push channel for the courier's route and package events
+
+    Connect with ?token=<access token>; pass the id of the last event seen as
+    last_event_id when reconnecting to receive what was missed.
+    """
+    courier = _courier_from_token(token)
+    if courier is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    subscription = event_broker.subscribe(courier.id, last_event_id)
+    print(f"🔌 Event channel opened for courier {courier.id} (WebSocket)")
+
+    async def push_events():
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=settings.EVENT_HEARTBEAT_S)
+            except asyncio.TimeoutError:
+                event = {'type': 'ping'}
+            await websocket.send_json(event)
+
+    async def wait_for_disconnect():
+        # Client messages are ignored; reading them is how a close is noticed promptly
+        while (await websocket.receive())['type'] != 'websocket.disconnect':
+            pass
+
+    tasks = [asyncio.create_task(push_events()), asyncio.create_task(wait_for_disconnect())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.exception()  # A failed send just means the client is gone
+    finally:
+        for task in tasks:
+            task.cancel()
+        event_broker.unsubscribe(subscription)
+        print(f"🔌 Event channel closed for courier {courier.id} (WebSocket)")
+
+@router.get("/stream")
+async def courier_events_stream(
+    request: Request,
+    token: Optional[str] = None,
+    last_event_id: Optional[int] = None,
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+):
+    """
+    Server-Sent Events variant of the push channel
+
+    Authenticate with the Authorization header or ?token=. EventSource sends
+    Last-Event-ID on reconnect automatically.
+    """
+    courier = _courier_from_token(credentials.credentials if credentials else token)
+    if courier is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    if last_event_id is None and last_event_id_header and last_event_id_header.isdigit():
+        last_event_id = int(last_event_id_header)
+    subscription = event_broker.subscribe(courier.id, last_event_id)
+
+    async def event_stream():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=settings.EVENT_HEARTBEAT_S)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+        finally:
+            event_broker.unsubscribe(subscription)
+
+    # Content-Encoding: identity keeps the compression middleware from buffering the stream
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "Content-Encoding": "identity", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/status")
+async def get_event_channel_status(current_user: Courier = Depends(get_current_user)):
+    """Connected couriers, open channels and events published by this process (authenticated)"""
+    return event_broker.status()
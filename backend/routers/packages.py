@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import json
@@ -8,12 +9,21 @@ from geopy.geocoders import Nominatim
 from database import get_db
 from models.package import Package, DeliveryType, PackageStatus, DeliveryFailureReason
 from models.courier import Courier
+from models.route_stop import DeliveryRouteStop
 from schemas.package import PackageCreate, PackageUpdate, PackageResponse, QRCodeData, DeliveryUpdateRequest
 from routers.auth import get_current_user
+from services.route_versioning import strong_etag, etag_matches
+from services.route_precompute import route_precomputer
+from services.admission_control import LANE_REPAIR
+from services.event_broker import event_broker, PACKAGE_CREATED, PACKAGE_UPDATED, PACKAGE_STATUS, PACKAGE_DELETED
 
 router = APIRouter()
 geolocator = Nominatim(user_agent="courier_app")
 
+def _publish_package_event(event_type: str, package: Package):
+    """Push a package change to the courier's open event channels"""
+    event_broker.publish(package.courier_id, event_type, jsonable_encoder(PackageResponse.model_validate(package)))
+
 @router.get("/delivery-stats", response_model=dict)
 async def get_delivery_stats(
     current_user: Courier = Depends(get_current_user),
@@ -91,6 +101,7 @@ async def create_package(
         delivery_type=package.delivery_type,
         time_window_start=package.time_window_start,
         time_window_end=package.time_window_end,
+        delivery_date=package.delivery_date,
         latitude=package.latitude,
         longitude=package.longitude
     )
@@ -98,6 +109,8 @@ async def create_package(
     db.add(db_package)
     db.commit()
     db.refresh(db_package)
+    _publish_package_event(PACKAGE_CREATED, db_package)
+    route_precomputer.schedule(current_user.id)  # Debounced: a scan burst becomes one solve
     
     return db_package
 
@@ -160,6 +173,8 @@ async def create_package_from_qr(
     db.add(db_package)
     db.commit()
     db.refresh(db_package)
+    _publish_package_event(PACKAGE_CREATED, db_package)
+    route_precomputer.schedule(current_user.id)  # Debounced: a scan burst becomes one solve
     
     print(f"✅ QR Scan: Package {qr_data.kargo_id} created successfully with coordinates: {lat}, {lon}")
     return db_package
@@ -168,12 +183,22 @@ async def create_package_from_qr(
 
 @router.get("/", response_model=List[PackageResponse])
 async def get_packages(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     current_user: Courier = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get all packages for current courier"""
-    packages = db.query(Package).filter(Package.courier_id == current_user.id).all()
-    return packages
+    """Get all packages for current courier (304 when If-None-Match matches the ETag)"""
+    packages = db.query(Package).filter(Package.courier_id == current_user.id).order_by(Package.id).all()
+    
+    # Strong ETag over the exact serialized list, so any visible edit changes it
+    package_list = jsonable_encoder([PackageResponse.model_validate(package) for package in packages])
+    etag = strong_etag("packages", package_list)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    
+    response.headers["ETag"] = etag
+    return package_list
 
 @router.get("/{package_id}", response_model=PackageResponse)
 async def get_package(
@@ -228,6 +253,8 @@ async def update_package(
     
     db.commit()
     db.refresh(package)
+    _publish_package_event(PACKAGE_UPDATED, package)
+    route_precomputer.schedule(current_user.id, lane=LANE_REPAIR)  # Re-solve the changed route ahead of full plans
     
     return package
 
@@ -267,6 +294,8 @@ async def update_delivery_status(
     
     db.commit()
     db.refresh(package)
+    _publish_package_event(PACKAGE_STATUS, package)
+    route_precomputer.schedule(current_user.id, lane=LANE_REPAIR)  # Re-solve the changed route ahead of full plans
     
     return package
 
@@ -288,8 +317,16 @@ async def delete_package(
             detail="Package not found"
         )
     
+    event_data = {"id": package.id, "kargo_id": package.kargo_id}
+    # Stored routes keep their stop details; only the link to the package goes
+    # (tables created before the SET NULL foreign key do not do this themselves)
+    db.query(DeliveryRouteStop).filter(
+        DeliveryRouteStop.package_id == package.id
+    ).update({DeliveryRouteStop.package_id: None}, synchronize_session=False)
     db.delete(package)
     db.commit()
+    event_broker.publish(current_user.id, PACKAGE_DELETED, event_data)
+    route_precomputer.schedule(current_user.id, lane=LANE_REPAIR)  # Re-solve the changed route ahead of full plans
     
     return {"message": "Package deleted successfully"}
 
@@ -332,6 +369,8 @@ async def create_package_from_qr(
         db.add(db_package)
         db.commit()
         db.refresh(db_package)
+        _publish_package_event(PACKAGE_CREATED, db_package)
+        route_precomputer.schedule(current_user.id)  # Debounced: a scan burst becomes one solve
         
         return db_package
         
@@ -1,22 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import String, and_, literal, or_
 from sqlalchemy.orm import Session
 from datetime import datetime, date
-from typing import List
-import json
+from typing import List, Optional
+import asyncio
+import base64
+import math
 
 from database import get_db
 from models.package import Package, DeliveryType, PackageStatus
 from models.delivery_route import DeliveryRoute
+from models.route_stop import DeliveryRouteStop
 from models.courier import Courier
-from schemas.route import OptimizedRoute, RouteResponse, RouteStop
+from schemas.route import OptimizedRoute, RouteResponse, RouteStop, RouteProgress, RouteDiff, StopMove
 from routers.auth import get_current_user
 from services.google_cloud_optimizer import GoogleCloudRouteOptimizer
+from services.hybrid_optimizer import HybridRouteOptimizer
+from services.circuit_breaker import fleet_routing_breaker
+from services.benchmark_store import benchmark_store
+from services.route_encoding import compact_route
+from services.route_versioning import package_set_version, strong_etag, etag_matches, diff_stops
+from services.route_snapshot import load_route_data
+from services.route_precompute import route_precomputer
+from services.admission_control import optimizer_admission, AdmissionRejected, LANE_INTERACTIVE
+from services.cancellation import optimization_registry, OptimizationCancelled
+from services.route_planner import (
+    route_packages, packages_to_optimizer_input, build_route, save_route, latest_route_for_version
+)
 import os
 
+from config import settings
+
 router = APIRouter()
 
 # Initialize Google Cloud optimizer (singleton pattern)
 _google_optimizer = None
+_hybrid_optimizer = None
 
 def get_google_optimizer():
     """Get singleton Google Cloud optimizer instance"""
@@ -27,6 +48,15 @@ def get_google_optimizer():
         _google_optimizer = GoogleCloudRouteOptimizer(google_project_id, google_credentials_path)
     return _google_optimizer
 
+def get_hybrid_optimizer():
+    """Get singleton hybrid (Google Cloud + custom) optimizer instance"""
+    global _hybrid_optimizer
+    if _hybrid_optimizer is None:
+        google_project_id = os.getenv('GOOGLE_CLOUD_PROJECT_ID')
+        google_credentials_path = os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
+        _hybrid_optimizer = HybridRouteOptimizer(google_project_id, google_credentials_path)
+    return _hybrid_optimizer
+
 @router.get("/test")
 async def test_route():
     """Test endpoint to verify routes are working"""
@@ -37,39 +67,81 @@ async def test_route():
 async def get_optimizer_status():
     """Get status of Google Cloud route optimizer"""
     optimizer = get_google_optimizer()
+    circuit = fleet_routing_breaker.status()
     
     if optimizer.is_available():
         return {
             "message": "Google Cloud Route Optimizer Status",
-            "status": "Ready",
+            "status": "Ready" if circuit["state"] == "closed" else f"Degraded (circuit {circuit['state']})",
             "api_available": True,
-            "project_id": optimizer.project_id or "Not configured"
+            "project_id": optimizer.project_id or "Not configured",
+            "circuit_breaker": circuit,
+            "precompute": route_precomputer.status(),
+            "admission": optimizer_admission.status(),
+            "cancellation": optimization_registry.status()
         }
     else:
         return {
             "message": "Google Cloud Route Optimizer Status", 
             "status": "Not configured",
             "api_available": False,
-            "error": "Google Cloud credentials or project ID not set"
+            "error": "Google Cloud credentials or project ID not set",
+            "circuit_breaker": circuit,
+            "precompute": route_precomputer.status(),
+            "admission": optimizer_admission.status(),
+            "cancellation": optimization_registry.status()
         }
 
+@router.get("/optimizer/benchmarks")
+async def get_optimizer_benchmarks(source: Optional[str] = None):
+    """Win rates and latency percentiles of compared algorithms by instance size"""
+    return {
+        "message": "Route optimizer benchmark summary",
+        "size_buckets": await asyncio.to_thread(benchmark_store.summary, source)
+    }
+
 @router.get("/", response_model=OptimizedRoute)
 async def get_optimized_route(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    response: Response,
     route_date: date = None,
     start_lat: float = 41.0082,
     start_lng: float = 28.9784,
     start_address: str = "Istanbul Merkez Depo",
+    latency_budget_ms: Optional[int] = None,
+    hedge: Optional[bool] = None,
+    refresh: bool = False,
+    response_format: str = Query("full", alias="format", pattern="^(full|compact)$"),
+    fields: str = Query("full", pattern="^(full|minimal)$"),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
     """
-    Get optimized delivery route using Google Cloud Route Optimization API
+    Get optimized delivery route (Google Cloud Route Optimization with custom fallback)
     
     Args:
         route_date: Date for route optimization (default: today)
         start_lat: Starting location latitude (default: Istanbul depot)
         start_lng: Starting location longitude (default: Istanbul depot)
         start_address: Starting location address (default: Istanbul Merkez Depo)
+        latency_budget_ms: Optional latency SLA; the optimizer picks the best strategy that fits it
+        hedge: Race the local solver against the remote call (default: HYBRID_HEDGING setting)
+        refresh: Re-optimize even if a stored route is current for the package set
+        format: "compact" returns an encoded polyline with columnar, dictionary-coded stops
+        fields: "minimal" drops addresses, names, time windows and metadata (compact format only)
+    
+    Only packages due on route_date (or undated) are planned. While the
+    package set is unchanged, the latest stored route for the date and depot
+    (e.g. one pre-planned by plan_routes.py) is served instead of
+    re-optimizing. Responses carry a strong ETag built from the route
+    fingerprint and the package-set version; a matching If-None-Match
+    answers 304.
+    
+    A solve is abandoned as soon as the client disconnects or POST /cancel
+    is called: the queued slot is given up, remote calls are cancelled and
+    the local solver stops at its next search step (499, nothing stored).
     """
     print(f"=== GOOGLE CLOUD ROUTE OPTIMIZATION REQUEST ===")
     print(f"User: {current_user.full_name} (ID: {current_user.id}, Email: {current_user.email})")
@@ -79,52 +151,60 @@ async def get_optimized_route(
     if not route_date:
         route_date = date.today()
     
-    # Get packages for the current user (courier) only
-    packages = db.query(Package).filter(
-        Package.courier_id == current_user.id,
-        Package.status.in_([PackageStatus.PENDING, PackageStatus.IN_TRANSIT])
-    ).all()
+    # Get packages for the current user (courier) due on route_date
+    packages = route_packages(db, current_user.id, route_date)
     
     print(f"Found {len(packages)} packages for user {current_user.full_name}")
     for pkg in packages:
         print(f"Package {pkg.kargo_id}: {pkg.address} (status: {pkg.status})")
     
+    package_version = package_set_version(packages)
+    
     if not packages:
         # Return empty route instead of throwing error
-        return OptimizedRoute(
+        etag = strong_etag("empty", package_version, response_format, fields)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        return _route_payload(OptimizedRoute(
             total_distance=0.0,
             estimated_duration=0,
             stops=[],
             status="empty",
             message="No packages found for route optimization",
             route_date=datetime.combine(route_date, datetime.min.time())
-        )
+        ), response_format, fields, response, etag)
     
-    # Initialize Google Cloud route optimizer
-    print("Initializing Google Cloud route optimizer...")
-    optimizer = get_google_optimizer()
+    # A stored route (pre-planned or from an earlier call) is current while the package set is unchanged
+    stored_route = None if refresh else latest_route_for_version(
+        db, current_user.id, route_date, package_version, start_lat, start_lng
+    )
+    if stored_route:
+        etag = _route_etag(stored_route.fingerprint, package_version, response_format, fields)
+        if etag_matches(if_none_match, etag):
+            print(f"Route {stored_route.id} unchanged (ETag match), returning 304")
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        print(f"Serving stored route {stored_route.id}")
+        return _route_payload(_stored_route_response(stored_route), response_format, fields, response, etag)
+    
+    # A speculative precompute may already be solving this route; cheaper to wait for it
+    if not refresh and await route_precomputer.wait(current_user.id, settings.PRECOMPUTE_WAIT_S):
+        stored_route = latest_route_for_version(db, current_user.id, route_date, package_version, start_lat, start_lng)
+        if stored_route:
+            print(f"Serving precomputed route {stored_route.id}")
+            return _route_payload(
+                _stored_route_response(stored_route), response_format, fields, response,
+                _route_etag(stored_route.fingerprint, package_version, response_format, fields)
+            )
+    else:
+        route_precomputer.cancel(current_user.id)  # Solving it here instead
+    
+    # Initialize hybrid route optimizer (Google Cloud with custom fallback)
+    print("Initializing hybrid route optimizer...")
+    optimizer = get_hybrid_optimizer()
     
     # Convert packages to optimizer format
-    package_data = []
     print("Converting packages to optimizer format...")
-    for pkg in packages:
-        if pkg.latitude and pkg.longitude:
-            package_data.append({
-                'id': pkg.id,
-                'kargo_id': pkg.kargo_id,
-                'address': pkg.address,
-                'recipient_name': pkg.recipient_name,
-                'delivery_type': pkg.delivery_type.value,
-                'time_window_start': pkg.time_window_start,
-                'time_window_end': pkg.time_window_end,
-                'latitude': pkg.latitude,
-                'longitude': pkg.longitude,
-                'weight': getattr(pkg, 'weight', 1),
-                'volume': getattr(pkg, 'volume', 1),
-                'scheduled_hour': getattr(pkg, 'scheduled_hour', 10)
-            })
-        else:
-            print(f"Warning: Package {pkg.kargo_id} has no coordinates")
+    package_data = packages_to_optimizer_input(packages)
     
     print(f"Converted {len(package_data)} packages with valid coordinates")
     
@@ -134,15 +214,31 @@ async def get_optimized_route(
             detail="No packages with valid coordinates found"
         )
     
-    # Check if Google Cloud API is available
-    if not optimizer.is_available():
+    # Wait for a solve slot (bounded concurrency, fair queue, 429 when saturated)
+    cancel_token = optimization_registry.register(current_user.id)
+    try:
+        ticket = await _until_cancelled(
+            optimizer_admission.acquire(current_user.id, lane=LANE_INTERACTIVE), request, cancel_token,
+            on_abandoned=optimizer_admission.release
+        )
+    except OptimizationCancelled as e:
+        optimization_registry.unregister(current_user.id, cancel_token)
+        raise _cancelled_error(e)
+    except AdmissionRejected as e:
+        optimization_registry.unregister(current_user.id, cancel_token)
+        print(f"⏳ {e}")
         raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Google Cloud Route Optimization API is not available. Please configure your credentials."
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail={
+                "message": "Route optimizer is busy, please retry",
+                "reason": e.reason,
+                "expected_wait_s": round(e.retry_after_s, 1)
+            },
+            headers={"Retry-After": str(math.ceil(e.retry_after_s))}
         )
     
     # Optimize route
-    print("Starting Google Cloud route optimization...")
+    print("Starting route optimization...")
     try:
         depot_location = {
             'latitude': start_lat,
@@ -150,12 +246,18 @@ async def get_optimized_route(
             'address': start_address
         }
         
-        optimized_result = optimizer.optimize_route(
+        optimized_result = await _until_cancelled(optimizer.optimize_route_async(
             packages=package_data,
-            depot_location=depot_location
-        )
+            depot_location=depot_location,
+            latency_budget_ms=latency_budget_ms,
+            hedge=hedge,
+            cancel_token=cancel_token
+        ), request, cancel_token)
         
-        print(f"✅ Google Cloud optimization completed")
+        # Shadow evaluation runs after the response has been sent
+        background_tasks.add_task(optimizer.maybe_shadow, package_data, depot_location, optimized_result)
+        
+        print(f"✅ Route optimization completed ({optimized_result.get('hybrid_metadata', {}).get('algorithm_used')})")
         print(f"   Distance: {optimized_result['total_distance_km']:.1f}km")
         duration_min = optimized_result['total_duration_minutes']
         if duration_min < 60:
@@ -169,79 +271,29 @@ async def get_optimized_route(
                 duration_str = f"{hours} saat {remaining_min}dk"
         print(f"   Duration: {duration_str}")
         
-        # Convert Google Cloud result to response format
-        optimized_route = {
-            'stops': [],
-            'total_distance': optimized_result['total_distance_km'],
-            'total_distance_km': optimized_result['total_distance_km'],
-            'estimated_duration': int(optimized_result['total_duration_minutes']),
-            'optimization_metadata': optimized_result.get('optimization_metadata', {}),
-            'algorithm_details': {
-                'name': 'Google Cloud Route Optimization',
-                'version': 'Production API',
-                'features': ['Real-time traffic', 'Vehicle constraints', 'Time windows']
-            },
-            'api_used': 'google_cloud'
+        # Convert Google Cloud result to response format (depot as starting point)
+        optimized_route = build_route(optimized_result, depot_location)
+        optimized_route['optimization_metadata']['admission'] = {
+            'lane': ticket.lane,
+            'queued_ms': round(ticket.queued_ms, 1)
         }
         
-        # Convert optimized stops to response format
-        # Add depot as starting point
-        depot_stop = {
-            'id': 0,
-            'kargo_id': 'DEPOT-START',
-            'address': depot_location['address'],
-            'recipient_name': 'Başlangıç Noktası',
-            'delivery_type': 'depot',
-            'latitude': depot_location['latitude'],
-            'longitude': depot_location['longitude'],
-            'sequence': 0,
-            'arrival_time': '08:00',
-            'departure_time': '08:00',
-            'distance_from_previous': 0,
-            'duration_from_previous': 0
-        }
-        optimized_route['stops'].append(depot_stop)
-        
-        for stop_data in optimized_result['optimized_stops']:
-            # Google Cloud format
-            package = stop_data['package']
-            stop = {
-                'id': package['id'],
-                'kargo_id': package['kargo_id'],
-                'address': package['address'],
-                'recipient_name': package['recipient_name'],
-                'delivery_type': package['delivery_type'],
-                'latitude': package['latitude'],
-                'longitude': package['longitude'],
-                'sequence': stop_data.get('sequence', len(optimized_route['stops'])),
-                'arrival_time': stop_data.get('arrival_time'),
-                'departure_time': stop_data.get('departure_time'),
-                'distance_from_previous': stop_data.get('distance_from_previous_m', 0) / 1000,
-                'duration_from_previous': stop_data.get('duration_from_previous_s', 0) / 60
-            }
-            optimized_route['stops'].append(stop)
-        
-        print("Google Cloud route optimization completed successfully")
+        print("Route optimization completed successfully")
+    except OptimizationCancelled as e:
+        raise _cancelled_error(e)
     except Exception as e:
-        print(f"Google Cloud route optimization failed: {str(e)}")
+        print(f"Route optimization failed: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Google Cloud route optimization failed: {str(e)}"
+            detail=f"Route optimization failed: {str(e)}"
         )
+    finally:
+        optimization_registry.unregister(current_user.id, cancel_token)
+        optimizer_admission.release(ticket)
     
     # Save route to database
     print("Saving route to database...")
-    route_data_json = json.dumps(optimized_route)
-    db_route = DeliveryRoute(
-        courier_id=1,  # Default courier ID for testing
-        route_data=route_data_json,
-        total_distance=optimized_route['total_distance'],
-        estimated_duration=optimized_route['estimated_duration'],
-        route_date=datetime.combine(route_date, datetime.min.time())
-    )
-    
-    db.add(db_route)
-    db.commit()
+    db_route = save_route(db, current_user.id, route_date, optimized_route, package_version)
     print("Route saved to database")
     
     # Convert to response format
@@ -263,26 +315,189 @@ async def get_optimized_route(
         stops.append(route_stop)
     
     print(f"Returning optimized route with {len(stops)} stops")
-    return OptimizedRoute(
+    return _route_payload(OptimizedRoute(
         stops=stops,
         total_distance=optimized_route['total_distance'],
         estimated_duration=int(optimized_route['estimated_duration']),
-        route_date=datetime.combine(route_date, datetime.min.time())
+        route_date=datetime.combine(route_date, datetime.min.time()),
+        optimization_metadata=optimized_route['optimization_metadata'],
+        route_id=db_route.id,
+        version=db_route.fingerprint
+    ), response_format, fields, response,
+        _route_etag(db_route.fingerprint, package_version, response_format, fields))
+
+@router.post("/cancel")
+async def cancel_route_optimization(current_user = Depends(get_current_user)):
+    """Cancel the current user's in-flight route optimizations and pending precompute"""
+    cancelled = optimization_registry.cancel(current_user.id, 'cancelled by client')
+    precompute_dropped = route_precomputer.cancel(current_user.id)
+    return {
+        "cancelled": cancelled,
+        "precompute_dropped": precompute_dropped
+    }
+
+async def _until_cancelled(awaitable, request: Request, cancel_token, on_abandoned=None):
+    """
+    Await `awaitable`, polling for a client disconnect or an explicit cancel
+    
+    On either, the token is cancelled (stopping a local solve in its worker
+    thread), the awaited task is cancelled (releasing a queued admission
+    slot or an in-flight remote call) and OptimizationCancelled is raised.
+    A result that arrived anyway (e.g. while the disconnect check yielded)
+    is handed to `on_abandoned` so resources it holds are given back.
+    """
+    task = asyncio.ensure_future(awaitable)
+    delivered = False
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=settings.OPTIMIZER_DISCONNECT_POLL_S)
+            if done:
+                delivered = True
+                return task.result()
+            if not cancel_token.cancelled and await request.is_disconnected():
+                cancel_token.cancel('client disconnected')
+            if cancel_token.cancelled:
+                cancel_token.raise_if_cancelled()
+    finally:
+        if not delivered:
+            # Cancelled, disconnected, or the handler itself was cancelled (e.g. server shutdown)
+            cancel_token.cancel('request cancelled')
+            task.cancel()
+            if on_abandoned and task.done() and not task.cancelled() and task.exception() is None:
+                on_abandoned(task.result())
+
+def _cancelled_error(error: OptimizationCancelled) -> HTTPException:
+    print(f"🛑 Route optimization cancelled: {error}")
+    # 499 Client Closed Request; usually nobody is left to read it
+    return HTTPException(status_code=499, detail=f"Route optimization cancelled: {error}")
+
+def _route_etag(fingerprint: str, package_version: str, response_format: str, fields: str) -> str:
+    """Strong ETag of a route representation (format and field set are part of the entity)"""
+    return strong_etag(fingerprint, package_version, response_format, fields)
+
+def _stored_route_response(route: DeliveryRoute) -> OptimizedRoute:
+    """OptimizedRoute from a stored route and its route_stops rows"""
+    route_data = load_route_data(route)
+    return OptimizedRoute(
+        stops=[_route_stop_response(stop) for stop in route.stops],
+        total_distance=route.total_distance,
+        estimated_duration=route.estimated_duration,
+        route_date=route.route_date,
+        optimization_metadata={
+            **route_data.get('optimization_metadata', {}),
+            'stored_route': True,
+            'planned_at': route.created_at.isoformat() if route.created_at else None
+        },
+        route_id=route.id,
+        version=route.fingerprint
     )
 
+def _route_payload(route, response_format: str, fields: str, response: Response, etag: str):
+    """Return the route as-is, or its compact encoding (bypasses the response model)"""
+    if response_format != "compact":
+        response.headers["ETag"] = etag
+        return route
+    return JSONResponse(compact_route(jsonable_encoder(route), minimal=fields == "minimal"), headers={"ETag": etag})
+
+def _route_stop_response(stop: DeliveryRouteStop) -> RouteStop:
+    """RouteStop schema from a stored route_stops row"""
+    return RouteStop(
+        package_id=stop.package_id or 0,
+        kargo_id=stop.kargo_id or '',
+        address=stop.address or '',
+        recipient_name=stop.recipient_name or '',
+        delivery_type=stop.delivery_type or 'standard',
+        time_window_start=stop.time_window_start,
+        time_window_end=stop.time_window_end,
+        latitude=stop.latitude,
+        longitude=stop.longitude,
+        estimated_arrival=stop.eta,
+        sequence=stop.sequence + 1
+    )
+
+def _encode_history_cursor(created_at: datetime, route_id: int) -> str:
+    """Opaque keyset cursor pointing just past the given route (self-contained: the row may be pruned)"""
+    return base64.urlsafe_b64encode(f"route:{created_at}|{route_id}".encode()).decode()
+
+def _decode_history_cursor(cursor: str):
+    """(created_at text as stored, route id) of a history cursor"""
+    try:
+        prefix, position = base64.urlsafe_b64decode(cursor.encode()).decode().split(':', 1)
+        if prefix != 'route':
+            raise ValueError(prefix)
+        created_at, route_id = position.rsplit('|', 1)
+        datetime.fromisoformat(created_at)  # Validate
+        return created_at, int(route_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid history cursor")
+
+def _created_at_bound(db: Session, created_at: str):
+    """
+    created_at value to compare the column against: SQLite keeps timestamps as
+    text (str(datetime) reproduces it), other databases get a real timestamp
+    """
+    if db.get_bind().dialect.name == 'sqlite':
+        return literal(created_at, String)
+    return datetime.fromisoformat(created_at)
+
 @router.get("/history", response_model=List[RouteResponse])
 async def get_route_history(
+    response: Response,
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = None,
+    summary: bool = False,
+    response_format: str = Query("full", alias="format", pattern="^(full|compact)$"),
+    fields: str = Query("full", pattern="^(full|minimal)$"),
     current_user: Courier = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get route history for the courier"""
-    routes = db.query(DeliveryRoute).filter(
-        DeliveryRoute.courier_id == current_user.id
-    ).order_by(DeliveryRoute.created_at.desc()).limit(10).all()
+    """
+    Get route history for the courier, newest first
+    
+    Keyset-paginated: pass the X-Next-Cursor response header back as `cursor`
+    for the next page. `summary=true` returns routes without their stops;
+    `format=compact` (optionally with `fields=minimal`) encodes each route
+    like the optimize endpoint does.
+    """
+    routes_query = db.query(
+        DeliveryRoute.id,
+        DeliveryRoute.courier_id,
+        DeliveryRoute.total_distance,
+        DeliveryRoute.estimated_duration,
+        DeliveryRoute.created_at,
+        DeliveryRoute.route_date,
+        DeliveryRoute.fingerprint
+    ).filter(DeliveryRoute.courier_id == current_user.id)
+    
+    if cursor:
+        # The cursor carries the (created_at, id) position itself, so paging keeps
+        # working when the cursor row was deleted (e.g. by snapshot retention)
+        cursor_text, cursor_id = _decode_history_cursor(cursor)
+        cursor_created_at = _created_at_bound(db, cursor_text)
+        routes_query = routes_query.filter(or_(
+            DeliveryRoute.created_at < cursor_created_at,
+            and_(DeliveryRoute.created_at == cursor_created_at, DeliveryRoute.id < cursor_id)
+        ))
+    
+    routes = routes_query.order_by(
+        DeliveryRoute.created_at.desc(), DeliveryRoute.id.desc()
+    ).limit(limit + 1).all()
+    
+    if len(routes) > limit:
+        routes = routes[:limit]
+        response.headers["X-Next-Cursor"] = _encode_history_cursor(routes[-1].created_at, routes[-1].id)
+    
+    # One indexed query for the stops of every listed route
+    stops_by_route = {route.id: [] for route in routes}
+    if routes and not summary:
+        stop_rows = db.query(DeliveryRouteStop).filter(
+            DeliveryRouteStop.route_id.in_(list(stops_by_route))
+        ).order_by(DeliveryRouteStop.route_id, DeliveryRouteStop.sequence).all()
+        for stop in stop_rows:
+            stops_by_route[stop.route_id].append(_route_stop_response(stop))
     
     response_routes = []
     for route in routes:
-        route_data = json.loads(route.route_data) if route.route_data else {}
         response_routes.append(RouteResponse(
             id=route.id,
             courier_id=route.courier_id,
@@ -290,7 +505,105 @@ async def get_route_history(
             estimated_duration=route.estimated_duration,
             route_date=route.route_date,
             created_at=route.created_at,
-            stops=route_data.get('stops', [])
+            stops=stops_by_route[route.id],
+            version=route.fingerprint
         ))
     
+    if response_format == "compact":
+        compact_routes = []
+        for route in response_routes:
+            route_json = jsonable_encoder(route)
+            compact = compact_route(route_json, minimal=fields == "minimal")
+            compact['created_at'] = route_json['created_at']
+            compact_routes.append(compact)
+        next_cursor = response.headers.get("X-Next-Cursor")
+        return JSONResponse(compact_routes, headers={"X-Next-Cursor": next_cursor} if next_cursor else None)
+    
     return response_routes
+
+@router.get("/progress", response_model=RouteProgress)
+async def get_route_progress(
+    route_id: Optional[int] = None,
+    current_user: Courier = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Progress of the courier's latest (or given) route: completed stops, next stop and its ETA"""
+    route_query = db.query(DeliveryRoute.id).filter(DeliveryRoute.courier_id == current_user.id)
+    if route_id is not None:
+        route_query = route_query.filter(DeliveryRoute.id == route_id)
+    route = route_query.order_by(DeliveryRoute.created_at.desc(), DeliveryRoute.id.desc()).first()
+    if not route:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Route not found")
+    
+    rows = db.query(DeliveryRouteStop, Package.status).outerjoin(
+        Package, Package.id == DeliveryRouteStop.package_id
+    ).filter(
+        DeliveryRouteStop.route_id == route.id,
+        DeliveryRouteStop.package_id.isnot(None)
+    ).order_by(DeliveryRouteStop.sequence).all()
+    
+    finished = {PackageStatus.DELIVERED, PackageStatus.FAILED}
+    remaining = [stop for stop, package_status in rows if package_status not in finished]
+    next_stop = remaining[0] if remaining else None
+    
+    return RouteProgress(
+        route_id=route.id,
+        total_stops=len(rows),
+        completed_stops=len(rows) - len(remaining),
+        remaining_stops=len(remaining),
+        remaining_distance_km=round(sum(stop.leg_distance_km or 0 for stop in remaining), 3),
+        next_stop=_route_stop_response(next_stop) if next_stop else None,
+        next_eta=next_stop.eta if next_stop else None
+    )
+
+@router.get("/diff", response_model=RouteDiff)
+async def get_route_diff(
+    since: str,
+    route_id: Optional[int] = None,
+    current_user: Courier = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Stops added, removed or moved in the courier's latest (or given) route
+    relative to the route version the client holds (`since` = its `version`)
+    """
+    route_query = db.query(DeliveryRoute).filter(DeliveryRoute.courier_id == current_user.id)
+    if route_id is not None:
+        route_query = route_query.filter(DeliveryRoute.id == route_id)
+    route = route_query.order_by(DeliveryRoute.created_at.desc(), DeliveryRoute.id.desc()).first()
+    if not route:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Route not found")
+    
+    diff = RouteDiff(
+        route_id=route.id,
+        since=since,
+        version=route.fingerprint or '',
+        unchanged=route.fingerprint == since,
+        total_distance=route.total_distance,
+        estimated_duration=route.estimated_duration
+    )
+    if diff.unchanged:
+        return diff
+    
+    base_route = db.query(DeliveryRoute.id).filter(
+        DeliveryRoute.courier_id == current_user.id,
+        DeliveryRoute.fingerprint == since
+    ).order_by(DeliveryRoute.id.desc()).first()
+    if not base_route:
+        # Client should refetch the full route
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown route version")
+    
+    stops_by_route = {route.id: [], base_route.id: []}
+    for stop in db.query(DeliveryRouteStop).filter(
+        DeliveryRouteStop.route_id.in_(list(stops_by_route))
+    ).order_by(DeliveryRouteStop.sequence).all():
+        stops_by_route[stop.route_id].append(_route_stop_response(stop))
+    
+    changes = diff_stops(
+        [stop.model_dump() for stop in stops_by_route[base_route.id]],
+        [stop.model_dump() for stop in stops_by_route[route.id]]
+    )
+    diff.added = [RouteStop(**stop) for stop in changes['added']]
+    diff.removed = changes['removed']
+    diff.moved = [StopMove(**move) for move in changes['moved']]
+    return diff
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Schema Upgrade
+Idempotent in-place upgrade of databases created before columns were added
+to existing tables (create_all only creates missing tables, never columns).
+Runs at startup; can also be run by hand.
+
+Usage:
+    python schema_upgrade.py
+"""
+
+from typing import List
+
+from sqlalchemy import inspect, text
+
+from database import Base, engine
+
+# Columns added to tables that already existed in deployed databases, oldest first.
+# Type and indexes come from the model definition.
+ADDED_COLUMNS = [
+    ('delivery_routes', 'fingerprint'),
+    ('delivery_routes', 'package_set_version'),
+    ('packages', 'delivery_date'),
+    ('delivery_routes', 'route_data_compressed'),
+]
+
+
+def upgrade_schema(bind=None) -> List[str]:
+    """Add any missing ADDED_COLUMNS and model indexes; returns the columns added"""
+    bind = bind or engine
+    inspector = inspect(bind)
+    preparer = bind.dialect.identifier_preparer
+    added = []
+    with bind.begin() as connection:
+        for table_name, column_name in ADDED_COLUMNS:
+            if not inspector.has_table(table_name):
+                continue  # create_all builds it with every column
+            if column_name in {column['name'] for column in inspector.get_columns(table_name)}:
+                continue
+            column = Base.metadata.tables[table_name].c[column_name]
+            connection.execute(text(
+                f"ALTER TABLE {preparer.quote(table_name)} ADD COLUMN {preparer.quote(column_name)} "
+                f"{column.type.compile(dialect=bind.dialect)}"
+            ))
+            added.append(f"{table_name}.{column_name}")
+
+    # Indexes of added columns, and indexes added to existing tables later on
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind, checkfirst=True)
+
+    if added:
+        print(f"🧱 Schema upgraded: added {', '.join(added)}")
+    return added
+
+
+if __name__ == "__main__":
+    from models import courier, package, delivery_route, route_stop
+
+    Base.metadata.create_all(bind=engine)
+    upgrade_schema()
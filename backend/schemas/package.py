@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from typing import Optional, List
-from datetime import datetime
+from datetime import date, datetime
 from models.package import DeliveryType, PackageStatus, DeliveryFailureReason
 
 class PackageBase(BaseModel):
@@ -11,6 +11,7 @@ class PackageBase(BaseModel):
     delivery_type: DeliveryType
     time_window_start: Optional[str] = None
     time_window_end: Optional[str] = None
+    delivery_date: Optional[date] = None
 
 class PackageCreate(PackageBase):
     latitude: Optional[float] = None
@@ -24,6 +25,7 @@ class PackageUpdate(BaseModel):
     time_window_start: Optional[str] = None
     time_window_end: Optional[str] = None
     status: Optional[PackageStatus] = None
+    delivery_date: Optional[date] = None
     latitude: Optional[float] = None
     longitude: Optional[float] = None
 
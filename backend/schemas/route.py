@@ -22,15 +22,45 @@ class OptimizedRoute(BaseModel):
     route_date: datetime
     status: Optional[str] = "success"
     message: Optional[str] = None
+    optimization_metadata: Optional[Dict[str, Any]] = None
+    route_id: Optional[int] = None
+    version: Optional[str] = None  # Route fingerprint; pass as `since` to /api/routes/diff
 
 class RouteResponse(BaseModel):
     id: int
     courier_id: int
-    route_data: Dict[str, Any]
     total_distance: float
     estimated_duration: int
     created_at: datetime
     route_date: datetime
+    stops: List[RouteStop] = []
+    version: Optional[str] = None
     
     class Config:
         from_attributes = True
+
+class RouteProgress(BaseModel):
+    route_id: int
+    total_stops: int
+    completed_stops: int
+    remaining_stops: int
+    remaining_distance_km: float
+    next_stop: Optional[RouteStop] = None
+    next_eta: Optional[str] = None
+
+class StopMove(BaseModel):
+    package_id: int
+    from_sequence: int
+    to_sequence: int
+    estimated_arrival: Optional[str] = None
+
+class RouteDiff(BaseModel):
+    route_id: int
+    since: str
+    version: str
+    unchanged: bool
+    added: List[RouteStop] = []
+    removed: List[int] = []  # Package ids
+    moved: List[StopMove] = []
+    total_distance: float
+    estimated_duration: int
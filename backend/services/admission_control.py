@@ -0,0 +1,176 @@
+"""
+Optimizer Admission Control
+Bounds concurrent route solves and queues the rest in priority lanes with
+round-robin fairness between couriers; rejects with an expected wait when
+the queue is saturated
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Priority lanes, served in this order
+LANE_REPAIR = 'repair'            # Small incremental re-solves of an existing route
+LANE_INTERACTIVE = 'interactive'  # A courier waiting on /api/routes/
+LANE_BACKGROUND = 'background'    # Speculative precompute and other full daily plans
+LANES = (LANE_REPAIR, LANE_INTERACTIVE, LANE_BACKGROUND)
+
+
+class AdmissionRejected(Exception):
+    """The solve was not admitted; retry after `retry_after_s`"""
+
+    def __init__(self, reason: str, retry_after_s: float):
+        super().__init__(f"Optimizer saturated ({reason}), expected wait {retry_after_s:.1f}s")
+        self.reason = reason
+        self.retry_after_s = retry_after_s
+
+
+class AdmissionTicket:
+    """A granted solve slot"""
+
+    def __init__(self, courier_id: int, lane: str, queued_ms: float):
+        self.courier_id = courier_id
+        self.lane = lane
+        self.queued_ms = queued_ms
+        self.started = time.perf_counter()
+
+
+class AdmissionController:
+    """
+    Admission in front of the optimizer (single event loop, no locking)
+
+    Each lane keeps an ordered map of courier -> waiting requests. Dispatch
+    takes the highest-priority non-empty lane and the courier at the front
+    of it, then moves that courier to the back, so one courier's burst
+    cannot starve the others.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, max_queued_per_courier: int, max_wait_s: float):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_queued_per_courier = max_queued_per_courier
+        self.max_wait_s = max_wait_s
+        self.active = 0
+        self.queued = 0
+        self._lanes: Dict[str, OrderedDict] = {lane: OrderedDict() for lane in LANES}
+        self._avg_solve_s = 2.0  # EWMA of slot hold time, seeds the wait estimate
+        self.stats = {'admitted': 0, 'waited': 0, 'rejected': 0, 'timed_out': 0}
+
+    def expected_wait_s(self, lane: str = LANE_INTERACTIVE) -> float:
+        """Estimated queueing delay for a new request in `lane`"""
+        if self.active < self.max_concurrent and not self.queued:
+            return 0.0
+        ahead = sum(
+            len(waiters)
+            for name in LANES[:LANES.index(lane) + 1]
+            for waiters in self._lanes[name].values()
+        )
+        return math.ceil((ahead + 1) / self.max_concurrent) * self._avg_solve_s
+
+    async def acquire(self, courier_id: int, lane: str = LANE_INTERACTIVE) -> AdmissionTicket:
+        """Wait for a solve slot; raises AdmissionRejected when saturated"""
+        queued_at = time.perf_counter()
+        if self.active < self.max_concurrent and not self.queued:
+            self.active += 1
+            self.stats['admitted'] += 1
+            return AdmissionTicket(courier_id, lane, 0.0)
+
+        expected = self.expected_wait_s(lane)
+        courier_waiting = len(self._lanes[lane].get(courier_id, ()))
+        if self.queued >= self.max_queue:
+            self._reject('queue_full', expected)
+        if courier_waiting >= self.max_queued_per_courier:
+            self._reject('courier_limit', expected)
+        if expected > self.max_wait_s:
+            self._reject('expected_wait', expected)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._lanes[lane].setdefault(courier_id, deque()).append(waiter)
+        self.queued += 1
+        self.stats['waited'] += 1
+        try:
+            done, _ = await asyncio.wait({waiter}, timeout=self.max_wait_s)
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release_slot()  # Granted just as the caller went away
+            else:
+                self._remove(lane, courier_id, waiter)
+            raise
+        if not done:
+            self._remove(lane, courier_id, waiter)
+            self.stats['timed_out'] += 1
+            self._reject('timeout', self.expected_wait_s(lane))
+
+        self.stats['admitted'] += 1
+        return AdmissionTicket(courier_id, lane, (time.perf_counter() - queued_at) * 1000)
+
+    def release(self, ticket: AdmissionTicket):
+        """Return the slot and hand it to the next waiter"""
+        held_s = time.perf_counter() - ticket.started
+        self._avg_solve_s = 0.8 * self._avg_solve_s + 0.2 * held_s
+        self._release_slot()
+
+    def _release_slot(self):
+        self.active -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        while self.active < self.max_concurrent and self.queued:
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            self.active += 1
+            waiter.set_result(None)
+
+    def _next_waiter(self) -> Optional[asyncio.Future]:
+        for lane in LANES:
+            couriers = self._lanes[lane]
+            while couriers:
+                courier_id, waiters = couriers.popitem(last=False)
+                waiter = waiters.popleft()
+                if waiters:
+                    couriers[courier_id] = waiters  # Back of the line for this courier
+                self.queued -= 1
+                if not waiter.cancelled():
+                    return waiter
+        return None
+
+    def _remove(self, lane: str, courier_id: int, waiter: asyncio.Future):
+        waiters = self._lanes[lane].get(courier_id)
+        if waiters and waiter in waiters:
+            waiters.remove(waiter)
+            self.queued -= 1
+            if not waiters:
+                del self._lanes[lane][courier_id]
+
+    def _reject(self, reason: str, expected: float):
+        self.stats['rejected'] += 1
+        logger.warning(f"⚠️ Optimizer admission rejected ({reason}), expected wait {expected:.1f}s")
+        raise AdmissionRejected(reason, max(expected, 1.0))
+
+    def status(self) -> Dict:
+        return {
+            'max_concurrent': self.max_concurrent,
+            'active': self.active,
+            'queued': self.queued,
+            'queued_by_lane': {lane: sum(len(w) for w in self._lanes[lane].values()) for lane in LANES},
+            'avg_solve_s': round(self._avg_solve_s, 2),
+            'expected_wait_s': round(self.expected_wait_s(), 2),
+            **self.stats
+        }
+
+
+# Global instance
+optimizer_admission = AdmissionController(
+    max_concurrent=settings.OPTIMIZER_MAX_CONCURRENT_SOLVES,
+    max_queue=settings.OPTIMIZER_QUEUE_SIZE,
+    max_queued_per_courier=settings.OPTIMIZER_MAX_QUEUED_PER_COURIER,
+    max_wait_s=settings.OPTIMIZER_MAX_QUEUE_WAIT_S
+)
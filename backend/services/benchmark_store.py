@@ -0,0 +1,175 @@
+"""
+Benchmark Store
+Persists algorithm comparison runs in a local SQLite database and summarizes
+win rates and latency percentiles by instance size
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from collections import defaultdict
+from contextlib import closing
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config import settings
+from .latency_stats import size_bucket
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS benchmark_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    comparison_id TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    source TEXT NOT NULL,
+    package_count INTEGER NOT NULL,
+    size_bucket TEXT NOT NULL,
+    algorithm TEXT NOT NULL,
+    status TEXT NOT NULL,
+    processing_ms REAL,
+    distance_km REAL,
+    duration_minutes REAL,
+    violations INTEGER,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_benchmark_runs_comparison ON benchmark_runs (comparison_id);
+CREATE INDEX IF NOT EXISTS ix_benchmark_runs_bucket ON benchmark_runs (size_bucket, algorithm);
+"""
+
+
+def _percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+class BenchmarkStore:
+    """
+    SQLite-backed store of per-algorithm comparison results
+
+    The database file and schema are created on first use, so importing the
+    module has no side effects on the working directory.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                    with closing(sqlite3.connect(self.path, timeout=10)) as connection:
+                        connection.executescript(SCHEMA)
+                    self._initialized = True
+        return sqlite3.connect(self.path, timeout=10)
+
+    def record_comparison(self, comparison: Dict, source: str = 'comparison') -> str:
+        """
+        Persist one comparison (the structure built by HybridRouteOptimizer)
+
+        Returns:
+            The comparison id shared by its rows
+        """
+        comparison_id = comparison.get('comparison_id') or uuid.uuid4().hex
+        package_count = comparison['package_count']
+        rows = [
+            (
+                comparison_id,
+                comparison.get('timestamp') or str(datetime.now()),
+                source,
+                package_count,
+                size_bucket(package_count),
+                algorithm,
+                run.get('status', 'failed'),
+                # Cached responses say nothing about solver latency
+                None if run.get('cache_hit') or run.get('processing_time_seconds') is None
+                else run['processing_time_seconds'] * 1000,
+                run.get('path_distance_km', run.get('distance_km')),
+                run.get('duration_minutes'),
+                run.get('violations'),
+                run.get('error')
+            )
+            for algorithm, run in comparison['algorithms'].items()
+        ]
+        try:
+            with self._lock, closing(self._connect()) as connection, connection:
+                connection.executemany(
+                    "INSERT INTO benchmark_runs (comparison_id, created_at, source, package_count, size_bucket, "
+                    "algorithm, status, processing_ms, distance_km, duration_minutes, violations, error) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+        except sqlite3.Error as e:
+            logger.error(f"❌ Failed to store benchmark results: {e}")
+        return comparison_id
+
+    def summary(self, source: str = None) -> Dict:
+        """
+        Win rates and latency percentiles per size bucket and algorithm
+
+        An algorithm wins a comparison when it produced the shortest successful
+        route (ties count as wins for every tied algorithm).
+        """
+        query = ("SELECT comparison_id, size_bucket, algorithm, status, processing_ms, distance_km, violations "
+                 "FROM benchmark_runs")
+        params = ()
+        if source:
+            query += " WHERE source = ?"
+            params = (source,)
+        with self._lock, closing(self._connect()) as connection:
+            rows = connection.execute(query, params).fetchall()
+
+        comparisons = defaultdict(list)
+        for row in rows:
+            comparisons[row[0]].append(row)
+
+        stats = defaultdict(lambda: defaultdict(lambda: {
+            'runs': 0, 'successes': 0, 'wins': 0, 'latencies': [], 'distances': [], 'violations': 0
+        }))
+        comparison_counts = defaultdict(int)
+        for runs in comparisons.values():
+            bucket = runs[0][1]
+            comparison_counts[bucket] += 1
+            distances = [run[5] for run in runs if run[3] == 'success' and run[5] is not None]
+            best = min(distances) if distances else None
+            for _, _, algorithm, status, processing_ms, distance_km, violations in runs:
+                entry = stats[bucket][algorithm]
+                entry['runs'] += 1
+                if status != 'success':
+                    continue
+                entry['successes'] += 1
+                if processing_ms is not None:
+                    entry['latencies'].append(processing_ms)
+                if distance_km is not None:
+                    entry['distances'].append(distance_km)
+                    if best is not None and distance_km <= best + 1e-6:
+                        entry['wins'] += 1
+                entry['violations'] += violations or 0
+
+        summary = {}
+        for bucket, algorithms in stats.items():
+            summary[bucket] = {'comparisons': comparison_counts[bucket], 'algorithms': {}}
+            for algorithm, entry in algorithms.items():
+                latencies = sorted(entry['latencies'])
+                summary[bucket]['algorithms'][algorithm] = {
+                    'runs': entry['runs'],
+                    'success_rate': round(entry['successes'] / entry['runs'], 3) if entry['runs'] else 0.0,
+                    'win_rate': round(entry['wins'] / comparison_counts[bucket], 3),
+                    'mean_distance_km': round(sum(entry['distances']) / len(entry['distances']), 3) if entry['distances'] else None,
+                    'p50_ms': round(_percentile(latencies, 0.5), 1) if latencies else None,
+                    'p95_ms': round(_percentile(latencies, 0.95), 1) if latencies else None,
+                    'p99_ms': round(_percentile(latencies, 0.99), 1) if latencies else None,
+                    'violations': entry['violations']
+                }
+        return summary
+
+
+# Global instance
+benchmark_store = BenchmarkStore(settings.BENCHMARK_DB_PATH)
@@ -0,0 +1,93 @@
+"""
+Optimization Cancellation
+Cancellation tokens checked inside the solvers, and a per-courier registry
+so an explicit cancel request can reach the courier's in-flight solves
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class OptimizationCancelled(Exception):
+    """The optimization was cancelled (client disconnected or asked to cancel)"""
+
+
+class CancellationToken:
+    """Thread-safe flag; a child token is also cancelled when its parent is"""
+
+    def __init__(self, parent: Optional['CancellationToken'] = None):
+        self.parent = parent
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+
+    def cancel(self, reason: str = 'cancelled'):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set() or (self.parent is not None and self.parent.cancelled)
+
+    def child(self) -> 'CancellationToken':
+        return CancellationToken(parent=self)
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise OptimizationCancelled(self.reason or (self.parent.reason if self.parent else None) or 'cancelled')
+
+
+class CancellationRegistry:
+    """In-flight optimization tokens per courier"""
+
+    def __init__(self):
+        self._tokens: Dict[int, set] = {}
+        self._lock = threading.Lock()
+        self.cancelled_total = 0
+
+    def register(self, courier_id: int) -> CancellationToken:
+        """Fresh token for one optimization; pair with unregister()"""
+        token = CancellationToken()
+        with self._lock:
+            self._tokens.setdefault(courier_id, set()).add(token)
+        return token
+
+    def unregister(self, courier_id: int, token: CancellationToken):
+        with self._lock:
+            tokens = self._tokens.get(courier_id, set())
+            tokens.discard(token)
+            if not tokens:
+                self._tokens.pop(courier_id, None)
+
+    @contextmanager
+    def track(self, courier_id: int):
+        """Register a fresh token for the duration of one optimization"""
+        token = self.register(courier_id)
+        try:
+            yield token
+        finally:
+            self.unregister(courier_id, token)
+
+    def cancel(self, courier_id: int, reason: str = 'cancelled by client') -> int:
+        """Cancel every in-flight optimization of a courier; returns how many"""
+        with self._lock:
+            tokens = [token for token in self._tokens.get(courier_id, ()) if not token.cancelled]
+        for token in tokens:
+            token.cancel(reason)
+        self.cancelled_total += len(tokens)
+        if tokens:
+            logger.info(f"🛑 Cancelled {len(tokens)} optimization(s) for courier {courier_id}: {reason}")
+        return len(tokens)
+
+    def status(self) -> Dict:
+        with self._lock:
+            in_flight = sum(len(tokens) for tokens in self._tokens.values())
+        return {'in_flight': in_flight, 'cancelled_total': self.cancelled_total}
+
+
+# Global instance
+optimization_registry = CancellationRegistry()
@@ -0,0 +1,166 @@
+"""
+Circuit Breaker
+Tracks rolling error rate and latency of a remote dependency and stops
+calling it while it is unhealthy (closed -> open -> half-open -> closed)
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Count-based rolling-window circuit breaker
+
+    A call counts as failed when it raises or takes longer than slow_call_ms.
+    Once at least min_calls outcomes are in the window and the failure rate
+    reaches failure_rate_threshold, the circuit opens. After open_duration_s it
+    lets half_open_max_calls trial calls through: all succeeding closes it, any
+    failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_rate_threshold: float = 0.5, min_calls: int = 5,
+                 window: int = 20, slow_call_ms: float = 10000, open_duration_s: float = 30,
+                 half_open_max_calls: int = 1):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = min_calls
+        self.slow_call_ms = slow_call_ms
+        self.open_duration_s = open_duration_s
+        self.half_open_max_calls = half_open_max_calls
+
+        self._outcomes = deque(maxlen=window)  # (succeeded, latency_ms)
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+        self._half_open_successes = 0
+        self._last_error: Optional[str] = None
+        self.rejected_calls = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh_state()
+            return self._state
+
+    def available(self) -> bool:
+        """Whether a call would currently be let through (does not take a trial slot)"""
+        with self._lock:
+            self._refresh_state()
+            if self._state == OPEN:
+                return False
+            if self._state == HALF_OPEN:
+                return self._half_open_in_flight < self.half_open_max_calls
+            return True
+
+    def acquire(self) -> bool:
+        """Reserve permission for one call; False (and counted as rejected) when not allowed"""
+        with self._lock:
+            self._refresh_state()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._half_open_in_flight < self.half_open_max_calls:
+                self._half_open_in_flight += 1
+                return True
+            self.rejected_calls += 1
+            return False
+
+    def release(self):
+        """Give back a permission whose call ended without a verdict (e.g. cancelled)"""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+
+    def record_success(self, latency_ms: float):
+        """Record a completed call (slow calls count as failures)"""
+        if latency_ms > self.slow_call_ms:
+            self.record_failure(latency_ms, f"slow call ({latency_ms:.0f}ms)")
+            return
+        with self._lock:
+            self._outcomes.append((True, latency_ms))
+            if self._state == HALF_OPEN:
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+                self._half_open_successes += 1
+                if self._half_open_successes >= self.half_open_max_calls:
+                    self._transition(CLOSED)
+
+    def record_failure(self, latency_ms: float, error: str = None):
+        """Record a failed call"""
+        with self._lock:
+            self._outcomes.append((False, latency_ms))
+            self._last_error = error
+            if self._state == HALF_OPEN:
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+                self._transition(OPEN)
+            elif self._state == CLOSED and self._failure_rate() >= self.failure_rate_threshold \
+                    and len(self._outcomes) >= self.min_calls:
+                self._transition(OPEN)
+
+    def status(self) -> Dict:
+        """State and rolling health metrics"""
+        with self._lock:
+            self._refresh_state()
+            latencies = sorted(latency for _, latency in self._outcomes)
+            retry_in = self._opened_at + self.open_duration_s - time.monotonic() if self._state == OPEN else None
+            return {
+                'name': self.name,
+                'state': self._state,
+                'window_calls': len(self._outcomes),
+                'failure_rate': round(self._failure_rate(), 3),
+                'p50_latency_ms': round(latencies[len(latencies) // 2], 1) if latencies else None,
+                'p99_latency_ms': round(latencies[min(len(latencies) - 1, int(round(0.99 * (len(latencies) - 1))))], 1) if latencies else None,
+                'rejected_calls': self.rejected_calls,
+                'retry_in_s': round(max(0.0, retry_in), 1) if retry_in is not None else None,
+                'last_error': self._last_error
+            }
+
+    def _failure_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for succeeded, _ in self._outcomes if not succeeded) / len(self._outcomes)
+
+    def _refresh_state(self):
+        """Move from open to half-open once the cool-down has elapsed (caller holds the lock)"""
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_duration_s:
+            self._transition(HALF_OPEN)
+
+    def _transition(self, state: str):
+        """Change state (caller holds the lock)"""
+        if state == self._state:
+            return
+        logger.warning(f"🔌 Circuit '{self.name}': {self._state} -> {state}")
+        self._state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        elif state == HALF_OPEN:
+            self._half_open_in_flight = 0
+            self._half_open_successes = 0
+        elif state == CLOSED:
+            self._outcomes.clear()
+
+
+# Global instance guarding the remote Fleet Routing API
+fleet_routing_breaker = CircuitBreaker(
+    'fleet_routing',
+    failure_rate_threshold=settings.CIRCUIT_BREAKER_FAILURE_RATE,
+    min_calls=settings.CIRCUIT_BREAKER_MIN_CALLS,
+    window=settings.CIRCUIT_BREAKER_WINDOW,
+    slow_call_ms=settings.CIRCUIT_BREAKER_SLOW_CALL_MS,
+    open_duration_s=settings.CIRCUIT_BREAKER_OPEN_S
+)
@@ -0,0 +1,150 @@
+"""
+Capacity-Constrained Clustering
+Balanced geographic clustering of delivery stops with per-cluster limits
+on stop count and package weight (vectorized over coordinates)
+"""
+
+import math
+import logging
+from typing import List, Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+KM_PER_DEGREE = 111.32
+
+
+def project_to_km(latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """Equirectangular projection to a local kilometre plane (accurate at city scale)"""
+    reference_lat = math.radians(float(np.mean(latitudes)))
+    x = longitudes * KM_PER_DEGREE * math.cos(reference_lat)
+    y = latitudes * KM_PER_DEGREE
+    return np.column_stack([x, y])
+
+
+def _initial_centroids(points: np.ndarray, k: int, anchor: Optional[np.ndarray]) -> np.ndarray:
+    """Deterministic farthest-point seeding, starting from the stop nearest the anchor"""
+    if anchor is not None:
+        first = int(np.argmin(((points - anchor) ** 2).sum(axis=1)))
+    else:
+        first = 0
+    chosen = [first]
+    nearest = ((points - points[first]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        candidate = int(np.argmax(nearest))
+        chosen.append(candidate)
+        nearest = np.minimum(nearest, ((points - points[candidate]) ** 2).sum(axis=1))
+    return points[chosen].copy()
+
+
+def capacitated_cluster_labels(points: np.ndarray, weights: np.ndarray, max_stops: int,
+                               max_weight: float = None, anchor: np.ndarray = None,
+                               iterations: int = 20) -> np.ndarray:
+    """
+    Capacitated k-means: assign each point to a cluster without exceeding limits
+
+    Points are assigned in order of regret (how much they lose by not getting
+    their nearest centroid), so contested points choose first.
+
+    Returns:
+        Cluster label per point (labels are 0..k-1, every label is non-empty)
+    """
+    n = len(points)
+    if n == 0:
+        return np.zeros(0, dtype=int)
+
+    max_stops = max(1, int(max_stops))
+    k = math.ceil(n / max_stops)
+    if max_weight:
+        k = max(k, math.ceil(float(weights.sum()) / max_weight))
+    k = min(k, n)
+
+    centroids = _initial_centroids(points, k, anchor)
+    labels = np.full(n, -1, dtype=int)
+
+    for _ in range(iterations):
+        distances = np.sqrt(((points[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2))
+        preference = np.argsort(distances, axis=1)
+        sorted_distances = np.take_along_axis(distances, preference, axis=1)
+        regret = sorted_distances[:, 1] - sorted_distances[:, 0] if k > 1 else np.zeros(n)
+
+        stop_load = np.zeros(len(centroids), dtype=int)
+        weight_load = np.zeros(len(centroids))
+        new_labels = np.full(n, -1, dtype=int)
+
+        for i in np.argsort(-regret, kind='stable'):
+            for cluster in preference[i]:
+                if stop_load[cluster] >= max_stops:
+                    continue
+                if max_weight and stop_load[cluster] > 0 and weight_load[cluster] + weights[i] > max_weight:
+                    continue
+                new_labels[i] = cluster
+                break
+            else:
+                # Nothing fits (weight limit): open a new cluster at this point
+                centroids = np.vstack([centroids, points[i]])
+                stop_load = np.append(stop_load, 0)
+                weight_load = np.append(weight_load, 0.0)
+                preference = np.column_stack([preference, np.full(n, len(centroids) - 1)])
+                new_labels[i] = len(centroids) - 1
+            stop_load[new_labels[i]] += 1
+            weight_load[new_labels[i]] += weights[i]
+
+        counts = np.bincount(new_labels, minlength=len(centroids))
+        used = counts > 0
+        sums_x = np.bincount(new_labels, weights=points[:, 0], minlength=len(centroids))
+        sums_y = np.bincount(new_labels, weights=points[:, 1], minlength=len(centroids))
+        centroids = np.where(
+            used[:, None],
+            np.column_stack([sums_x, sums_y]) / np.maximum(counts, 1)[:, None],
+            centroids
+        )
+
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+
+    # Re-number so labels are contiguous
+    _, labels = np.unique(labels, return_inverse=True)
+    return labels
+
+
+def capacitated_clusters(packages: List[Dict], max_stops: int = 4, max_weight: float = None,
+                         depot_location: Dict = None, iterations: int = 20) -> List[List[Dict]]:
+    """
+    Group packages into geographically compact clusters under capacity limits
+
+    Args:
+        packages: Package dictionaries with latitude/longitude (and optional weight)
+        max_stops: Maximum packages per cluster
+        max_weight: Maximum total package weight per cluster (None = unlimited)
+        depot_location: Used to seed the first cluster nearest the depot
+        iterations: Maximum assignment/update rounds
+
+    Returns:
+        List of clusters, each a list of package dictionaries
+    """
+    if not packages:
+        return []
+
+    latitudes = np.array([p['latitude'] for p in packages], dtype=float)
+    longitudes = np.array([p['longitude'] for p in packages], dtype=float)
+    weights = np.array([float(p.get('weight') or 1) for p in packages])
+
+    if depot_location:
+        latitudes_all = np.append(latitudes, depot_location['latitude'])
+        longitudes_all = np.append(longitudes, depot_location['longitude'])
+        projected = project_to_km(latitudes_all, longitudes_all)
+        points, anchor = projected[:-1], projected[-1]
+    else:
+        points, anchor = project_to_km(latitudes, longitudes), None
+
+    labels = capacitated_cluster_labels(points, weights, max_stops, max_weight, anchor, iterations)
+
+    clusters = [[] for _ in range(int(labels.max()) + 1)]
+    for package, label in zip(packages, labels):
+        clusters[label].append(package)
+
+    logger.debug(f"Clustered {len(packages)} packages into {len(clusters)} clusters (max {max_stops} stops)")
+    return clusters
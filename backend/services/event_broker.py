@@ -0,0 +1,125 @@
+"""
+Courier Event Broker
+In-process publish/subscribe of route and package events per courier, used
+by the WebSocket and Server-Sent Events push channels (routers/events.py)
+"""
+
+import asyncio
+import itertools
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Event types
+ROUTE_UPDATED = 'route.updated'
+PACKAGE_CREATED = 'package.created'
+PACKAGE_UPDATED = 'package.updated'
+PACKAGE_STATUS = 'package.status'
+PACKAGE_DELETED = 'package.deleted'
+
+
+class Subscription:
+    """One connected client: a bounded queue living on the client's event loop"""
+
+    def __init__(self, courier_id: int, loop: asyncio.AbstractEventLoop, max_queue: int):
+        self.courier_id = courier_id
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def offer(self, event: Dict):
+        """Enqueue without blocking; a slow client loses its oldest events, not new ones"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+
+class EventBroker:
+    """Fan-out of events to every open channel of a courier, with a short replay buffer"""
+
+    def __init__(self, replay_size: int = 100, max_queue: int = 100):
+        self.replay_size = replay_size
+        self.max_queue = max_queue
+        self._subscriptions: Dict[int, List[Subscription]] = {}
+        self._recent: Dict[int, deque] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, courier_id: int, last_event_id: Optional[int] = None) -> Subscription:
+        """
+        Register a client on the running loop. Events newer than
+        `last_event_id` still in the replay buffer are queued immediately, so
+        a reconnecting client does not miss what happened while it was away.
+        """
+        subscription = Subscription(courier_id, asyncio.get_running_loop(), self.max_queue)
+        with self._lock:
+            self._subscriptions.setdefault(courier_id, []).append(subscription)
+            missed = [
+                event for event in self._recent.get(courier_id, ())
+                if last_event_id is not None and event['id'] > last_event_id
+            ]
+        for event in missed:
+            subscription.offer(event)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.courier_id, [])
+            if subscription in subscriptions:
+                subscriptions.remove(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.courier_id, None)
+
+    def publish(self, courier_id: int, event_type: str, data: Dict) -> Dict:
+        """Push an event to the courier's channels; safe to call from any thread"""
+        event = {
+            'id': next(self._ids),
+            'type': event_type,
+            'at': datetime.now().isoformat(timespec='seconds'),
+            'data': data
+        }
+        with self._lock:
+            self._recent.setdefault(courier_id, deque(maxlen=self.replay_size)).append(event)
+            subscriptions = list(self._subscriptions.get(courier_id, ()))
+            self.published += 1
+
+        for subscription in subscriptions:
+            try:
+                if _running_loop() is subscription.loop:
+                    subscription.offer(event)
+                else:
+                    subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:
+                # Loop already closed; the channel is going away
+                self.unsubscribe(subscription)
+        return event
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                'connected_couriers': len(self._subscriptions),
+                'open_channels': sum(len(subs) for subs in self._subscriptions.values()),
+                'events_published': self.published
+            }
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+# Global instance
+event_broker = EventBroker(
+    replay_size=settings.EVENT_REPLAY_BUFFER,
+    max_queue=settings.EVENT_QUEUE_SIZE
+)
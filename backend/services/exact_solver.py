@@ -0,0 +1,82 @@
+"""
+Exact Small-Route Solver
+Held-Karp bitmask dynamic programming for clusters of up to ~12 stops
+"""
+
+import math
+from array import array
+from typing import List, Sequence, Tuple
+
+MAX_EXACT_STOPS = 12
+
+
+def held_karp_path(matrix: Sequence[Sequence[float]], penalties: Sequence[float] = None) -> Tuple[List[int], float]:
+    """
+    Find the cheapest open path visiting every node exactly once
+
+    The path may start and end at any node. Each node's penalty is charged
+    once per position it is visited late (position 0 is free), so high
+    priority stops are pulled towards the front of the path.
+
+    Args:
+        matrix: n x n distance matrix
+        penalties: Per-node cost per position of delay (optional)
+
+    Returns:
+        (visit order as node indices, total cost including penalties)
+    """
+    n = len(matrix)
+    if n == 0:
+        return [], 0.0
+    if n > MAX_EXACT_STOPS:
+        raise ValueError(f"Held-Karp limited to {MAX_EXACT_STOPS} stops, got {n}")
+    matrix = [[float(value) for value in row] for row in matrix]
+    penalties = [float(value) for value in penalties] if penalties is not None else [0.0] * n
+    if n == 1:
+        return [0], 0.0
+
+    full = 1 << n
+    inf = math.inf
+    # cost[mask * n + last] = cheapest path visiting mask and ending at last
+    cost = array('d', [inf]) * (full * n)
+    parent = array('b', [-1]) * (full * n)
+
+    for j in range(n):
+        cost[(1 << j) * n + j] = 0.0
+
+    popcount = [0] * full
+    for mask in range(1, full):
+        popcount[mask] = popcount[mask >> 1] + (mask & 1)
+
+    for mask in range(1, full):
+        position = popcount[mask]
+        base = mask * n
+        for last in range(n):
+            current = cost[base + last]
+            if current == inf:
+                continue
+            row = matrix[last]
+            for nxt in range(n):
+                bit = 1 << nxt
+                if mask & bit:
+                    continue
+                candidate = current + row[nxt] + penalties[nxt] * position
+                index = (mask | bit) * n + nxt
+                if candidate < cost[index]:
+                    cost[index] = candidate
+                    parent[index] = last
+
+    final = (full - 1) * n
+    last = min(range(n), key=lambda j: cost[final + j])
+    best_cost = cost[final + last]
+
+    order = []
+    mask = full - 1
+    while last != -1:
+        order.append(last)
+        previous = parent[mask * n + last]
+        mask ^= 1 << last
+        last = previous
+    order.reverse()
+
+    return order, best_cost
@@ -0,0 +1,260 @@
+"""
+Local Fleet Routing Stand-in
+gRPC server speaking the google.cloud.optimization.v1.FleetRouting protocol,
+backed by our own RouteOptimizer. Lets the real-API code path (client,
+retries, deadlines, request/response conversion) run end to end without
+Google Cloud credentials.
+
+Usage:
+    python -m services.fleet_routing_standin --port 50051 --latency-ms 200 --jitter-ms 100 --error-rate 0.05
+    FLEET_ROUTING_ENDPOINT=localhost:50051 uvicorn main:app
+"""
+
+import argparse
+import logging
+import random
+import time
+from concurrent import futures
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+import grpc
+from google.cloud.optimization_v1 import types
+from google.longrunning import operations_pb2
+from google.protobuf import any_pb2
+
+from .kernels import haversine_km
+from .route_optimizer import RouteOptimizer
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = 'google.cloud.optimization.v1.FleetRouting'
+
+# Same travel model as the OR-Tools time dimension: 500 m per minute (30 km/h)
+METERS_PER_MINUTE = 500
+DEFAULT_VISIT_DURATION = timedelta(minutes=10)
+
+
+class FleetRoutingStandin:
+    """FleetRouting servicer answering OptimizeTours / BatchOptimizeTours locally"""
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0.0,
+                 strategy: str = 'greedy', seed: int = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.strategy = strategy
+        self.optimizer = RouteOptimizer()
+        self._random = random.Random(seed)
+        self.calls = 0
+
+    # ------------------------------------------------------------------
+    # RPC handlers
+    # ------------------------------------------------------------------
+
+    def optimize_tours(self, request, context):
+        """Unary OptimizeTours"""
+        self.calls += 1
+        self._inject_faults(context)
+        return self.solve(request)
+
+    def batch_optimize_tours(self, request, context):
+        """BatchOptimizeTours: solve every model file and return a finished operation"""
+        self.calls += 1
+        self._inject_faults(context)
+
+        for config in request.model_configs:
+            input_path = self._local_path(config.input_config.gcs_source.uri)
+            output_path = self._local_path(config.output_config.gcs_destination.uri)
+            with open(input_path) as f:
+                model_request = types.OptimizeToursRequest.from_json(f.read(), ignore_unknown_fields=True)
+            with open(output_path, 'w') as f:
+                f.write(types.OptimizeToursResponse.to_json(self.solve(model_request)))
+
+        response = any_pb2.Any()
+        response.Pack(types.BatchOptimizeToursResponse.pb(types.BatchOptimizeToursResponse()))
+        return operations_pb2.Operation(
+            name=f"{request.parent}/operations/standin-{self.calls}",
+            done=True,
+            response=response
+        )
+
+    # ------------------------------------------------------------------
+    # Solving
+    # ------------------------------------------------------------------
+
+    def solve(self, request) -> 'types.OptimizeToursResponse':
+        """Solve an OptimizeToursRequest with RouteOptimizer, one vehicle at a time"""
+        model = request.model
+        if not model.vehicles:
+            return types.OptimizeToursResponse()
+
+        # Shipments go to their first allowed vehicle (vehicle 0 when unrestricted)
+        assigned = {index: [] for index in range(len(model.vehicles))}
+        for shipment_index, shipment in enumerate(model.shipments):
+            vehicle_index = shipment.allowed_vehicle_indices[0] if shipment.allowed_vehicle_indices else 0
+            assigned.setdefault(vehicle_index, []).append(shipment_index)
+
+        global_start = model.global_start_time or datetime.now(timezone.utc)
+        routes = []
+        for vehicle_index, vehicle in enumerate(model.vehicles):
+            depot = {
+                'id': 0,
+                'kargo_id': 'DEPOT',
+                'address': 'Stand-in Depot',
+                'recipient_name': 'DEPOT',
+                'latitude': vehicle.start_location.latitude,
+                'longitude': vehicle.start_location.longitude
+            }
+            shipment_indices = assigned[vehicle_index]
+            order = []
+            if shipment_indices:
+                packages = self._shipments_to_packages(model.shipments, shipment_indices)
+                result = self.optimizer.optimize_route(packages, depot, strategy=self.strategy)
+                order = [stop['id'] - 1 for stop in result['stops'] if stop.get('kargo_id') != 'DEPOT']
+            routes.append(self._build_route(model.shipments, order, depot, global_start, vehicle_index))
+
+        return types.OptimizeToursResponse(
+            routes=routes,
+            total_cost=sum(route.route_total_cost for route in routes)
+        )
+
+    def _shipments_to_packages(self, shipments, shipment_indices: List[int]) -> List[Dict]:
+        """RouteOptimizer package dictionaries (id = shipment index + 1)"""
+        packages = []
+        for index in shipment_indices:
+            shipment = shipments[index]
+            visit = shipment.deliveries[0]
+            package = {
+                'id': index + 1,
+                'kargo_id': f"S{index}",
+                'address': '',
+                'recipient_name': '',
+                'delivery_type': shipment.label or 'standard',
+                'latitude': visit.arrival_location.latitude,
+                'longitude': visit.arrival_location.longitude
+            }
+            if visit.time_windows and package['delivery_type'] == 'scheduled':
+                window = visit.time_windows[0]
+                package['time_window_start'] = window.start_time.astimezone().strftime("%H:%M")
+                package['time_window_end'] = window.end_time.astimezone().strftime("%H:%M")
+            packages.append(package)
+        return packages
+
+    def _build_route(self, shipments, order: List[int], depot: Dict, start_time: datetime, vehicle_index: int = 0):
+        """ShipmentRoute with visit times, transitions and totals for a visiting order"""
+        visits = []
+        transitions = []
+        current = start_time
+        position = (depot['latitude'], depot['longitude'])
+        total_meters = 0
+
+        for shipment_index in order + [None]:
+            if shipment_index is None:
+                target = (depot['latitude'], depot['longitude'])
+            else:
+                location = shipments[shipment_index].deliveries[0].arrival_location
+                target = (location.latitude, location.longitude)
+
+            meters = int(haversine_km(position[0], position[1], target[0], target[1]) * 1000)
+            travel = timedelta(minutes=meters / METERS_PER_MINUTE)
+            transitions.append(types.ShipmentRoute.Transition(
+                travel_distance_meters=meters,
+                travel_duration=travel,
+                start_time=current,
+                total_duration=travel
+            ))
+            current += travel
+            total_meters += meters
+            position = target
+
+            if shipment_index is None:
+                break
+
+            request = shipments[shipment_index].deliveries[0]
+            if request.time_windows and request.time_windows[0].start_time:
+                current = max(current, request.time_windows[0].start_time)
+            visits.append(types.ShipmentRoute.Visit(
+                shipment_index=shipment_index,
+                start_time=current,
+                shipment_label=shipments[shipment_index].label
+            ))
+            current += request.duration or DEFAULT_VISIT_DURATION
+
+        return types.ShipmentRoute(
+            vehicle_index=vehicle_index,
+            vehicle_start_time=start_time,
+            vehicle_end_time=current,
+            visits=visits,
+            transitions=transitions,
+            route_total_cost=total_meters / 1000
+        )
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    def _inject_faults(self, context):
+        """Simulated network latency and transient UNAVAILABLE errors"""
+        delay_ms = self.latency_ms + self._random.uniform(0, self.jitter_ms)
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000)
+        if self.error_rate and self._random.random() < self.error_rate:
+            context.abort(grpc.StatusCode.UNAVAILABLE, "stand-in injected failure")
+
+    def _local_path(self, uri: str) -> str:
+        """Batch model files are read/written from the local filesystem"""
+        if uri.startswith('file://'):
+            return uri[len('file://'):]
+        if uri.startswith('gs://'):
+            raise ValueError(f"Stand-in cannot access Cloud Storage: {uri}")
+        return uri
+
+    def generic_handler(self):
+        """gRPC handler serving the FleetRouting service methods"""
+        return grpc.method_handlers_generic_handler(SERVICE_NAME, {
+            'OptimizeTours': grpc.unary_unary_rpc_method_handler(
+                self.optimize_tours,
+                request_deserializer=types.OptimizeToursRequest.deserialize,
+                response_serializer=types.OptimizeToursResponse.serialize
+            ),
+            'BatchOptimizeTours': grpc.unary_unary_rpc_method_handler(
+                self.batch_optimize_tours,
+                request_deserializer=types.BatchOptimizeToursRequest.deserialize,
+                response_serializer=operations_pb2.Operation.SerializeToString
+            )
+        })
+
+
+def create_server(port: int = 50051, max_workers: int = 4, **standin_options):
+    """Build (but do not start) a stand-in server; returns (server, bound port)"""
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers))
+    server.add_generic_rpc_handlers((FleetRoutingStandin(**standin_options).generic_handler(),))
+    bound_port = server.add_insecure_port(f"[::]:{port}")
+    return server, bound_port
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Fleet Routing stand-in server")
+    parser.add_argument('--port', type=int, default=50051)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--latency-ms', type=float, default=0, help='Fixed delay added to every call')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='Extra uniform random delay')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of calls failing with UNAVAILABLE')
+    parser.add_argument('--strategy', default='greedy', choices=RouteOptimizer.STRATEGIES)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server, port = create_server(
+        args.port, args.workers,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate, strategy=args.strategy, seed=args.seed
+    )
+    server.start()
+    print(f"🛰️ Fleet Routing stand-in listening on localhost:{port} (strategy={args.strategy})")
+    server.wait_for_termination()
+
+
+if __name__ == "__main__":
+    main()
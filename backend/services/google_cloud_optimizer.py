@@ -4,6 +4,11 @@ Integrates Google Cloud Fleet Routing API with our existing system
 """
 
 import os
+import asyncio
+import random
+import threading
+import time
+import weakref
 from typing import List, Dict, Optional, Tuple
 import json
 from datetime import datetime, timedelta
@@ -13,41 +18,112 @@ import logging
 try:
     from google.cloud import optimization_v1
     from google.cloud.optimization_v1 import types
+    from google.cloud.optimization_v1.services.fleet_routing import transports as fleet_routing_transports
+    from google.api_core import exceptions as google_exceptions
+    from google.type import latlng_pb2
+    import grpc
     GOOGLE_CLOUD_AVAILABLE = True
+    RETRYABLE_ERRORS = (
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.DeadlineExceeded,
+        google_exceptions.InternalServerError,
+        google_exceptions.TooManyRequests,
+        google_exceptions.Aborted,
+    )
     print("✅ Google Cloud optimization modules loaded successfully")
 except ImportError as e:
     print(f"⚠️ Google Cloud modules not available: {e}")
     GOOGLE_CLOUD_AVAILABLE = False
     optimization_v1 = None
     types = None
+    RETRYABLE_ERRORS = ()
+
+from config import settings
+from .route_bounds import compute_route_bounds, bound_metadata
+from .kernels import haversine_km
+from .optimization_cache import optimization_cache, request_fingerprint
+from .circuit_breaker import fleet_routing_breaker, CircuitOpenError
 
 logger = logging.getLogger(__name__)
 
+# Fleet Routing clients are shared per process (one gRPC channel each)
+_client_lock = threading.Lock()
+_shared_client = None
+_shared_async_clients = weakref.WeakKeyDictionary()  # event loop -> async client
+
+
+def get_shared_client():
+    """Process-wide synchronous FleetRoutingClient (None if it cannot be created)"""
+    global _shared_client
+    if not GOOGLE_CLOUD_AVAILABLE:
+        return None
+    with _client_lock:
+        if _shared_client is None:
+            if settings.FLEET_ROUTING_ENDPOINT:
+                # Local stand-in server: plaintext channel, no credentials
+                transport = fleet_routing_transports.FleetRoutingGrpcTransport(
+                    channel=grpc.insecure_channel(settings.FLEET_ROUTING_ENDPOINT)
+                )
+                _shared_client = optimization_v1.FleetRoutingClient(transport=transport)
+            else:
+                _shared_client = optimization_v1.FleetRoutingClient()
+        return _shared_client
+
+
+def get_shared_async_client():
+    """FleetRoutingAsyncClient shared by every request on the running event loop"""
+    if not GOOGLE_CLOUD_AVAILABLE:
+        return None
+    loop = asyncio.get_running_loop()
+    with _client_lock:
+        client = _shared_async_clients.get(loop)
+        if client is None:
+            if settings.FLEET_ROUTING_ENDPOINT:
+                transport = fleet_routing_transports.FleetRoutingGrpcAsyncIOTransport(
+                    channel=grpc.aio.insecure_channel(settings.FLEET_ROUTING_ENDPOINT)
+                )
+                client = optimization_v1.FleetRoutingAsyncClient(transport=transport)
+            else:
+                client = optimization_v1.FleetRoutingAsyncClient()
+            _shared_async_clients[loop] = client
+        return client
+
+
 class GoogleCloudRouteOptimizer:
     """Google Cloud Route Optimization API wrapper"""
     
-    def __init__(self, project_id: str = None, credentials_path: str = None):
+    def __init__(self, project_id: str = None, credentials_path: str = None, verbose: bool = True):
         """
         Initialize Google Cloud Route Optimizer
         
         Args:
             project_id: Google Cloud project ID
             credentials_path: Path to service account JSON file
+            verbose: Per-solve progress output; off for background planning
         """
+        self.verbose = verbose
         if not GOOGLE_CLOUD_AVAILABLE:
             logger.error("❌ Google Cloud optimization modules not available")
             self.client = None
             return
             
         self.project_id = project_id or os.getenv('GOOGLE_CLOUD_PROJECT_ID')
+        if settings.FLEET_ROUTING_ENDPOINT and not self.project_id:
+            self.project_id = 'local-standin'
         
         # Set credentials if provided
         if credentials_path and os.path.exists(credentials_path):
             os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = credentials_path
         
-        # Initialize client
+        # Real API calls are opt-in; otherwise the high-quality simulation is used
+        self.use_real_api = settings.GOOGLE_CLOUD_USE_REAL_API or bool(settings.FLEET_ROUTING_ENDPOINT)
+        self.call_timeout_s = settings.FLEET_ROUTING_TIMEOUT_S
+        self.max_retries = settings.FLEET_ROUTING_MAX_RETRIES
+        self.retry_base_s = settings.FLEET_ROUTING_RETRY_BASE_S
+        
+        # Initialize client (shared with every other optimizer in this process)
         try:
-            self.client = optimization_v1.FleetRoutingClient()
+            self.client = get_shared_client()
             self.location = f"projects/{self.project_id}/locations/global"
             logger.info("✅ Google Cloud Route Optimizer initialized successfully")
         except Exception as e:
@@ -58,38 +134,242 @@ class GoogleCloudRouteOptimizer:
         """Check if Google Cloud API is available"""
         return GOOGLE_CLOUD_AVAILABLE and self.client is not None and self.project_id is not None
     
-    def optimize_route(self, packages: List[Dict], depot_location: Dict = None) -> Dict:
+    def optimize_route(self, packages: List[Dict], depot_location: Dict = None, deadline_s: float = None) -> Dict:
         """
         Optimize route using Google Cloud Route Optimization API
         
         Args:
             packages: List of package dictionaries with location data
             depot_location: Starting depot location (optional)
+            deadline_s: Overall deadline for the remote call including retries
             
         Returns:
             Optimized route result
         """
         if not self.is_available():
             logger.warning("⚠️ Google Cloud not available, using fallback simulation")
-            return self._fallback_optimization(packages, depot_location)
+            return self._with_bound_metadata(self._fallback_optimization(packages, depot_location), packages, depot_location)
         
         try:
             logger.info(f"🚀 Attempting Google Cloud Route Optimization for {len(packages)} packages")
             
-            # For now, Google Cloud API has complex format requirements
-            # Let's use an improved fallback that simulates Google Cloud quality
-            logger.info("⚠️ Using high-quality simulation (Google Cloud format still being refined)")
-            return self._google_cloud_simulation(packages, depot_location)
+            if not self.use_real_api:
+                # Google Cloud API has complex format requirements; unless real calls are
+                # enabled, use an improved fallback that simulates Google Cloud quality
+                logger.info("⚠️ Using high-quality simulation (set GOOGLE_CLOUD_USE_REAL_API=true for real calls)")
+                return self._with_bound_metadata(self._google_cloud_simulation(packages, depot_location), packages, depot_location)
             
-            # TODO: Uncomment when Google Cloud API format is finalized
-            # request = self._prepare_optimization_request(packages, depot_location)
-            # response = self.client.optimize_tours(request=request)
-            # result = self._process_optimization_response(response, packages, depot_location)
+            request = self._prepare_optimization_request(packages, depot_location)
+            cache_key = request_fingerprint(request)
+            response = self._cached_response(cache_key)
+            cache_hit = response is not None
+            if not cache_hit:
+                response = self._optimize_tours_with_retry(request, deadline_s or self.call_timeout_s)
+                self._store_response(cache_key, response)
+            result = self._process_optimization_response(response, packages, depot_location)
+            result['optimization_metadata']['cache_hit'] = cache_hit
+            return self._with_bound_metadata(result, packages, depot_location)
             
         except Exception as e:
             logger.error(f"❌ Google Cloud optimization failed: {e}")
             logger.info("⚠️ Falling back to simulation")
-            return self._fallback_optimization(packages, depot_location)
+            return self._with_bound_metadata(self._fallback_optimization(packages, depot_location), packages, depot_location)
+    
+    async def optimize_route_async(self, packages: List[Dict], depot_location: Dict = None, deadline_s: float = None) -> Dict:
+        """
+        Async variant of optimize_route for use inside async endpoints
+        
+        Remote calls go through the shared FleetRoutingAsyncClient and are awaited,
+        so no worker thread is held while Google solves. Local simulation and
+        fallback work runs in a thread.
+        
+        Args:
+            packages: List of package dictionaries with location data
+            depot_location: Starting depot location (optional)
+            deadline_s: Overall deadline for the remote call including retries
+        """
+        if not self.is_available() or not self.use_real_api:
+            return await asyncio.to_thread(self.optimize_route, packages, depot_location)
+        
+        try:
+            logger.info(f"🚀 Async Google Cloud Route Optimization for {len(packages)} packages")
+            request = self._prepare_optimization_request(packages, depot_location)
+            cache_key = request_fingerprint(request)
+            response = self._cached_response(cache_key)
+            cache_hit = response is not None
+            if not cache_hit:
+                response = await self._optimize_tours_with_retry_async(request, deadline_s or self.call_timeout_s)
+                self._store_response(cache_key, response)
+            result = self._process_optimization_response(response, packages, depot_location)
+            result['optimization_metadata']['cache_hit'] = cache_hit
+            return self._with_bound_metadata(result, packages, depot_location)
+        except Exception as e:
+            logger.error(f"❌ Async Google Cloud optimization failed: {e}")
+            logger.info("⚠️ Falling back to simulation")
+            fallback = await asyncio.to_thread(self._fallback_optimization, packages, depot_location)
+            return self._with_bound_metadata(fallback, packages, depot_location)
+    
+    async def optimize_routes_batch(self, courier_packages: Dict, depot_location: Dict = None,
+                                    mode: str = 'fanout', max_concurrency: int = None,
+                                    deadline_s: float = None) -> Dict:
+        """
+        Optimize the routes of many couriers of one depot at once
+        
+        Args:
+            courier_packages: Mapping of courier id to that courier's packages
+            depot_location: Shared depot location
+            mode: 'fanout' - one request per courier, at most max_concurrency in flight;
+                  'packed' - a single multi-vehicle request, one vehicle per courier
+            max_concurrency: Concurrent remote calls in fanout mode
+            deadline_s: Deadline for each remote call including retries
+            
+        Returns:
+            Mapping of courier id to that courier's optimization result
+        """
+        active = {courier: packages for courier, packages in courier_packages.items() if packages}
+        results = {courier: None for courier in courier_packages if courier not in active}
+        if not active:
+            return results
+        
+        logger.info(f"📦 Batch optimization for {len(active)} couriers ({mode})")
+        if mode == 'packed' and self.is_available() and self.use_real_api:
+            try:
+                results.update(await self._optimize_packed_async(active, depot_location, deadline_s))
+                return results
+            except Exception as e:
+                logger.error(f"❌ Packed batch optimization failed: {e}, fanning out instead")
+        
+        semaphore = asyncio.Semaphore(max_concurrency or settings.FLEET_ROUTING_BATCH_CONCURRENCY)
+        
+        async def optimize_one(packages):
+            async with semaphore:
+                return await self.optimize_route_async(packages, depot_location, deadline_s)
+        
+        couriers = list(active)
+        outcomes = await asyncio.gather(*(optimize_one(active[c]) for c in couriers))
+        results.update(zip(couriers, outcomes))
+        return results
+    
+    async def _optimize_packed_async(self, courier_packages: Dict, depot_location: Dict = None,
+                                     deadline_s: float = None) -> Dict:
+        """One OptimizeTours call with a vehicle per courier and shipments pinned to it"""
+        couriers = list(courier_packages)
+        all_packages = []
+        assignments = []
+        for vehicle_index, courier in enumerate(couriers):
+            all_packages.extend(courier_packages[courier])
+            assignments.extend([vehicle_index] * len(courier_packages[courier]))
+        
+        request = self._prepare_optimization_request(all_packages, depot_location, assignments)
+        cache_key = request_fingerprint(request)
+        response = self._cached_response(cache_key)
+        cache_hit = response is not None
+        if not cache_hit:
+            response = await self._optimize_tours_with_retry_async(request, deadline_s or self.call_timeout_s)
+            self._store_response(cache_key, response)
+        
+        results = {}
+        for vehicle_index, courier in enumerate(couriers):
+            result = self._process_optimization_response(response, all_packages, depot_location, vehicle_index)
+            result['optimization_metadata']['cache_hit'] = cache_hit
+            result['optimization_metadata']['batch_mode'] = 'packed'
+            results[courier] = self._with_bound_metadata(result, courier_packages[courier], depot_location)
+        return results
+    
+    def _cached_response(self, cache_key: str):
+        """Previously received OptimizeToursResponse for an identical request, if still fresh"""
+        payload = optimization_cache.get(cache_key)
+        if payload is None:
+            return None
+        logger.info(f"💾 Optimization cache hit ({cache_key[:12]})")
+        return types.OptimizeToursResponse.deserialize(payload)
+    
+    def _store_response(self, cache_key: str, response):
+        """Cache a successful response (only responses with routes are worth reusing)"""
+        if response.routes:
+            optimization_cache.put(cache_key, types.OptimizeToursResponse.serialize(response))
+    
+    def get_cache_stats(self) -> Dict:
+        """Hit rate and size of the remote response cache"""
+        return optimization_cache.stats()
+    
+    def _retry_delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter for the given retry attempt (1-based)"""
+        return random.uniform(0, self.retry_base_s * (2 ** (attempt - 1)))
+    
+    def _optimize_tours_with_retry(self, request, deadline_s: float):
+        """Blocking OptimizeTours call with per-call deadline, jittered retries and circuit breaker"""
+        if not fleet_routing_breaker.acquire():
+            raise CircuitOpenError("Fleet Routing circuit is open")
+        started = time.monotonic()
+        deadline = started + deadline_s
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                response = self.client.optimize_tours(request=request, timeout=remaining, retry=None)
+                fleet_routing_breaker.record_success((time.monotonic() - started) * 1000)
+                return response
+            except RETRYABLE_ERRORS as e:
+                attempt += 1
+                delay = self._retry_delay(attempt)
+                if attempt > self.max_retries or time.monotonic() + delay >= deadline:
+                    fleet_routing_breaker.record_failure((time.monotonic() - started) * 1000, e.__class__.__name__)
+                    raise
+                logger.warning(f"🔁 OptimizeTours failed ({e.__class__.__name__}), retry {attempt} in {delay:.2f}s")
+                time.sleep(delay)
+            except Exception as e:
+                fleet_routing_breaker.record_failure((time.monotonic() - started) * 1000, e.__class__.__name__)
+                raise
+    
+    async def _optimize_tours_with_retry_async(self, request, deadline_s: float):
+        """Awaited OptimizeTours call with per-call deadline, jittered retries and circuit breaker"""
+        if not fleet_routing_breaker.acquire():
+            raise CircuitOpenError("Fleet Routing circuit is open")
+        client = get_shared_async_client()
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + deadline_s
+        attempt = 0
+        try:
+            while True:
+                remaining = deadline - loop.time()
+                try:
+                    response = await client.optimize_tours(request=request, timeout=remaining, retry=None)
+                    fleet_routing_breaker.record_success((loop.time() - started) * 1000)
+                    return response
+                except RETRYABLE_ERRORS as e:
+                    attempt += 1
+                    delay = self._retry_delay(attempt)
+                    if attempt > self.max_retries or loop.time() + delay >= deadline:
+                        fleet_routing_breaker.record_failure((loop.time() - started) * 1000, e.__class__.__name__)
+                        raise
+                    logger.warning(f"🔁 Async OptimizeTours failed ({e.__class__.__name__}), retry {attempt} in {delay:.2f}s")
+                # Backoff outside the handler so a cancel here still reaches the release below
+                await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            # Cancelled by the caller (e.g. a hedge loser), during a call or a backoff:
+            # says nothing about remote health
+            fleet_routing_breaker.release()
+            raise
+        except RETRYABLE_ERRORS:
+            raise  # Verdict already recorded above
+        except Exception as e:
+            fleet_routing_breaker.record_failure((loop.time() - started) * 1000, e.__class__.__name__)
+            raise
+    
+    def _with_bound_metadata(self, result: Dict, packages: List[Dict], depot_location: Dict = None) -> Dict:
+        """Attach lower bound and optimality gap to the result's optimization metadata"""
+        depot = depot_location or {'latitude': 41.0082, 'longitude': 28.9784}
+        try:
+            bounds = compute_route_bounds(depot, packages, iterations=settings.LOWER_BOUND_ITERATIONS)
+            # Routes end at the last delivery, so compare against the path bound
+            result.setdefault('optimization_metadata', {}).update(
+                bound_metadata(result['total_distance_km'], bounds, closed_tour=False)
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Lower bound computation failed: {e}")
+        return result
     
     def _fallback_optimization(self, packages: List[Dict], depot_location: Dict = None) -> Dict:
         """Fallback optimization when Google Cloud API is not available"""
@@ -290,40 +570,34 @@ class GoogleCloudRouteOptimizer:
         
         return clusters
 
+    def _debug(self, message: str):
+        if self.verbose:
+            print(message)
+    
     def _calculate_road_distance(self, lat1: float, lng1: float, lat2: float, lng2: float) -> float:
         """Calculate more realistic road distance using Haversine formula"""
         
-        import math
-        
-        # Haversine formula for accurate distance calculation
-        R = 6371  # Earth radius in kilometers
-        
-        # Convert degrees to radians
-        lat1_rad = math.radians(lat1)
-        lng1_rad = math.radians(lng1)
-        lat2_rad = math.radians(lat2)
-        lng2_rad = math.radians(lng2)
-        
-        # Differences
-        dlat = lat2_rad - lat1_rad
-        dlng = lng2_rad - lng1_rad
-        
-        # Haversine formula
-        a = math.sin(dlat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlng/2)**2
-        c = 2 * math.asin(math.sqrt(a))
-        
-        # Distance in km
-        distance = R * c
+        # Haversine formula for accurate distance calculation (km)
+        distance = haversine_km(float(lat1), float(lng1), float(lat2), float(lng2))
         
         # Add road factor for actual driving distance (typically 1.3x straight line)
         road_distance = distance * 1.3
         
-        print(f"🛣️ Distance calculation: {lat1:.4f},{lng1:.4f} → {lat2:.4f},{lng2:.4f} = {road_distance:.1f}km")
+        self._debug(f"🛣️ Distance calculation: {lat1:.4f},{lng1:.4f} → {lat2:.4f},{lng2:.4f} = {road_distance:.1f}km")
         
         return max(0.2, road_distance)  # Minimum 0.2km
 
-    def _prepare_optimization_request(self, packages: List[Dict], depot_location: Dict):
-        """Prepare optimization request for Google Cloud API"""
+    def _prepare_optimization_request(self, packages: List[Dict], depot_location: Dict,
+                                      vehicle_assignments: List[int] = None):
+        """
+        Prepare optimization request for Google Cloud API
+        
+        Args:
+            packages: Packages to deliver (shipment index = list index)
+            depot_location: Start/end location of every vehicle
+            vehicle_assignments: Optional vehicle index per package; one vehicle is
+                created per distinct index and each shipment is pinned to its vehicle
+        """
         
         if not GOOGLE_CLOUD_AVAILABLE:
             raise Exception("Google Cloud modules not available")
@@ -340,9 +614,10 @@ class GoogleCloudRouteOptimizer:
         shipments = []
         for i, package in enumerate(packages):
             shipment = types.Shipment(
+                label=str(package.get('delivery_type', 'standard')),
                 deliveries=[
                     types.Shipment.VisitRequest(
-                        arrival_location=types.Location(
+                        arrival_location=latlng_pb2.LatLng(
                             latitude=package['latitude'],
                             longitude=package['longitude']
                         ),
@@ -356,38 +631,46 @@ class GoogleCloudRouteOptimizer:
                     )
                 ]
             )
+            if vehicle_assignments is not None:
+                shipment.allowed_vehicle_indices = [vehicle_assignments[i]]
             shipments.append(shipment)
         
-        # Create vehicle
-        vehicle = types.Vehicle(
-            start_location=types.Location(
-                latitude=depot_location['latitude'],
-                longitude=depot_location['longitude']
-            ),
-            end_location=types.Location(
-                latitude=depot_location['latitude'],
-                longitude=depot_location['longitude']
+        # Create vehicles (all start and end at the depot)
+        vehicle_count = max(vehicle_assignments) + 1 if vehicle_assignments else 1
+        vehicles = [
+            types.Vehicle(
+                start_location=latlng_pb2.LatLng(
+                    latitude=depot_location['latitude'],
+                    longitude=depot_location['longitude']
+                ),
+                end_location=latlng_pb2.LatLng(
+                    latitude=depot_location['latitude'],
+                    longitude=depot_location['longitude']
+                )
             )
-        )
+            for _ in range(vehicle_count)
+        ]
         
-        # Create optimization request
+        # Create optimization request (the model horizon must cover every time window)
         request = types.OptimizeToursRequest(
             parent=self.location,
             model=types.ShipmentModel(
                 shipments=shipments,
-                vehicles=[vehicle]
+                vehicles=vehicles,
+                global_start_time=self._local_time(8),
+                global_end_time=self._local_time(20)
             )
         )
         
         return request
 
-    def _process_optimization_response(self, response, packages: List[Dict], depot_location: Dict = None) -> Dict:
-        """Process Google Cloud optimization response"""
-        
-        if not response.routes:
-            raise Exception("No routes found in optimization response")
+    def _process_optimization_response(self, response, packages: List[Dict], depot_location: Dict = None,
+                                       vehicle_index: int = 0) -> Dict:
+        """Process Google Cloud optimization response (the route of one vehicle)"""
         
-        route = response.routes[0]  # Single vehicle route
+        route = next((r for r in response.routes if r.vehicle_index == vehicle_index), None)
+        if route is None:
+            raise Exception(f"No route found for vehicle {vehicle_index} in optimization response")
         
         # Extract optimized stops
         optimized_stops = []
@@ -402,7 +685,7 @@ class GoogleCloudRouteOptimizer:
                 'package': package,
                 'sequence': i + 1,
                 'arrival_time': self._format_time(visit.start_time),
-                'departure_time': self._format_time(visit.start_time + visit.duration),
+                'departure_time': self._format_time(visit.start_time + self._get_delivery_duration(package)),
                 'distance_from_previous_m': 0,
                 'duration_from_previous_s': 0
             }
@@ -428,7 +711,7 @@ class GoogleCloudRouteOptimizer:
                 'algorithm': 'Google Cloud Route Optimization (Real API)',
                 'features': ['Real-time traffic', 'Vehicle constraints', 'Time windows'],
                 'optimization_quality': 'Professional grade',
-                'total_cost': route.vehicle_total_cost if hasattr(route, 'vehicle_total_cost') else 0,
+                'total_cost': route.route_total_cost,
                 'validation_errors': len(response.validation_errors) if response.validation_errors else 0
             }
         }
@@ -437,47 +720,60 @@ class GoogleCloudRouteOptimizer:
 
     def _get_delivery_duration(self, package: Dict):
         """Get delivery duration based on package type"""
-        if not GOOGLE_CLOUD_AVAILABLE:
-            return None
-            
         duration_minutes = {
             'express': 5,
             'scheduled': 10,
             'standard': 15
         }.get(package.get('delivery_type', 'standard'), 10)
         
-        return types.Duration(seconds=duration_minutes * 60)
+        return timedelta(minutes=duration_minutes)
+
+    def _local_time(self, hour: int, minute: int = 0) -> datetime:
+        """Today's local wall-clock time as an aware datetime"""
+        return datetime.now().astimezone().replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+    def _parse_window_time(self, value: Optional[str]) -> Optional[datetime]:
+        """Parse an 'HH:MM' package time window bound"""
+        if not value:
+            return None
+        try:
+            hours, minutes = map(int, value.split(':'))
+            return self._local_time(hours, minutes)
+        except ValueError:
+            return None
 
     def _get_time_window_start(self, package: Dict):
         """Get delivery time window start"""
-        if not GOOGLE_CLOUD_AVAILABLE:
-            return None
-            
-        base_time = datetime.now().replace(hour=8, minute=0, second=0, microsecond=0)
+        base_time = self._local_time(8)
         
         if package.get('delivery_type') == 'express':
             # Express: ASAP
-            return types.Timestamp(seconds=int(base_time.timestamp()))
+            return base_time
         elif package.get('delivery_type') == 'scheduled':
-            # Scheduled: specific time
-            scheduled_hour = package.get('scheduled_hour', 10)
-            scheduled_time = base_time.replace(hour=scheduled_hour)
-            return types.Timestamp(seconds=int(scheduled_time.timestamp()))
+            # Scheduled: the package's own window, or its scheduled hour
+            window_start = self._parse_window_time(package.get('time_window_start'))
+            if window_start:
+                return max(window_start, base_time)
+            return self._local_time(package.get('scheduled_hour', 10))
         else:
             # Standard: any time during business hours
-            return types.Timestamp(seconds=int(base_time.timestamp()))
+            return base_time
 
     def _get_time_window_end(self, package: Dict):
         """Get delivery time window end"""
-        if not GOOGLE_CLOUD_AVAILABLE:
-            return None
-            
-        base_time = datetime.now().replace(hour=18, minute=0, second=0, microsecond=0)
-        return types.Timestamp(seconds=int(base_time.timestamp()))
+        base_time = self._local_time(18)
+        if package.get('delivery_type') == 'scheduled':
+            window_end = self._parse_window_time(package.get('time_window_end'))
+            window_start = self._get_time_window_start(package)
+            if window_end and window_end > window_start:
+                return min(window_end, self._local_time(20))
+        return base_time
 
     def _format_time(self, timestamp):
-        """Format timestamp to HH:MM format"""
-        if hasattr(timestamp, 'seconds'):
+        """Format timestamp to local HH:MM format"""
+        if isinstance(timestamp, datetime):
+            dt = timestamp.astimezone() if timestamp.tzinfo else timestamp
+        elif hasattr(timestamp, 'seconds'):
             dt = datetime.fromtimestamp(timestamp.seconds)
         else:
             dt = datetime.fromtimestamp(timestamp)
@@ -4,8 +4,12 @@ Combines custom algorithm with Google Cloud Route Optimization API
 Falls back gracefully when API is unavailable
 """
 
+import asyncio
 import logging
-from typing import List, Dict, Optional
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
 
 # Try to import Google Cloud optimizer, fallback if not available
 try:
@@ -16,10 +20,21 @@ except ImportError as e:
     GoogleCloudRouteOptimizer = None
     GOOGLE_CLOUD_AVAILABLE = False
 
+from config import settings
 from .route_optimizer import RouteOptimizer
+from .latency_stats import latency_stats, ortools_setup_ms
+from .kernels import haversine_km
+from .circuit_breaker import fleet_routing_breaker
+from .problem_splitter import split_packages, stitch_routes, smooth_boundaries
+from .benchmark_store import benchmark_store
+from .request_capture import request_capture
+from .cancellation import CancellationToken, OptimizationCancelled
 
 logger = logging.getLogger(__name__)
 
+SPLIT_SERVICE_TIME_MIN = 15  # Per-stop service time used to re-time stitched split routes
+
+
 class HybridRouteOptimizer:
     """
     Hybrid route optimizer that combines:
@@ -27,108 +42,380 @@ class HybridRouteOptimizer:
     2. Custom algorithm (fallback)
     """
     
-    def __init__(self, google_project_id: str = None, google_credentials_path: str = None):
-        """Initialize hybrid optimizer"""
+    def __init__(self, google_project_id: str = None, google_credentials_path: str = None, verbose: bool = True):
+        """Initialize hybrid optimizer (verbose=False silences per-solve progress output)"""
         
         # Initialize optimizers
         if GOOGLE_CLOUD_AVAILABLE:
             try:
-                self.google_optimizer = GoogleCloudRouteOptimizer(google_project_id, google_credentials_path)
+                self.google_optimizer = GoogleCloudRouteOptimizer(google_project_id, google_credentials_path, verbose=verbose)
             except Exception as e:
                 print(f"⚠️ Failed to initialize Google Cloud optimizer: {e}")
                 self.google_optimizer = None
         else:
             self.google_optimizer = None
             
-        self.custom_optimizer = RouteOptimizer()
+        self.custom_optimizer = RouteOptimizer(verbose=verbose)
         
         # Configuration
         self.prefer_google_cloud = True and (self.google_optimizer is not None)
         self.max_packages_for_google = 100  # Limit for cost control
+        self.split_oversize_problems = settings.SPLIT_OVERSIZE_PROBLEMS  # Split instead of falling back
         self.comparison_mode = False  # Set to True to compare both algorithms
+        self.comparison_max_packages = 100
+        self.comparison_candidates = ['google_cloud', 'custom', 'greedy_local_search']
+        
+        # Shadow mode: re-run a candidate algorithm on a sample of live requests after
+        # the response is sent. A small dedicated pool caps the extra CPU; work is
+        # dropped rather than queued when every shadow worker is busy.
+        self.shadow_algorithm = settings.SHADOW_ALGORITHM or None
+        self.shadow_sample_rate = settings.SHADOW_SAMPLE_RATE
+        self.shadow_ortools_time_limit_s = settings.SHADOW_ORTOOLS_TIME_LIMIT_S
+        self._shadow_executor = ThreadPoolExecutor(max_workers=settings.SHADOW_MAX_WORKERS, thread_name_prefix='shadow')
+        self._shadow_slots = threading.BoundedSemaphore(settings.SHADOW_MAX_WORKERS)
+        self._shadow_counts = {'submitted': 0, 'dropped_busy': 0, 'completed': 0, 'failed': 0}
+        self._shadow_lock = threading.Lock()  # Shadow runs update the counts from executor threads
+        
+        # Latency SLA: fraction of the budget a strategy's p99 may use, and the
+        # shortest OR-Tools search worth starting
+        self.latency_safety_factor = 0.8
+        self.min_ortools_time_limit_s = 0.5
+        self.max_ortools_time_limit_s = 45
+        
+        # Hedging: race the local solver against the remote call instead of
+        # waiting for the remote call to fail before falling back
+        self.hedging_enabled = settings.HYBRID_HEDGING
+        self.hedge_grace_ms = settings.HYBRID_HEDGE_GRACE_MS
+        self.hedge_local_strategy = 'greedy_local_search'
         
         logger.info("🔧 Hybrid Route Optimizer initialized")
         logger.info(f"   - Google Cloud API: {'✅ Available' if self.google_optimizer and self.google_optimizer.is_available() else '❌ Not available'}")
         logger.info(f"   - Custom Algorithm: ✅ Available")
     
-    def optimize_route(self, packages: List[Dict], depot_location: Dict = None, force_algorithm: str = None) -> Dict:
+    def optimize_route(self, packages: List[Dict], depot_location: Dict = None, force_algorithm: str = None,
+                       latency_budget_ms: float = None, cancel_token=None) -> Dict:
         """
         Optimize route using hybrid approach
         
         Args:
             packages: List of package dictionaries
             depot_location: Starting depot location
-            force_algorithm: Force specific algorithm ('google' or 'custom')
+            force_algorithm: Force specific algorithm ('google', 'custom', 'greedy',
+                             'greedy_local_search' or 'ortools')
+            latency_budget_ms: Latency SLA; picks the best strategy whose p99 fits
+            cancel_token: Stops a local solve early (raises OptimizationCancelled)
             
         Returns:
             Optimized route result with algorithm metadata
         """
         
         # Determine which algorithm to use
-        algorithm_to_use = self._select_algorithm(packages, force_algorithm)
+        algorithm_to_use, fallback_reason = self._select_algorithm(packages, force_algorithm, latency_budget_ms)
+        time_limit_s = self._ortools_time_limit(len(packages), latency_budget_ms) if algorithm_to_use == 'ortools' else None
         
         logger.info(f"🎯 Using {algorithm_to_use} algorithm for {len(packages)} packages")
         
         try:
-            if algorithm_to_use == 'google':
-                result = self._optimize_with_google(packages, depot_location)
-            else:
-                result = self._optimize_with_custom(packages, depot_location)
-            
-            # Add hybrid metadata
-            result['hybrid_metadata'] = {
-                'algorithm_used': algorithm_to_use,
-                'google_cloud_available': self.google_optimizer.is_available(),
-                'package_count': len(packages),
-                'optimization_timestamp': str(datetime.now()),
-                'fallback_reason': getattr(self, '_fallback_reason', None)
-            }
+            started = time.perf_counter()
+            result = self._run_algorithm(algorithm_to_use, packages, depot_location, time_limit_s, cancel_token)
+            if cancel_token:
+                cancel_token.raise_if_cancelled()
+            result = self._finish_result(result, algorithm_to_use, packages, started, latency_budget_ms, time_limit_s,
+                                         fallback_reason)
+            request_capture.record(packages, depot_location, result)
             
             # Optional: Compare algorithms if in comparison mode
-            if self.comparison_mode and len(packages) <= 20:
+            if self.comparison_mode and len(packages) <= self.comparison_max_packages:
                 comparison_result = self._compare_algorithms(packages, depot_location)
                 result['algorithm_comparison'] = comparison_result
             
             return result
             
+        except OptimizationCancelled:
+            logger.info(f"🛑 Optimization cancelled ({algorithm_to_use})")
+            raise
         except Exception as e:
             logger.error(f"❌ Hybrid optimization failed: {e}")
             
             # Emergency fallback to custom algorithm
-            if algorithm_to_use == 'google':
+            if algorithm_to_use in ('google', 'google_split'):
+                logger.warning("🔄 Falling back to custom algorithm due to Google Cloud error")
+                result = self._optimize_with_custom(packages, depot_location, cancel_token=cancel_token)
+                return self._finish_result(result, 'custom', packages, started, latency_budget_ms,
+                                           fallback_reason=f"Google Cloud error: {str(e)}", record_latency=False)
+            else:
+                raise
+    
+    async def optimize_route_async(self, packages: List[Dict], depot_location: Dict = None, force_algorithm: str = None,
+                                   latency_budget_ms: float = None, hedge: bool = None, cancel_token=None) -> Dict:
+        """
+        Async variant of optimize_route for async endpoints
+        
+        Remote solves are awaited on the shared async Fleet Routing client; local
+        (CPU-bound) strategies run in a worker thread so the event loop stays free.
+        With hedging (hedge=True or hedging_enabled), a remote solve is raced
+        against the local solver. Cancelling the awaiting task cancels remote
+        calls; cancel_token additionally stops a local solve in its thread
+        (OptimizationCancelled is raised).
+        """
+        algorithm_to_use, fallback_reason = self._select_algorithm(packages, force_algorithm, latency_budget_ms)
+        time_limit_s = self._ortools_time_limit(len(packages), latency_budget_ms) if algorithm_to_use == 'ortools' else None
+        hedge = self.hedging_enabled if hedge is None else hedge
+        
+        logger.info(f"🎯 Using {algorithm_to_use} algorithm for {len(packages)} packages (async{', hedged' if hedge and algorithm_to_use == 'google' else ''})")
+        
+        try:
+            started = time.perf_counter()
+            if algorithm_to_use == 'google_split':
+                deadline_s = latency_budget_ms / 1000 if latency_budget_ms else None
+                result = await self._optimize_split_async(packages, depot_location, deadline_s)
+            elif algorithm_to_use == 'google':
+                deadline_s = latency_budget_ms / 1000 if latency_budget_ms else None
+                if hedge:
+                    result, algorithm_to_use = await self._optimize_hedged(packages, depot_location, deadline_s, cancel_token)
+                else:
+                    result = await self._optimize_with_google_async(packages, depot_location, deadline_s)
+            else:
+                result = await asyncio.to_thread(
+                    self._run_algorithm, algorithm_to_use, packages, depot_location, time_limit_s, cancel_token
+                )
+            if cancel_token:
+                cancel_token.raise_if_cancelled()
+            result = self._finish_result(result, algorithm_to_use, packages, started, latency_budget_ms, time_limit_s,
+                                         fallback_reason)
+            if request_capture.enabled:
+                await asyncio.to_thread(request_capture.record, packages, depot_location, result)
+            
+            if self.comparison_mode and len(packages) <= self.comparison_max_packages:
+                result['algorithm_comparison'] = await self._compare_algorithms_async(packages, depot_location)
+            
+            return result
+            
+        except OptimizationCancelled:
+            logger.info(f"🛑 Optimization cancelled ({algorithm_to_use})")
+            raise
+        except Exception as e:
+            logger.error(f"❌ Hybrid optimization failed: {e}")
+            
+            if algorithm_to_use in ('google', 'google_split'):
                 logger.warning("🔄 Falling back to custom algorithm due to Google Cloud error")
-                self._fallback_reason = f"Google Cloud error: {str(e)}"
-                return self._optimize_with_custom(packages, depot_location)
+                result = await asyncio.to_thread(
+                    self._optimize_with_custom, packages, depot_location, cancel_token=cancel_token
+                )
+                return self._finish_result(result, 'custom', packages, started, latency_budget_ms,
+                                           fallback_reason=f"Google Cloud error: {str(e)}", record_latency=False)
             else:
                 raise
     
-    def _select_algorithm(self, packages: List[Dict], force_algorithm: str = None) -> str:
-        """Select which algorithm to use based on conditions"""
+    async def _optimize_hedged(self, packages: List[Dict], depot_location: Dict = None,
+                               deadline_s: float = None, cancel_token=None):
+        """
+        Race the local solver against the remote solver
         
+        Both start immediately. The first acceptable result wins; if the other
+        finishes within the grace window the shorter route is returned instead.
+        With nothing acceptable by the deadline, the local solve gets one more
+        grace window and then TimeoutError is raised (the caller falls back to
+        the greedy heuristic).
+        The loser is cancelled: the remote call through its task, the local
+        solve through its own child cancellation token.
+        
+        Returns:
+            (result, algorithm name of the winner)
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (deadline_s or settings.FLEET_ROUTING_TIMEOUT_S)
+        local_algorithm = self.hedge_local_strategy
+        
+        local_token = cancel_token.child() if cancel_token else CancellationToken()
+        local_task = asyncio.create_task(asyncio.to_thread(
+            self._optimize_with_custom, packages, depot_location, strategy=local_algorithm, cancel_token=local_token
+        ))
+        remote_task = asyncio.create_task(self._optimize_with_google_async(packages, depot_location, deadline_s))
+        names = {local_task: local_algorithm, remote_task: 'google'}
+        
+        def acceptable(task) -> bool:
+            if task.cancelled() or task.exception() is not None:
+                return False
+            # The remote optimizer swallows its own errors into a fallback route
+            return task.result().get('api_used') != 'fallback_simulation'
+        
+        pending = {local_task, remote_task}
+        winners = []
+        try:
+            while pending and not winners:
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(0.0, deadline - loop.time()), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    break  # deadline reached with nothing acceptable
+                winners = [task for task in done if acceptable(task)]
+            
+            if winners and pending:
+                # Grace window: give the runner-up a chance to beat the first result
+                grace_s = min(self.hedge_grace_ms / 1000, max(0.0, deadline - loop.time()))
+                done, pending = await asyncio.wait(pending, timeout=grace_s)
+                winners += [task for task in done if acceptable(task)]
+            
+            if not winners:
+                # Nothing acceptable in time: the local result is always usable, but only
+                # wait for it up to the deadline plus the grace window
+                pending.discard(local_task)
+                winner = local_task
+                wait_s = max(0.0, deadline - loop.time()) + self.hedge_grace_ms / 1000
+                try:
+                    result = await asyncio.wait_for(local_task, timeout=wait_s)
+                except asyncio.TimeoutError:
+                    local_token.cancel('hedge deadline')
+                    raise asyncio.TimeoutError("Hedged optimization produced no result within its deadline")
+            else:
+                winner = min(winners, key=lambda task: self._path_length_km(task.result()))
+                result = winner.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            if local_task in pending:
+                local_token.cancel('hedge lost')
+        
+        result['hedge_metadata'] = {
+            'winner': names[winner],
+            'candidates': {
+                names[task]: round(self._path_length_km(task.result()), 3) if task.done() and acceptable(task) else None
+                for task in (local_task, remote_task)
+            },
+            'cancelled': [names[task] for task in pending],
+            'grace_ms': self.hedge_grace_ms
+        }
+        logger.info(f"🏁 Hedged optimization won by {names[winner]}")
+        return result, names[winner]
+    
+    def _path_length_km(self, result: Dict) -> float:
+        """Depot-to-last-stop length, comparable across local and remote results"""
+        return sum(stop.get('distance_from_previous_m') or 0 for stop in result['optimized_stops']) / 1000
+    
+    def _finish_result(self, result: Dict, algorithm: str, packages: List[Dict], started: float,
+                       latency_budget_ms: float = None, time_limit_s: float = None,
+                       fallback_reason: str = None, record_latency: bool = True) -> Dict:
+        """Record the latency sample and attach hybrid metadata"""
+        latency_ms = (time.perf_counter() - started) * 1000
+        if record_latency:
+            latency_stats.record(self._strategy_key(algorithm), len(packages), latency_ms)
+        
+        # Add hybrid metadata
+        result['hybrid_metadata'] = {
+            'algorithm_used': algorithm,
+            'google_cloud_available': bool(self.google_optimizer and self.google_optimizer.is_available()),
+            'package_count': len(packages),
+            'optimization_timestamp': str(datetime.now()),
+            'fallback_reason': fallback_reason,
+            'latency_budget_ms': latency_budget_ms,
+            'latency_ms': round(latency_ms, 1),
+            'ortools_time_limit_s': time_limit_s,
+            'hedge': result.pop('hedge_metadata', None)
+        }
+        return result
+    
+    def _select_algorithm(self, packages: List[Dict], force_algorithm: str = None,
+                          latency_budget_ms: float = None) -> Tuple[str, Optional[str]]:
+        """
+        Select which algorithm to use based on conditions
+        
+        Returns:
+            (algorithm, fallback reason or None); the reason is returned rather
+            than stored because one optimizer instance serves concurrent requests
+        """
         # Force specific algorithm if requested
         if force_algorithm:
             if force_algorithm == 'google' and (not self.google_optimizer or not self.google_optimizer.is_available()):
                 logger.warning("⚠️ Google Cloud forced but not available, using custom")
-                self._fallback_reason = "Google Cloud forced but not available"
-                return 'custom'
-            return force_algorithm
+                return 'custom', "Google Cloud forced but not available"
+            if force_algorithm == 'google' and self._remote_circuit_open():
+                return 'custom', f"Google Cloud circuit {fleet_routing_breaker.state}"
+            return force_algorithm, None
+        
+        # Latency SLA: pick the best strategy whose p99 fits the budget
+        if latency_budget_ms is not None:
+            return self._select_for_latency_budget(len(packages), latency_budget_ms)
         
         # Check if Google Cloud is available
         if not self.google_optimizer or not self.google_optimizer.is_available():
-            self._fallback_reason = "Google Cloud API not available"
-            return 'custom'
+            return 'custom', "Google Cloud API not available"
+        
+        # Skip the remote API while its circuit is open instead of waiting for a timeout
+        if self._remote_circuit_open():
+            return 'custom', f"Google Cloud circuit {fleet_routing_breaker.state}"
         
         # Check package count limit for cost control
+        if len(packages) > self.max_packages_for_google and self.split_oversize_problems and self.prefer_google_cloud:
+            logger.info(f"✂️ {len(packages)} packages > {self.max_packages_for_google} limit, splitting into chunks")
+            return 'google_split', None
+        
         if len(packages) > self.max_packages_for_google:
-            self._fallback_reason = f"Package count ({len(packages)}) exceeds Google Cloud limit ({self.max_packages_for_google})"
             logger.info(f"📊 Using custom algorithm: {len(packages)} packages > {self.max_packages_for_google} limit")
-            return 'custom'
+            return 'custom', f"Package count ({len(packages)}) exceeds Google Cloud limit ({self.max_packages_for_google})"
         
         # Use Google Cloud by default
         if self.prefer_google_cloud:
-            return 'google'
+            return 'google', None
         else:
-            return 'custom'
+            return 'custom', None
+    
+    def _remote_circuit_open(self) -> bool:
+        """Whether the circuit breaker currently rejects remote calls"""
+        if not self.google_optimizer or not self.google_optimizer.use_real_api:
+            return False  # local simulation makes no remote calls
+        if fleet_routing_breaker.available():
+            return False
+        logger.warning(f"🔌 Remote optimizer circuit {fleet_routing_breaker.state}, using custom")
+        return True
+    
+    def _google_eligible(self, package_count: int) -> bool:
+        """Whether the remote solver may be used for this many packages"""
+        return (self.prefer_google_cloud and self.google_optimizer is not None
+                and self.google_optimizer.is_available() and package_count <= self.max_packages_for_google
+                and not self._remote_circuit_open())
+    
+    def _select_for_latency_budget(self, package_count: int, latency_budget_ms: float) -> Tuple[str, Optional[str]]:
+        """Choose the highest-quality strategy whose expected p99 stays under the budget"""
+        usable_ms = latency_budget_ms * self.latency_safety_factor
+        
+        # Highest quality first: remote solver, OR-Tools, greedy + 2-opt, greedy
+        if self._google_eligible(package_count):
+            if latency_stats.estimate_p99('google', package_count) <= usable_ms:
+                return 'google', None
+        
+        if self._ortools_time_limit(package_count, latency_budget_ms) is not None:
+            return 'ortools', None
+        
+        if latency_stats.estimate_p99('greedy_local_search', package_count) <= usable_ms:
+            return 'greedy_local_search', None
+        
+        return 'greedy', f"Latency budget {latency_budget_ms:.0f}ms only fits the greedy heuristic"
+    
+    def _ortools_time_limit(self, package_count: int, latency_budget_ms: float = None) -> Optional[float]:
+        """OR-Tools search time (s) that keeps total latency within the budget, None if too small"""
+        if latency_budget_ms is None:
+            return None
+        usable_ms = latency_budget_ms * self.latency_safety_factor - ortools_setup_ms(package_count)
+        time_limit_s = min(usable_ms / 1000, self.max_ortools_time_limit_s)
+        if time_limit_s < self.min_ortools_time_limit_s:
+            return None
+        return round(time_limit_s, 2)
+    
+    def _strategy_key(self, algorithm: str) -> str:
+        """Latency statistics key for an algorithm name"""
+        return 'greedy' if algorithm == 'custom' else algorithm
+    
+    def _run_algorithm(self, algorithm: str, packages: List[Dict], depot_location: Dict, time_limit_s: float = None,
+                       cancel_token=None) -> Dict:
+        """Dispatch to the selected algorithm"""
+        if algorithm == 'google':
+            return self._optimize_with_google(packages, depot_location)
+        if algorithm == 'google_split':
+            return self._optimize_split(packages, depot_location)
+        strategy = self._strategy_key(algorithm)
+        return self._optimize_with_custom(packages, depot_location, strategy=strategy, time_limit_s=time_limit_s,
+                                          cancel_token=cancel_token)
     
     def _optimize_with_google(self, packages: List[Dict], depot_location: Dict) -> Dict:
         """Optimize using Google Cloud Route Optimization API"""
@@ -152,25 +439,122 @@ class HybridRouteOptimizer:
             logger.error(f"❌ Google Cloud optimization failed: {e}")
             raise
     
-    def _optimize_with_custom(self, packages: List[Dict], depot_location: Dict = None) -> Dict:
+    async def _optimize_with_google_async(self, packages: List[Dict], depot_location: Dict, deadline_s: float = None) -> Dict:
+        """Optimize using the async Google Cloud client (awaited, no worker thread held)"""
+        result = await self.google_optimizer.optimize_route_async(packages, depot_location, deadline_s=deadline_s)
+        result['algorithm_details'] = {
+            'name': 'Google Cloud Route Optimization',
+            'version': 'Production API',
+            'features': ['Real-time traffic', 'Vehicle constraints', 'Time windows', 'Multi-objective optimization'],
+            'accuracy': 'Professional grade',
+            'cost_per_request': 'Variable based on complexity'
+        }
+        logger.info(f"✅ Google Cloud optimization: {result['total_distance_km']:.1f}km, {result['total_duration_minutes']:.0f}min")
+        return result
+    
+    async def _optimize_split_async(self, packages: List[Dict], depot_location: Dict = None,
+                                    deadline_s: float = None) -> Dict:
+        """
+        Solve an oversize problem as chunks under max_packages_for_google
+        
+        Chunks are solved concurrently by the remote optimizer (each chunk falls
+        back locally on its own if the remote call fails), then stitched into a
+        single route and smoothed with 2-opt around the chunk boundaries.
+        """
+        depot_location = depot_location or {
+            'latitude': 41.0082,
+            'longitude': 28.9784,
+            'address': 'Istanbul Merkez Depo'
+        }
+        chunks = split_packages(packages, self.max_packages_for_google, depot_location)
+        chunk_results = await self.google_optimizer.optimize_routes_batch(
+            dict(enumerate(chunks)), depot_location, deadline_s=deadline_s
+        )
+        return await asyncio.to_thread(self._stitch_split_result, chunks, chunk_results, depot_location)
+    
+    def _optimize_split(self, packages: List[Dict], depot_location: Dict = None, deadline_s: float = None) -> Dict:
+        """
+        Blocking variant of _optimize_split_async for worker threads
+        
+        Chunks go to the sync client from a small thread pool, so no event
+        loop (and no per-loop async client) is created per call.
+        """
+        depot_location = depot_location or {
+            'latitude': 41.0082,
+            'longitude': 28.9784,
+            'address': 'Istanbul Merkez Depo'
+        }
+        chunks = split_packages(packages, self.max_packages_for_google, depot_location)
+        workers = max(1, min(len(chunks), settings.FLEET_ROUTING_BATCH_CONCURRENCY))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='split-chunk') as pool:
+            outcomes = list(pool.map(
+                lambda chunk: self.google_optimizer.optimize_route(chunk, depot_location, deadline_s), chunks
+            ))
+        return self._stitch_split_result(chunks, dict(enumerate(outcomes)), depot_location)
+    
+    def _stitch_split_result(self, chunks: List[List[Dict]], chunk_results: Dict, depot_location: Dict) -> Dict:
+        """Stitch the chunk routes, smooth the boundaries and re-time the whole route"""
+        chunk_routes = [[stop['package'] for stop in chunk_results[i]['optimized_stops']] for i in range(len(chunks))]
+        stitched, junctions = stitch_routes(chunk_routes, depot_location)
+        smoothed = smooth_boundaries(stitched, junctions, depot_location)
+        
+        optimized_stops = self._custom_stops_to_hybrid(smoothed, depot_location)
+        clock_minutes = 8 * 60  # Chunk timings no longer apply after stitching: recompute from 08:00
+        for stop in optimized_stops:
+            clock_minutes += stop['duration_from_previous_s'] / 60
+            stop['arrival_time'] = f"{int(clock_minutes) // 60:02d}:{int(clock_minutes) % 60:02d}"
+            clock_minutes += SPLIT_SERVICE_TIME_MIN
+        total_distance_km = sum(stop['distance_from_previous_m'] for stop in optimized_stops) / 1000
+        logger.info(f"✅ Split optimization: {len(chunks)} chunks, {total_distance_km:.1f}km")
+        
+        return {
+            'optimized_stops': optimized_stops,
+            'total_distance_km': total_distance_km,
+            # Same clock as the arrival times: driving plus service time at every stop
+            'total_duration_minutes': clock_minutes - 8 * 60,
+            'optimization_score': min(result.get('optimization_score', 0) for result in chunk_results.values()),
+            'api_used': 'google_cloud_split',
+            'depot_location': depot_location,
+            'optimization_metadata': {
+                'chunks': [
+                    {'packages': len(chunk), 'api_used': chunk_results[i]['api_used']}
+                    for i, chunk in enumerate(chunks)
+                ],
+                'boundaries_smoothed': len(junctions)
+            },
+            'algorithm_details': {
+                'name': 'Google Cloud Route Optimization (split)',
+                'version': 'Production API',
+                'features': ['Geographic splitting', 'Concurrent chunk solving', 'Boundary 2-opt smoothing'],
+                'accuracy': 'Professional grade per chunk',
+                'cost_per_request': f"{len(chunks)} requests"
+            }
+        }
+    
+    def _optimize_with_custom(self, packages: List[Dict], depot_location: Dict = None,
+                              strategy: str = 'greedy', time_limit_s: float = None, cancel_token=None) -> Dict:
         """Optimize using custom algorithm"""
         
         try:
+            depot_location = depot_location or {
+                'latitude': 41.0082,
+                'longitude': 28.9784,
+                'address': 'Istanbul Merkez Depo'
+            }
+            
             # Use existing custom optimizer
-            result = self.custom_optimizer.optimize_route(packages)
+            result = self.custom_optimizer.optimize_route(packages, depot_location, strategy=strategy,
+                                                          time_limit_s=time_limit_s, cancel_token=cancel_token)
             
             # Convert to hybrid format
             hybrid_result = {
-                'optimized_stops': result['optimized_route'],
-                'total_distance_km': result['total_distance_km'],
-                'total_duration_minutes': result.get('total_duration_minutes', result['total_distance_km'] * 2),  # Estimate
+                'optimized_stops': self._custom_stops_to_hybrid(result['stops'], depot_location),
+                'total_distance_km': result['total_distance'],
+                'total_duration_minutes': result.get('estimated_duration', result['total_distance'] * 2),  # Estimate
                 'optimization_score': result.get('optimization_score', 0),
                 'api_used': 'custom_hybrid',
-                'depot_location': depot_location or {
-                    'latitude': 41.0082,
-                    'longitude': 28.9784,
-                    'address': 'Istanbul Merkez Depo'
-                },
+                'depot_location': depot_location,
+                'optimization_metadata': result.get('optimization_metadata', {}),
                 'algorithm_details': {
                     'name': 'Custom Hybrid Algorithm',
                     'version': '2.0',
@@ -183,74 +567,236 @@ class HybridRouteOptimizer:
             logger.info(f"✅ Custom optimization: {hybrid_result['total_distance_km']:.1f}km, {hybrid_result['total_duration_minutes']:.0f}min")
             return hybrid_result
             
+        except OptimizationCancelled:
+            raise
         except Exception as e:
             logger.error(f"❌ Custom optimization failed: {e}")
             raise
     
-    def _compare_algorithms(self, packages: List[Dict], depot_location: Dict) -> Dict:
-        """Compare Google Cloud vs Custom algorithm performance"""
+    def _custom_stops_to_hybrid(self, stops: List[Dict], depot_location: Dict) -> List[Dict]:
+        """Convert custom optimizer stops to the Google-style optimized_stops format"""
+        optimized_stops = []
+        prev_lat, prev_lng = depot_location['latitude'], depot_location['longitude']
+        for stop in stops:
+            if stop.get('kargo_id') == 'DEPOT':
+                continue
+            segment_km = haversine_km(float(prev_lat), float(prev_lng), float(stop['latitude']), float(stop['longitude']))
+            optimized_stops.append({
+                'package': stop,
+                'sequence': len(optimized_stops) + 1,
+                'arrival_time': stop.get('estimated_arrival'),
+                'departure_time': None,
+                'distance_from_previous_m': segment_km * 1000,
+                'duration_from_previous_s': segment_km * 120  # 30 km/h city speed
+            })
+            prev_lat, prev_lng = stop['latitude'], stop['longitude']
+        return optimized_stops
+    
+    def _compare_algorithms(self, packages: List[Dict], depot_location: Dict,
+                            source: str = 'comparison') -> Dict:
+        """
+        Blocking variant of _compare_algorithms_async for worker threads
+        
+        Candidates run concurrently in a small thread pool; the remote one uses
+        the shared sync client, so no event loop is created per comparison.
+        """
+        logger.info("🔬 Running algorithm comparison...")
+        comparison = self._new_comparison(packages)
+        candidates = self._comparison_candidate_names()
+        with ThreadPoolExecutor(max_workers=max(1, len(candidates)), thread_name_prefix='compare') as pool:
+            outcomes = list(pool.map(
+                lambda name: self._run_comparison_candidate(name, packages, depot_location), candidates
+            ))
+        comparison['algorithms'] = dict(zip(candidates, outcomes))
+        self._analyze_comparison(comparison)
+        comparison['comparison_id'] = benchmark_store.record_comparison(comparison, source)
+        logger.info(f"🔬 Algorithm comparison completed")
+        return comparison
+    
+    async def _compare_algorithms_async(self, packages: List[Dict], depot_location: Dict,
+                                        source: str = 'comparison') -> Dict:
+        """
+        Run every comparison candidate concurrently and persist the measurements
         
+        Remote candidates are awaited; local ones run in worker threads. Each
+        candidate's wall time, distance, duration and time-window violations are
+        stored in the benchmark store.
+        """
         logger.info("🔬 Running algorithm comparison...")
+        comparison = self._new_comparison(packages)
         
-        comparison = {
+        async def run_candidate(name: str) -> Dict:
+            if name != 'google_cloud':
+                return await asyncio.to_thread(self._run_comparison_candidate, name, packages, depot_location)
+            started = time.perf_counter()
+            try:
+                result = await self.google_optimizer.optimize_route_async(packages, depot_location)
+                return self._comparison_success(result, started)
+            except Exception as e:
+                return self._comparison_failure(e, started)
+        
+        candidates = self._comparison_candidate_names()
+        outcomes = await asyncio.gather(*(run_candidate(name) for name in candidates))
+        comparison['algorithms'] = dict(zip(candidates, outcomes))
+        self._analyze_comparison(comparison)
+        comparison['comparison_id'] = await asyncio.to_thread(benchmark_store.record_comparison, comparison, source)
+        logger.info(f"🔬 Algorithm comparison completed")
+        return comparison
+    
+    def _new_comparison(self, packages: List[Dict]) -> Dict:
+        return {
             'timestamp': str(datetime.now()),
             'package_count': len(packages),
             'algorithms': {}
         }
-        
-        # Test Google Cloud
-        try:
-            google_start = time.time()
-            google_result = self.google_optimizer.optimize_route(packages, depot_location)
-            google_time = time.time() - google_start
-            
-            comparison['algorithms']['google_cloud'] = {
-                'status': 'success',
-                'distance_km': google_result['total_distance_km'],
-                'duration_minutes': google_result['total_duration_minutes'],
-                'processing_time_seconds': google_time,
-                'optimization_score': google_result.get('optimization_score', 0)
-            }
-        except Exception as e:
-            comparison['algorithms']['google_cloud'] = {
-                'status': 'failed',
-                'error': str(e)
-            }
-        
-        # Test Custom
+    
+    def _comparison_candidate_names(self) -> List[str]:
+        return [name for name in self.comparison_candidates
+                if name != 'google_cloud' or self.google_optimizer is not None]
+    
+    def _run_comparison_candidate(self, name: str, packages: List[Dict], depot_location: Dict) -> Dict:
+        """Run one comparison candidate (blocking) and measure it"""
+        started = time.perf_counter()
         try:
-            custom_start = time.time()
-            custom_result = self.custom_optimizer.optimize_route(packages)
-            custom_time = time.time() - custom_start
-            
-            comparison['algorithms']['custom'] = {
-                'status': 'success',
-                'distance_km': custom_result['total_distance_km'],
-                'duration_minutes': custom_result.get('total_duration_minutes', custom_result['total_distance_km'] * 2),
-                'processing_time_seconds': custom_time,
-                'optimization_score': custom_result.get('optimization_score', 0)
-            }
+            if name == 'google_cloud':
+                result = self.google_optimizer.optimize_route(packages, depot_location)
+            else:
+                strategy = 'greedy' if name == 'custom' else name
+                result = self._optimize_with_custom(packages, depot_location, strategy)
+            return self._comparison_success(result, started)
         except Exception as e:
-            comparison['algorithms']['custom'] = {
-                'status': 'failed',
-                'error': str(e)
-            }
-        
-        # Calculate improvements
-        if (comparison['algorithms']['google_cloud'].get('status') == 'success' and 
-            comparison['algorithms']['custom'].get('status') == 'success'):
-            
-            google_dist = comparison['algorithms']['google_cloud']['distance_km']
-            custom_dist = comparison['algorithms']['custom']['distance_km']
+            return self._comparison_failure(e, started)
+    
+    def _comparison_success(self, result: Dict, started: float) -> Dict:
+        return {
+            'status': 'success',
+            'distance_km': result['total_distance_km'],
+            'path_distance_km': self._path_length_km(result),
+            'duration_minutes': result['total_duration_minutes'],
+            'processing_time_seconds': time.perf_counter() - started,
+            'optimization_score': result.get('optimization_score', 0),
+            'violations': self._count_window_violations(result),
+            'api_used': result.get('api_used'),
+            'cache_hit': bool(result.get('optimization_metadata', {}).get('cache_hit'))
+        }
+    
+    def _comparison_failure(self, error: Exception, started: float) -> Dict:
+        return {
+            'status': 'failed',
+            'error': str(error),
+            'processing_time_seconds': time.perf_counter() - started
+        }
+    
+    def _analyze_comparison(self, comparison: Dict):
+        """Calculate improvements of the remote optimizer over the greedy baseline"""
+        google_run = comparison['algorithms'].get('google_cloud', {})
+        custom_run = comparison['algorithms'].get('custom', {})
+        if google_run.get('status') == 'success' and custom_run.get('status') == 'success':
+            google_dist = google_run['path_distance_km']
+            custom_dist = custom_run['path_distance_km']
             
             comparison['improvement_analysis'] = {
-                'distance_improvement_percent': ((custom_dist - google_dist) / custom_dist) * 100,
+                'distance_improvement_percent': ((custom_dist - google_dist) / custom_dist) * 100 if custom_dist else 0.0,
                 'google_cloud_better': google_dist < custom_dist,
                 'distance_savings_km': custom_dist - google_dist
             }
+    
+    def _count_window_violations(self, result: Dict) -> int:
+        """Stops whose arrival time falls outside the package's delivery window"""
+        violations = 0
+        for stop in result['optimized_stops']:
+            package = stop.get('package') or {}
+            arrival = stop.get('arrival_time')
+            window_start = package.get('time_window_start')
+            window_end = package.get('time_window_end')
+            if not arrival or not (window_start or window_end):
+                continue
+            if (window_start and arrival < window_start) or (window_end and arrival > window_end):
+                violations += 1
+        return violations
+    
+    def maybe_shadow(self, packages: List[Dict], depot_location: Dict, primary_result: Dict) -> bool:
+        """
+        Queue a shadow run of the candidate algorithm for a sampled request
         
-        logger.info(f"🔬 Algorithm comparison completed")
-        return comparison
+        Meant to be called after the response has been sent (e.g. from a
+        BackgroundTask). Returns True when a shadow run was started.
+        """
+        primary_algorithm = primary_result.get('hybrid_metadata', {}).get('algorithm_used')
+        if not self.shadow_algorithm or not packages or self.shadow_algorithm == primary_algorithm:
+            return False
+        if random.random() >= self.shadow_sample_rate:
+            return False
+        if not self._shadow_slots.acquire(blocking=False):
+            self._count_shadow('dropped_busy')
+            return False
+        
+        self._count_shadow('submitted')
+        try:
+            self._shadow_executor.submit(self._run_shadow, list(packages), depot_location, primary_result, primary_algorithm)
+        except RuntimeError:
+            self._shadow_slots.release()  # executor shut down
+            return False
+        return True
+    
+    def _count_shadow(self, outcome: str):
+        with self._shadow_lock:
+            self._shadow_counts[outcome] += 1
+    
+    def _shadow_counts_snapshot(self) -> Dict:
+        with self._shadow_lock:
+            return dict(self._shadow_counts)
+    
+    def _run_shadow(self, packages: List[Dict], depot_location: Dict, primary_result: Dict, primary_algorithm: str):
+        """Run the shadow candidate and store it side by side with the production result"""
+        candidate = self.shadow_algorithm
+        try:
+            started = time.perf_counter()
+            try:
+                if candidate == 'google':
+                    result = self._optimize_with_google(packages, depot_location)
+                else:
+                    time_limit_s = self.shadow_ortools_time_limit_s if candidate == 'ortools' else None
+                    result = self._optimize_with_custom(packages, depot_location, self._strategy_key(candidate), time_limit_s)
+                candidate_run = {
+                    'status': 'success',
+                    'distance_km': result['total_distance_km'],
+                    'path_distance_km': self._path_length_km(result),
+                    'duration_minutes': result['total_duration_minutes'],
+                    'processing_time_seconds': time.perf_counter() - started,
+                    'violations': self._count_window_violations(result),
+                    'cache_hit': bool(result.get('optimization_metadata', {}).get('cache_hit'))
+                }
+                self._count_shadow('completed')
+            except Exception as e:
+                candidate_run = {'status': 'failed', 'error': str(e), 'processing_time_seconds': time.perf_counter() - started}
+                self._count_shadow('failed')
+            
+            primary_latency_ms = primary_result.get('hybrid_metadata', {}).get('latency_ms')
+            comparison = {
+                'timestamp': str(datetime.now()),
+                'package_count': len(packages),
+                'algorithms': {
+                    primary_algorithm: {
+                        'status': 'success',
+                        'distance_km': primary_result['total_distance_km'],
+                        'path_distance_km': self._path_length_km(primary_result),
+                        'duration_minutes': primary_result['total_duration_minutes'],
+                        'processing_time_seconds': primary_latency_ms / 1000 if primary_latency_ms is not None else None,
+                        'violations': self._count_window_violations(primary_result),
+                        'cache_hit': bool(primary_result.get('optimization_metadata', {}).get('cache_hit'))
+                    },
+                    candidate: candidate_run
+                }
+            }
+            benchmark_store.record_comparison(comparison, source='shadow')
+            logger.info(f"👥 Shadow {candidate} vs {primary_algorithm}: "
+                        f"{candidate_run.get('path_distance_km', float('nan')):.1f}km vs "
+                        f"{comparison['algorithms'][primary_algorithm]['path_distance_km']:.1f}km")
+        except Exception as e:
+            logger.error(f"❌ Shadow evaluation failed: {e}")
+        finally:
+            self._shadow_slots.release()
     
     def get_status(self) -> Dict:
         """Get current status of hybrid optimizer"""
@@ -268,8 +814,21 @@ class HybridRouteOptimizer:
             'configuration': {
                 'prefer_google_cloud': self.prefer_google_cloud,
                 'max_packages_for_google': self.max_packages_for_google,
-                'comparison_mode': self.comparison_mode
-            }
+                'split_oversize_problems': self.split_oversize_problems,
+                'comparison_mode': self.comparison_mode,
+                'latency_safety_factor': self.latency_safety_factor,
+                'hedging_enabled': self.hedging_enabled,
+                'hedge_grace_ms': self.hedge_grace_ms
+            },
+            'latency_stats': latency_stats.summary(),
+            'circuit_breaker': fleet_routing_breaker.status(),
+            'request_capture': request_capture.status(),
+            'shadow': {
+                'algorithm': self.shadow_algorithm,
+                'sample_rate': self.shadow_sample_rate,
+                **self._shadow_counts_snapshot()
+            },
+            'remote_cache': self.google_optimizer.get_cache_stats() if self.google_optimizer else None
         }
     
     def configure(self, **kwargs):
@@ -280,9 +839,27 @@ class HybridRouteOptimizer:
         if 'max_packages_for_google' in kwargs:
             self.max_packages_for_google = kwargs['max_packages_for_google']
         
+        if 'split_oversize_problems' in kwargs:
+            self.split_oversize_problems = kwargs['split_oversize_problems']
+        
+        if 'shadow_algorithm' in kwargs:
+            self.shadow_algorithm = kwargs['shadow_algorithm']
+        
+        if 'shadow_sample_rate' in kwargs:
+            self.shadow_sample_rate = max(0.0, min(1.0, float(kwargs['shadow_sample_rate'])))
+        
         if 'comparison_mode' in kwargs:
             self.comparison_mode = kwargs['comparison_mode']
         
+        if 'latency_safety_factor' in kwargs:
+            self.latency_safety_factor = kwargs['latency_safety_factor']
+        
+        if 'hedging_enabled' in kwargs:
+            self.hedging_enabled = kwargs['hedging_enabled']
+        
+        if 'hedge_grace_ms' in kwargs:
+            self.hedge_grace_ms = kwargs['hedge_grace_ms']
+        
         logger.info(f"🔧 Hybrid optimizer reconfigured: {kwargs}")
 
 
@@ -0,0 +1,168 @@
+"""
+Accelerated Route Kernels
+Hot inner loops of the optimizers (distance, route evaluation, 2-opt moves).
+Numba-compiled when numba is installed, pure Python / NumPy otherwise.
+"""
+
+import math
+import logging
+from typing import List, Sequence
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    njit = None
+    NUMBA_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0
+
+
+# ---------------------------------------------------------------------------
+# Reference implementations (also the source compiled by numba)
+# ---------------------------------------------------------------------------
+
+def py_haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in kilometres"""
+    lat1 = math.radians(lat1)
+    lon1 = math.radians(lon1)
+    lat2 = math.radians(lat2)
+    lon2 = math.radians(lon2)
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, a)))
+
+
+def np_distance_matrix_km(latitudes, longitudes) -> np.ndarray:
+    """Vectorized great-circle distance matrix in kilometres"""
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+    a = (np.sin((lat[:, None] - lat[None, :]) / 2) ** 2
+         + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin((lon[:, None] - lon[None, :]) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def py_route_length_km(order, matrix, closed: bool) -> float:
+    """Length of a route visiting nodes in `order`, optionally returning to order[0]"""
+    total = 0.0
+    for k in range(len(order) - 1):
+        total += matrix[order[k]][order[k + 1]]
+    if closed and len(order) > 1:
+        total += matrix[order[len(order) - 1]][order[0]]
+    return total
+
+
+def py_two_opt_delta(order, matrix, i: int, j: int, closed: bool) -> float:
+    """Change in length when reversing order[i..j] (1 <= i < j)"""
+    n = len(order)
+    a = order[i - 1]
+    b = order[i]
+    c = order[j]
+    if j + 1 < n:
+        d = order[j + 1]
+    elif closed:
+        d = order[0]
+    else:
+        return matrix[a][c] - matrix[a][b]
+    return matrix[a][c] + matrix[b][d] - matrix[a][b] - matrix[c][d]
+
+
+def py_two_opt(order, matrix, closed: bool, max_passes: int):
+    """First-improvement 2-opt keeping order[0] (the depot) fixed"""
+    n = len(order)
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, n - 1):
+            for j in range(i + 1, n):
+                a = order[i - 1]
+                b = order[i]
+                c = order[j]
+                if j + 1 < n:
+                    d = order[j + 1]
+                    delta = matrix[a][c] + matrix[b][d] - matrix[a][b] - matrix[c][d]
+                elif closed:
+                    d = order[0]
+                    delta = matrix[a][c] + matrix[b][d] - matrix[a][b] - matrix[c][d]
+                else:
+                    delta = matrix[a][c] - matrix[a][b]
+                if delta < -1e-9:
+                    order[i:j + 1] = order[i:j + 1][::-1].copy()
+                    improved = True
+        if not improved:
+            break
+    return order
+
+
+# ---------------------------------------------------------------------------
+# Numba-compiled variants
+# ---------------------------------------------------------------------------
+
+if NUMBA_AVAILABLE:
+    nb_haversine_km = njit(cache=True)(py_haversine_km)
+
+    @njit(cache=True)
+    def nb_distance_matrix_km(latitudes, longitudes):
+        n = len(latitudes)
+        matrix = np.zeros((n, n))
+        for i in range(n):
+            for j in range(i + 1, n):
+                distance = nb_haversine_km(latitudes[i], longitudes[i], latitudes[j], longitudes[j])
+                matrix[i, j] = distance
+                matrix[j, i] = distance
+        return matrix
+
+    nb_route_length_km = njit(cache=True)(py_route_length_km)
+    nb_two_opt_delta = njit(cache=True)(py_two_opt_delta)
+    nb_two_opt = njit(cache=True)(py_two_opt)
+
+
+# ---------------------------------------------------------------------------
+# Public kernels (selected at import time)
+# ---------------------------------------------------------------------------
+
+KERNEL_BACKEND = 'numba' if NUMBA_AVAILABLE else 'python'
+
+if NUMBA_AVAILABLE:
+    haversine_km = nb_haversine_km
+else:
+    haversine_km = py_haversine_km
+
+
+def distance_matrix_km(latitudes, longitudes) -> np.ndarray:
+    """Great-circle distance matrix (km) for parallel latitude/longitude sequences"""
+    if NUMBA_AVAILABLE:
+        return nb_distance_matrix_km(np.asarray(latitudes, dtype=np.float64), np.asarray(longitudes, dtype=np.float64))
+    return np_distance_matrix_km(latitudes, longitudes)
+
+
+def route_length_km(order: Sequence[int], matrix, closed: bool = True) -> float:
+    """Evaluate a route given as node indices into `matrix`"""
+    if NUMBA_AVAILABLE:
+        return float(nb_route_length_km(np.asarray(order, dtype=np.int64), np.asarray(matrix, dtype=np.float64), closed))
+    rows = matrix.tolist() if isinstance(matrix, np.ndarray) else matrix
+    return py_route_length_km(list(order), rows, closed)
+
+
+def two_opt_delta(order: Sequence[int], matrix, i: int, j: int, closed: bool = True) -> float:
+    """Length change of the 2-opt move reversing order[i..j]"""
+    if NUMBA_AVAILABLE:
+        return float(nb_two_opt_delta(np.asarray(order, dtype=np.int64), np.asarray(matrix, dtype=np.float64), i, j, closed))
+    rows = matrix.tolist() if isinstance(matrix, np.ndarray) else matrix
+    return py_two_opt_delta(list(order), rows, i, j, closed)
+
+
+def two_opt(order: Sequence[int], matrix, closed: bool = True, max_passes: int = 50) -> List[int]:
+    """Improve a route with 2-opt moves, keeping the first node fixed"""
+    if len(order) < 4 - (0 if closed else 1):
+        return list(order)
+    if NUMBA_AVAILABLE:
+        improved = nb_two_opt(np.array(order, dtype=np.int64), np.asarray(matrix, dtype=np.float64), closed, max_passes)
+        return [int(node) for node in improved]
+    rows = matrix.tolist() if isinstance(matrix, np.ndarray) else [list(row) for row in matrix]
+    return py_two_opt(list(order), rows, closed, max_passes)
+
+
+logger.info(f"🧮 Route kernels backend: {KERNEL_BACKEND}")
@@ -0,0 +1,88 @@
+"""
+Optimizer Latency Statistics
+Rolling per-strategy, per-instance-size latency samples used to pick the
+best strategy that fits a caller's latency budget
+"""
+
+import logging
+import threading
+from collections import defaultdict, deque
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Upper edges of the package-count buckets
+SIZE_BUCKETS = (10, 25, 50, 100, 200)
+
+# Conservative p99 guesses (ms) used until enough samples are recorded
+PRIOR_LATENCY_MS = {
+    'greedy': lambda n: 20 + 2.0 * n,
+    'greedy_local_search': lambda n: 40 + 4.0 * n,
+    'google': lambda n: 3000 + 40.0 * n,
+}
+
+
+def ortools_setup_ms(package_count: int) -> float:
+    """Fixed cost of building an OR-Tools model on top of its search time limit"""
+    return 50 + 1.0 * package_count
+
+
+def size_bucket(package_count: int) -> str:
+    """Label of the size bucket a package count falls into"""
+    lower = 0
+    for upper in SIZE_BUCKETS:
+        if package_count <= upper:
+            return f"{lower + 1}-{upper}"
+        lower = upper
+    return f"{SIZE_BUCKETS[-1] + 1}+"
+
+
+class LatencyStats:
+    """Thread-safe rolling latency samples keyed by (strategy, size bucket)"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._lock = threading.Lock()
+
+    def record(self, strategy: str, package_count: int, latency_ms: float):
+        """Record one optimization latency"""
+        with self._lock:
+            self._samples[(strategy, size_bucket(package_count))].append(latency_ms)
+
+    def percentile(self, strategy: str, package_count: int, q: float = 0.99) -> Optional[float]:
+        """Observed latency percentile, or None if there are too few samples"""
+        with self._lock:
+            samples = sorted(self._samples.get((strategy, size_bucket(package_count)), ()))
+        if len(samples) < self.min_samples:
+            return None
+        index = min(len(samples) - 1, int(round(q * (len(samples) - 1))))
+        return samples[index]
+
+    def estimate_p99(self, strategy: str, package_count: int) -> float:
+        """Observed p99 when available, otherwise the prior estimate"""
+        observed = self.percentile(strategy, package_count, 0.99)
+        if observed is not None:
+            return observed
+        prior = PRIOR_LATENCY_MS.get(strategy)
+        return prior(package_count) if prior else float('inf')
+
+    def summary(self) -> Dict:
+        """p50/p99 and sample count for every recorded (strategy, bucket)"""
+        with self._lock:
+            snapshot = {key: sorted(values) for key, values in self._samples.items()}
+        result = defaultdict(dict)
+        for (strategy, bucket), samples in snapshot.items():
+            if not samples:
+                continue
+            result[strategy][bucket] = {
+                'samples': len(samples),
+                'p50_ms': round(samples[len(samples) // 2], 1),
+                'p99_ms': round(samples[min(len(samples) - 1, int(round(0.99 * (len(samples) - 1))))], 1)
+            }
+        return dict(result)
+
+
+# Global instance
+latency_stats = LatencyStats()
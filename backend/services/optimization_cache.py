@@ -0,0 +1,139 @@
+"""
+Remote Optimization Response Cache
+Content-addressed cache of Fleet Routing responses keyed by a hash of the
+normalized request, kept in memory (LRU) and optionally on disk, with a TTL
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from google.protobuf.json_format import MessageToDict
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def request_fingerprint(message) -> str:
+    """SHA-256 of a request proto in canonical form (sorted keys, no whitespace)"""
+    pb = type(message).pb(message) if hasattr(type(message), 'pb') else message
+    normalized = json.dumps(MessageToDict(pb), sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+class OptimizationCache:
+    """Thread-safe TTL cache of serialized responses (memory LRU + optional disk store)"""
+
+    def __init__(self, ttl_s: float = 900, max_entries: int = 512, directory: Optional[str] = None):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.directory = directory
+        self._entries = OrderedDict()  # key -> (expires_at, payload)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Cached payload for key, or None when missing or expired"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry:
+                del self._entries[key]
+
+        payload = self._read_disk(key, now)
+        with self._lock:
+            if payload is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._remember(key, payload, now)
+        return payload
+
+    def put(self, key: str, payload: bytes):
+        """Store a payload in memory and, when configured, on disk"""
+        with self._lock:
+            self._remember(key, payload, time.time())
+        self._write_disk(key, payload)
+
+    def clear(self):
+        """Drop every in-memory entry and reset counters (disk files expire on their own)"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'ttl_s': self.ttl_s,
+                'disk_store': self.directory
+            }
+
+    def _remember(self, key: str, payload: bytes, now: float):
+        """Insert into the LRU (caller holds the lock)"""
+        self._entries[key] = (now + self.ttl_s, payload)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.bin")
+
+    def _read_disk(self, key: str, now: float) -> Optional[bytes]:
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            if os.path.getmtime(path) + self.ttl_s <= now:
+                os.remove(path)
+                return None
+            with open(path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"⚠️ Optimization cache read failed: {e}")
+            return None
+
+    def _write_disk(self, key: str, payload: bytes):
+        if not self.directory:
+            return
+        try:
+            # Write-then-rename so concurrent readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            logger.warning(f"⚠️ Optimization cache write failed: {e}")
+
+
+# Global instance
+optimization_cache = OptimizationCache(
+    ttl_s=settings.OPTIMIZATION_CACHE_TTL_S,
+    max_entries=settings.OPTIMIZATION_CACHE_MAX_ENTRIES,
+    directory=settings.OPTIMIZATION_CACHE_DIR or None
+)
@@ -0,0 +1,115 @@
+"""
+Problem Splitter
+Partitions oversize routing problems into geographically coherent chunks
+that fit a per-request size limit, and stitches the per-chunk routes back
+into one tour with 2-opt smoothing around the chunk boundaries
+"""
+
+import logging
+import math
+from typing import List, Dict, Tuple
+
+import numpy as np
+
+from .clustering import capacitated_clusters
+from .kernels import distance_matrix_km, py_two_opt_delta
+
+logger = logging.getLogger(__name__)
+
+
+def split_packages(packages: List[Dict], max_chunk_size: int, depot_location: Dict) -> List[List[Dict]]:
+    """
+    Split packages into compact chunks of at most max_chunk_size stops
+
+    Chunks are returned in visiting order: a nearest-neighbour tour over the
+    chunk centroids starting from the depot.
+    """
+    if len(packages) <= max_chunk_size:
+        return [list(packages)]
+
+    chunks = capacitated_clusters(packages, max_stops=max_chunk_size, depot_location=depot_location)
+    centroids = [
+        (float(np.mean([p['latitude'] for p in chunk])), float(np.mean([p['longitude'] for p in chunk])))
+        for chunk in chunks
+    ]
+
+    ordered = []
+    remaining = list(range(len(chunks)))
+    position = (depot_location['latitude'], depot_location['longitude'])
+    while remaining:
+        nearest = min(remaining, key=lambda c: math.dist(position, centroids[c]))
+        ordered.append(chunks[nearest])
+        position = centroids[nearest]
+        remaining.remove(nearest)
+
+    logger.info(f"✂️ Split {len(packages)} packages into {len(chunks)} chunks of ≤{max_chunk_size}")
+    return ordered
+
+
+def stitch_routes(chunk_routes: List[List[Dict]], depot_location: Dict) -> Tuple[List[Dict], List[int]]:
+    """
+    Concatenate per-chunk stop sequences into one route
+
+    Each chunk is traversed forwards or backwards, whichever starts closer to
+    where the previous chunk ended.
+
+    Returns:
+        (stitched stops, index in the stitched route where each later chunk starts)
+    """
+    stitched = []
+    junctions = []
+    end = (depot_location['latitude'], depot_location['longitude'])
+
+    for route in chunk_routes:
+        if not route:
+            continue
+        first, last = route[0], route[-1]
+        if math.dist(end, (last['latitude'], last['longitude'])) < math.dist(end, (first['latitude'], first['longitude'])):
+            route = list(reversed(route))
+        if stitched:
+            junctions.append(len(stitched))
+        stitched.extend(route)
+        end = (route[-1]['latitude'], route[-1]['longitude'])
+
+    return stitched, junctions
+
+
+def smooth_boundaries(stops: List[Dict], junctions: List[int], depot_location: Dict,
+                      window: int = 8, max_passes: int = 5) -> List[Dict]:
+    """
+    2-opt restricted to a window of stops around each chunk boundary
+
+    Only segments lying inside a window are reversed, so the interior of each
+    chunk route (as solved) is left untouched.
+    """
+    if not junctions or len(stops) < 3:
+        return stops
+
+    nodes = [depot_location] + stops
+    matrix = distance_matrix_km(
+        [node['latitude'] for node in nodes],
+        [node['longitude'] for node in nodes]
+    ).tolist()
+    order = list(range(len(nodes)))
+    n = len(order)
+
+    improvement_km = 0.0
+    for junction in junctions:
+        # +1: position 0 of `order` is the depot
+        low = max(1, junction + 1 - window)
+        high = min(n - 1, junction + window)
+        for _ in range(max_passes):
+            improved = False
+            for i in range(low, high):
+                for j in range(i + 1, high + 1):
+                    delta = py_two_opt_delta(order, matrix, i, j, False)
+                    if delta < -1e-9:
+                        order[i:j + 1] = order[i:j + 1][::-1]
+                        improvement_km -= delta
+                        improved = True
+            if not improved:
+                break
+
+    if improvement_km > 0:
+        logger.info(f"🧵 Boundary smoothing saved {improvement_km:.2f} km")
+    return [nodes[index] for index in order[1:]]
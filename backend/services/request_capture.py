@@ -0,0 +1,118 @@
+"""
+Optimizer Request Capture
+Opt-in recording of anonymized optimizer inputs and outputs as gzip-compressed
+JSONL, used as a replay corpus for tuning (see replay_captures.py)
+"""
+
+import gzip
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def anonymize_packages(packages: List[Dict], precision: int) -> List[Dict]:
+    """Strip identities, keep only what the optimizers use (coordinates rounded)"""
+    return [
+        {
+            'latitude': round(float(package['latitude']), precision),
+            'longitude': round(float(package['longitude']), precision),
+            'delivery_type': package.get('delivery_type', 'standard'),
+            'time_window_start': package.get('time_window_start'),
+            'time_window_end': package.get('time_window_end'),
+            'scheduled_hour': package.get('scheduled_hour'),
+            'weight': package.get('weight')
+        }
+        for package in packages
+    ]
+
+
+def captured_order(packages: List[Dict], result: Dict) -> List[int]:
+    """Visiting order of a result as indices into the captured package list"""
+    index_by_id = {package.get('id'): index for index, package in enumerate(packages)}
+    order = []
+    for stop in result.get('optimized_stops', []):
+        index = index_by_id.get((stop.get('package') or {}).get('id'))
+        if index is not None:
+            order.append(index)
+    return order
+
+
+class RequestCapture:
+    """Appends one JSON line per optimization to a daily gzip file"""
+
+    def __init__(self, directory: str, enabled: bool = False, precision: int = 3):
+        self.directory = directory
+        self.enabled = enabled
+        self.precision = precision
+        self.records = 0
+        self._lock = threading.Lock()
+
+    def path_for(self, day: datetime) -> str:
+        return os.path.join(self.directory, f"captures-{day:%Y%m%d}.jsonl.gz")
+
+    def record(self, packages: List[Dict], depot_location: Optional[Dict], result: Dict):
+        """Capture an optimizer input/output pair (no-op unless enabled)"""
+        if not self.enabled or not packages:
+            return
+        try:
+            hybrid = result.get('hybrid_metadata', {})
+            depot = depot_location or {'latitude': 41.0082, 'longitude': 28.9784}
+            record = {
+                'captured_at': datetime.now().isoformat(timespec='seconds'),
+                'depot': {
+                    'latitude': round(float(depot['latitude']), self.precision),
+                    'longitude': round(float(depot['longitude']), self.precision)
+                },
+                'packages': anonymize_packages(packages, self.precision),
+                'output': {
+                    'algorithm': hybrid.get('algorithm_used'),
+                    'api_used': result.get('api_used'),
+                    'latency_ms': hybrid.get('latency_ms'),
+                    'total_distance_km': result.get('total_distance_km'),
+                    'order': captured_order(packages, result)
+                }
+            }
+            line = json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+            with self._lock:
+                os.makedirs(self.directory, exist_ok=True)
+                # Appending creates a new gzip member; readers see one continuous stream
+                with gzip.open(self.path_for(datetime.now()), 'at', encoding='utf-8') as f:
+                    f.write(line)
+                self.records += 1
+        except Exception as e:
+            logger.warning(f"⚠️ Request capture failed: {e}")
+
+    def status(self) -> Dict:
+        return {'enabled': self.enabled, 'directory': self.directory, 'records_written': self.records}
+
+
+def read_captures(paths: List[str]):
+    """Yield capture records from .jsonl.gz files or directories containing them"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(
+                os.path.join(path, name) for name in os.listdir(path) if name.endswith('.jsonl.gz')
+            ))
+        else:
+            files.append(path)
+    for file_path in files:
+        with gzip.open(file_path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+# Global instance
+request_capture = RequestCapture(
+    settings.OPTIMIZER_CAPTURE_DIR,
+    enabled=settings.OPTIMIZER_CAPTURE_ENABLED,
+    precision=settings.OPTIMIZER_CAPTURE_PRECISION
+)
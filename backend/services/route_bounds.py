@@ -0,0 +1,155 @@
+"""
+Route Lower Bounds
+Fast lower bounds on tour length (MST / Held-Karp 1-tree) used to report
+optimality gaps and to stop solvers early on easy instances
+"""
+
+import logging
+from typing import List, Dict, Optional
+
+import numpy as np
+
+from .kernels import distance_matrix_km
+
+logger = logging.getLogger(__name__)
+
+def haversine_matrix(locations: List[Dict]) -> np.ndarray:
+    """Great-circle distance matrix (km) for a list of locations"""
+    return distance_matrix_km(
+        [loc['latitude'] for loc in locations],
+        [loc['longitude'] for loc in locations]
+    )
+
+
+def _minimum_spanning_tree(matrix: np.ndarray, nodes: np.ndarray):
+    """Prim's algorithm over the given node subset, returns (weight, degrees)"""
+    n = len(matrix)
+    degrees = np.zeros(n, dtype=int)
+    if len(nodes) < 2:
+        return 0.0, degrees
+
+    sub = matrix[np.ix_(nodes, nodes)]
+    m = len(nodes)
+    in_tree = np.zeros(m, dtype=bool)
+    in_tree[0] = True
+    best_cost = sub[0].copy()
+    best_parent = np.zeros(m, dtype=int)
+    weight = 0.0
+
+    for _ in range(m - 1):
+        candidates = np.where(in_tree, np.inf, best_cost)
+        j = int(np.argmin(candidates))
+        weight += float(candidates[j])
+        degrees[nodes[j]] += 1
+        degrees[nodes[best_parent[j]]] += 1
+        in_tree[j] = True
+
+        closer = sub[j] < best_cost
+        best_cost = np.where(closer, sub[j], best_cost)
+        best_parent = np.where(closer, j, best_parent)
+
+    return weight, degrees
+
+
+def mst_lower_bound(matrix: np.ndarray) -> float:
+    """MST weight: a lower bound for any Hamiltonian path through all nodes"""
+    weight, _ = _minimum_spanning_tree(matrix, np.arange(len(matrix)))
+    return weight
+
+
+def one_tree_lower_bound(matrix: np.ndarray, iterations: int = 50, upper_bound: float = None) -> float:
+    """
+    Held-Karp 1-tree bound with subgradient ascent on node penalties
+
+    Args:
+        matrix: Symmetric distance matrix, node 0 is the depot
+        iterations: Maximum subgradient steps
+        upper_bound: Known tour length used for Polyak step sizes (optional)
+
+    Returns:
+        Lower bound for the closed tour visiting every node
+    """
+    n = len(matrix)
+    if n < 2:
+        return 0.0
+    if n == 2:
+        return 2 * float(matrix[0][1])
+
+    if upper_bound is None:
+        upper_bound = 2 * mst_lower_bound(matrix)
+
+    pi = np.zeros(n)
+    others = np.arange(1, n)
+    best_bound = 0.0
+    step_scale = 2.0
+    stalled = 0
+
+    for _ in range(iterations):
+        costs = matrix + pi[:, None] + pi[None, :]
+
+        weight, degrees = _minimum_spanning_tree(costs, others)
+        depot_edges = np.argsort(costs[0, 1:])[:2] + 1
+        weight += float(costs[0, depot_edges].sum())
+        degrees[0] = 2
+        degrees[depot_edges] += 1
+
+        bound = weight - 2 * float(pi.sum())
+        if bound > best_bound + 1e-9:
+            best_bound = bound
+            stalled = 0
+        else:
+            stalled += 1
+            if stalled >= 5:
+                step_scale /= 2
+                stalled = 0
+
+        subgradient = degrees - 2
+        norm = float((subgradient ** 2).sum())
+        if norm == 0:
+            # The 1-tree is a tour, so the bound is tight
+            break
+        if step_scale < 1e-4:
+            break
+
+        step = step_scale * max(upper_bound - bound, 1e-6) / norm
+        pi += step * subgradient
+
+    return best_bound
+
+
+def compute_route_bounds(depot_location: Dict, packages: List[Dict], iterations: int = 50) -> Dict[str, float]:
+    """
+    Lower bounds for a route that starts at the depot and visits every package
+
+    Returns:
+        {'tour_km': bound for routes returning to the depot,
+         'path_km': bound for routes ending at the last stop}
+    """
+    locations = [depot_location] + [p for p in packages if p.get('latitude') is not None and p.get('longitude') is not None]
+    if len(locations) < 2:
+        return {'tour_km': 0.0, 'path_km': 0.0}
+
+    matrix = haversine_matrix(locations)
+    path_bound = mst_lower_bound(matrix)
+    tour_bound = max(one_tree_lower_bound(matrix, iterations=iterations), path_bound)
+
+    return {'tour_km': tour_bound, 'path_km': path_bound}
+
+
+def optimality_gap(route_length: float, lower_bound: float) -> Optional[float]:
+    """Relative gap between a route length and its lower bound (0.0 = proven optimal)"""
+    if route_length is None or lower_bound is None or route_length <= 0:
+        return None
+    return max(0.0, (route_length - lower_bound) / route_length)
+
+
+def bound_metadata(route_length: float, bounds: Dict[str, float], closed_tour: bool) -> Dict:
+    """Metadata block describing the bound and gap for a returned route"""
+    lower_bound = bounds['tour_km'] if closed_tour else bounds['path_km']
+    gap = optimality_gap(route_length, lower_bound)
+    return {
+        'lower_bound_km': round(lower_bound, 3),
+        'bound_type': 'held_karp_1_tree' if closed_tour else 'minimum_spanning_tree',
+        'optimality_gap': round(gap, 4) if gap is not None else None,
+        'optimality_gap_percent': round(gap * 100, 2) if gap is not None else None
+    }
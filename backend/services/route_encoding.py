@@ -0,0 +1,99 @@
+"""
+Compact Route Encoding
+Encoded polylines and a columnar, dictionary-coded route payload for clients
+on slow mobile connections
+"""
+
+from typing import List, Dict, Tuple
+
+COMPACT_FORMAT_VERSION = 'compact-v1'
+
+# Dictionary for delivery type codes (index = code)
+DELIVERY_TYPE_CODES = ['depot', 'express', 'scheduled', 'standard']
+
+MINIMAL_STOP_FIELDS = ('package_id', 'kargo_id', 'estimated_arrival')
+FULL_STOP_FIELDS = MINIMAL_STOP_FIELDS + ('address', 'recipient_name', 'time_window_start', 'time_window_end')
+
+
+def _encode_value(value: int) -> str:
+    """One signed integer in Google's polyline encoding"""
+    value = ~(value << 1) if value < 0 else value << 1
+    chunks = []
+    while value >= 0x20:
+        chunks.append(chr((0x20 | (value & 0x1f)) + 63))
+        value >>= 5
+    chunks.append(chr(value + 63))
+    return ''.join(chunks)
+
+
+def encode_polyline(coordinates: List[Tuple[float, float]], precision: int = 5) -> str:
+    """Encode (latitude, longitude) pairs with the Encoded Polyline Algorithm"""
+    factor = 10 ** precision
+    encoded = []
+    previous_lat = previous_lng = 0
+    for latitude, longitude in coordinates:
+        lat = int(round(latitude * factor))
+        lng = int(round(longitude * factor))
+        encoded.append(_encode_value(lat - previous_lat))
+        encoded.append(_encode_value(lng - previous_lng))
+        previous_lat, previous_lng = lat, lng
+    return ''.join(encoded)
+
+
+def decode_polyline(polyline: str, precision: int = 5) -> List[Tuple[float, float]]:
+    """Inverse of encode_polyline"""
+    factor = 10 ** precision
+    coordinates = []
+    index = lat = lng = 0
+    while index < len(polyline):
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                byte = ord(polyline[index]) - 63
+                index += 1
+                result |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lng += deltas[1]
+        coordinates.append((lat / factor, lng / factor))
+    return coordinates
+
+
+def compact_route(route: Dict, minimal: bool = False) -> Dict:
+    """
+    Columnar representation of an OptimizedRoute payload
+
+    Stop coordinates become one encoded polyline, delivery types become
+    indexes into `delivery_types`, and every other stop field is an array
+    aligned with the polyline points. `minimal` keeps only what the map and
+    stop list need (id, kargo id, type, ETA).
+    """
+    stops = route.get('stops', [])
+    fields = MINIMAL_STOP_FIELDS if minimal else FULL_STOP_FIELDS
+
+    columns = {field: [stop.get(field) for stop in stops] for field in fields}
+    columns['type'] = [
+        DELIVERY_TYPE_CODES.index(stop['delivery_type']) if stop.get('delivery_type') in DELIVERY_TYPE_CODES else -1
+        for stop in stops
+    ]
+
+    payload = {
+        'format': COMPACT_FORMAT_VERSION,
+        'route_id': route.get('route_id', route.get('id')),
+        'version': route.get('version'),
+        'route_date': route.get('route_date'),
+        'total_distance': round(route.get('total_distance') or 0, 3),
+        'estimated_duration': route.get('estimated_duration'),
+        'status': route.get('status'),
+        'delivery_types': DELIVERY_TYPE_CODES,
+        'polyline': encode_polyline([(stop['latitude'], stop['longitude']) for stop in stops]),
+        'stops': columns
+    }
+    if not minimal:
+        payload['message'] = route.get('message')
+        payload['optimization_metadata'] = route.get('optimization_metadata')
+    return payload
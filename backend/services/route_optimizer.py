@@ -1,44 +1,49 @@
 from ortools.constraint_solver import routing_enums_pb2
 from ortools.constraint_solver import pywrapcp
 import math
+from collections import OrderedDict
 from typing import List, Dict, Any
 from datetime import datetime, timedelta
 
+from config import settings
+from .route_bounds import compute_route_bounds, bound_metadata, optimality_gap, haversine_matrix
+from .exact_solver import held_karp_path, MAX_EXACT_STOPS
+from .clustering import capacitated_clusters
+from .kernels import haversine_km, distance_matrix_km, two_opt
+from .cancellation import OptimizationCancelled
+
 class RouteOptimizer:
     """AI-powered route optimization using Google OR-Tools"""
     
-    def __init__(self):
+    # Delay penalty (km per position) used when ordering stops inside a cluster
+    CLUSTER_PRIORITY_PENALTIES = {
+        'express': 0.5,
+        'scheduled': 0.2,
+        'standard': 0.0
+    }
+    CLUSTER_ORDER_CACHE_SIZE = 1024
+    
+    def __init__(self, verbose: bool = True):
         self.earth_radius = 6371  # Earth radius in kilometers
+        self._cluster_order_cache = OrderedDict()  # cluster membership -> optimal visit order
+        self.verbose = verbose  # Per-solve progress output; off for background planning
+    
+    def _debug(self, message: str):
+        if self.verbose:
+            print(message)
     
     def calculate_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         """Calculate distance between two points using Haversine formula"""
-        # Convert latitude and longitude from degrees to radians
-        lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
-        
-        # Haversine formula
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-        c = 2 * math.asin(math.sqrt(a))
-        
-        return self.earth_radius * c
+        return haversine_km(float(lat1), float(lon1), float(lat2), float(lon2))
     
     def create_distance_matrix(self, locations: List[Dict]) -> List[List[int]]:
         """Create distance matrix for all locations"""
-        n = len(locations)
-        distance_matrix = [[0] * n for _ in range(n)]
-        
-        for i in range(n):
-            for j in range(n):
-                if i != j:
-                    dist = self.calculate_distance(
-                        locations[i]['latitude'], locations[i]['longitude'],
-                        locations[j]['latitude'], locations[j]['longitude']
-                    )
-                    # Convert to meters and round to integer
-                    distance_matrix[i][j] = int(dist * 1000)
-        
-        return distance_matrix
+        matrix_km = distance_matrix_km(
+            [loc['latitude'] for loc in locations],
+            [loc['longitude'] for loc in locations]
+        )
+        # Convert to meters and round down to integer
+        return (matrix_km * 1000).astype(int).tolist()
     
     def get_delivery_priority(self, delivery_type: str) -> int:
         """Get priority score for delivery type (lower = higher priority)"""
@@ -59,37 +64,83 @@ class RouteOptimizer:
         except:
             return 0
     
-    def optimize_route(self, packages: List[Dict]) -> Dict[str, Any]:
-        """Optimize delivery route using HYBRID SMART ALGORITHM"""
+    # Strategies callers can request, from fastest to highest quality
+    STRATEGIES = ('greedy', 'greedy_local_search', 'ortools')
+    
+    DEFAULT_DEPOT = {
+        'id': 0,
+        'kargo_id': 'DEPOT',
+        'address': 'Kadıköy Kargo Merkezi, Moda Caddesi No:1, Kadıköy, İstanbul',
+        'recipient_name': 'Kargo Merkezi',
+        'delivery_type': 'depot',
+        'latitude': 40.9877,    # Kadıköy merkez koordinat
+        'longitude': 29.0283    # Kadıköy merkez koordinat
+    }
+    
+    def optimize_route(self, packages: List[Dict], depot_location: Dict = None,
+                       strategy: str = 'greedy', time_limit_s: float = None, cancel_token=None) -> Dict[str, Any]:
+        """
+        Optimize delivery route using HYBRID SMART ALGORITHM
+        
+        Args:
+            packages: List of package dictionaries
+            depot_location: Start/end location (default: Kadıköy Kargo Merkezi)
+            strategy: 'greedy' (clustering heuristic), 'greedy_local_search'
+                      (heuristic + 2-opt) or 'ortools' (guided local search)
+            time_limit_s: OR-Tools search time limit (default 45 s)
+            cancel_token: Optional CancellationToken; stops the search and raises OptimizationCancelled
+        """
         if not packages:
             return {'stops': [], 'total_distance': 0, 'estimated_duration': 0}
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown strategy '{strategy}', expected one of {self.STRATEGIES}")
 
-        # Add depot (Kadıköy Kargo Merkezi) - central location in Kadıköy
-        depot_location = {
-            'id': 0,
-            'kargo_id': 'DEPOT',
-            'address': 'Kadıköy Kargo Merkezi, Moda Caddesi No:1, Kadıköy, İstanbul',
-            'recipient_name': 'Kargo Merkezi',
-            'delivery_type': 'depot',
-            'latitude': 40.9877,    # Kadıköy merkez koordinat
-            'longitude': 29.0283    # Kadıköy merkez koordinat
-        }
+        # Add depot (Kadıköy Kargo Merkezi by default) - fill in display fields if missing
+        depot_location = {**self.DEFAULT_DEPOT, **(depot_location or {})}
 
         # Create locations list with depot first
         locations = [depot_location] + packages
 
-        # Use HYBRID optimization: Geographic clustering + Priority balancing
+        # Lower bounds let us report how far each route is from optimal
+        bounds = compute_route_bounds(depot_location, packages, iterations=settings.LOWER_BOUND_ITERATIONS)
+
         try:
-            return self.hybrid_smart_optimization(packages, depot_location)
+            if strategy == 'ortools':
+                result = self.ortools_optimization(locations, lower_bound_km=bounds['tour_km'],
+                                                   time_limit_s=time_limit_s, cancel_token=cancel_token)
+                closed_tour = False
+            else:
+                # Use HYBRID optimization: Geographic clustering + Priority balancing
+                result = self.hybrid_smart_optimization(packages, depot_location,
+                                                        local_search=(strategy == 'greedy_local_search'))
+                closed_tour = True  # Hybrid distance includes the return to depot
+            if cancel_token:
+                cancel_token.raise_if_cancelled()
+        except OptimizationCancelled:
+            raise
         except Exception as e:
-            print(f"Hybrid optimization failed: {str(e)}, using OR-Tools fallback...")
+            print(f"{strategy} optimization failed: {str(e)}, using OR-Tools fallback...")
             try:
-                return self.ortools_optimization(locations)
+                result = self.ortools_optimization(locations, lower_bound_km=bounds['tour_km'],
+                                                   time_limit_s=time_limit_s, cancel_token=cancel_token)
+                closed_tour = False
+            except OptimizationCancelled:
+                raise
             except Exception as e2:
                 print(f"OR-Tools also failed: {str(e2)}, using simple fallback...")
-                return self.fallback_optimization(packages, depot_location)
+                if cancel_token:
+                    cancel_token.raise_if_cancelled()
+                result = self.fallback_optimization(packages, depot_location)
+                closed_tour = False
 
-    def hybrid_smart_optimization(self, packages: List[Dict], depot_location: Dict) -> Dict[str, Any]:
+        result['optimization_metadata'] = {
+            **result.get('optimization_metadata', {}),
+            'strategy': strategy,
+            **bound_metadata(result['total_distance'], bounds, closed_tour)
+        }
+        return result
+
+    def hybrid_smart_optimization(self, packages: List[Dict], depot_location: Dict, local_search: bool = False) -> Dict[str, Any]:
         """HYBRID SMART ALGORITHM: Geography + Priority + Customer Satisfaction"""
         
         # STEP 1: GEOGRAPHIC CLUSTERING
@@ -99,18 +150,58 @@ class RouteOptimizer:
         # STEP 2: PRIORITY BALANCING WITHIN CLUSTERS
         optimized_clusters = []
         for cluster in clusters:
-            # Balance delivery types within each cluster
-            balanced_cluster = self.balance_delivery_types_in_cluster(cluster)
+            # Exact visit order within each cluster (priority-aware)
+            balanced_cluster = self.optimize_cluster_order(cluster)
             optimized_clusters.append(balanced_cluster)
         
         # STEP 3: CLUSTER ORDERING BY STRATEGIC FACTORS
         ordered_clusters = self.order_clusters_strategically(optimized_clusters, depot_location)
         
-        # STEP 4: FINAL ROUTE CONSTRUCTION
+        # STEP 4 (optional): 2-OPT IMPROVEMENT OF THE FULL TOUR
+        if local_search:
+            ordered_clusters = self.improve_with_two_opt(ordered_clusters, depot_location)
+        
+        # STEP 5: FINAL ROUTE CONSTRUCTION
         return self.construct_final_route(ordered_clusters, depot_location)
 
+    def improve_with_two_opt(self, ordered_clusters: List[List[Dict]], depot_location: Dict) -> List[List[Dict]]:
+        """Apply 2-opt to the concatenated tour, regrouping consecutive stops by their original cluster"""
+        stops = [package for cluster in ordered_clusters for package in cluster]
+        if len(stops) < 3:
+            return ordered_clusters
+        
+        cluster_of = {}
+        for cluster_index, cluster in enumerate(ordered_clusters):
+            for package in cluster:
+                cluster_of[id(package)] = cluster_index
+        
+        locations = [depot_location] + stops
+        matrix = distance_matrix_km(
+            [loc['latitude'] for loc in locations],
+            [loc['longitude'] for loc in locations]
+        )
+        order = two_opt(list(range(len(locations))), matrix, closed=True)
+        improved = [stops[node - 1] for node in order if node != 0]
+        
+        regrouped = []
+        for package in improved:
+            if regrouped and cluster_of[id(regrouped[-1][-1])] == cluster_of[id(package)]:
+                regrouped[-1].append(package)
+            else:
+                regrouped.append([package])
+        return regrouped
+
     def create_geographic_clusters(self, packages: List[Dict], depot_location: Dict) -> List[List[Dict]]:
-        """Group packages by geographic proximity (neighborhood-based clustering)"""
+        """Group packages into capacity-balanced geographic clusters"""
+        return capacitated_clusters(
+            packages,
+            max_stops=settings.CLUSTER_MAX_STOPS,
+            max_weight=settings.CLUSTER_MAX_WEIGHT or None,
+            depot_location=depot_location
+        )
+
+    def create_geographic_clusters_legacy(self, packages: List[Dict], depot_location: Dict) -> List[List[Dict]]:
+        """Group packages by geographic proximity (radius growth + split-and-requeue, kept for benchmarks)"""
         clusters = []
         remaining_packages = packages.copy()
         
@@ -168,6 +259,38 @@ class RouteOptimizer:
         
         return clusters
 
+    def optimize_cluster_order(self, cluster: List[Dict]) -> List[Dict]:
+        """Order stops inside a cluster optimally (Held-Karp), memoized by cluster membership"""
+        if len(cluster) <= 1:
+            return list(cluster)
+        if len(cluster) > MAX_EXACT_STOPS:
+            return self.balance_delivery_types_in_cluster(cluster)
+        
+        key = tuple(sorted(
+            (p['id'], p['latitude'], p['longitude'], p.get('delivery_type', 'standard'))
+            for p in cluster
+        ))
+        order = self._cluster_order_cache.get(key)
+        if order is not None:
+            self._cluster_order_cache.move_to_end(key)
+        else:
+            # Solve on the canonical ordering so the cached order is membership-based
+            canonical = sorted(cluster, key=lambda p: (p['id'], p['latitude'], p['longitude']))
+            matrix = haversine_matrix(canonical)
+            penalties = [
+                self.CLUSTER_PRIORITY_PENALTIES.get(str(p.get('delivery_type', 'standard')).lower(), 0.0)
+                for p in canonical
+            ]
+            path, _ = held_karp_path(matrix, penalties)
+            order = tuple(canonical[i]['id'] for i in path)
+            
+            self._cluster_order_cache[key] = order
+            if len(self._cluster_order_cache) > self.CLUSTER_ORDER_CACHE_SIZE:
+                self._cluster_order_cache.popitem(last=False)
+        
+        by_id = {p['id']: p for p in cluster}
+        return [by_id[package_id] for package_id in order]
+
     def balance_delivery_types_in_cluster(self, cluster: List[Dict]) -> List[Dict]:
         """Balance delivery types within a cluster for optimal customer satisfaction"""
         
@@ -207,7 +330,7 @@ class RouteOptimizer:
         remaining_clusters = clusters.copy()
         current_lat, current_lon = depot_location['latitude'], depot_location['longitude']
         
-        print(f"🗺️ Ordering {len(clusters)} clusters using hybrid distance+priority...")
+        self._debug(f"🗺️ Ordering {len(clusters)} clusters using hybrid distance+priority...")
         
         while remaining_clusters:
             # Calculate hybrid score for each cluster
@@ -277,9 +400,9 @@ class RouteOptimizer:
                 scheduled_count = cluster_types.count('scheduled')
                 standard_count = cluster_types.count('standard')
                 
-                print(f"🗺️ Selected cluster: {len(best_cluster)} packages")
-                print(f"   📦 Types: {express_count} Express, {scheduled_count} Scheduled, {standard_count} Standard")
-                print(f"   🎯 Score: {best_score:.3f} (Distance + Priority + Time)")
+                self._debug(f"🗺️ Selected cluster: {len(best_cluster)} packages")
+                self._debug(f"   📦 Types: {express_count} Express, {scheduled_count} Scheduled, {standard_count} Standard")
+                self._debug(f"   🎯 Score: {best_score:.3f} (Distance + Priority + Time)")
         
         return ordered_clusters
 
@@ -358,7 +481,7 @@ class RouteOptimizer:
         """Calculate the actual total distance following the route sequence"""
         total_distance = 0.0
         
-        print(f"🔍 DEBUG: Calculating distance for {len(route_stops)} stops")
+        self._debug(f"🔍 DEBUG: Calculating distance for {len(route_stops)} stops")
         
         for i in range(len(route_stops) - 1):
             current_stop = route_stops[i]
@@ -371,13 +494,13 @@ class RouteOptimizer:
             total_distance += distance
             
             # Debug ALL distances to find the problem
-            print(f"🔍 Distance {i} -> {i+1}: {distance:.2f} km ({current_stop.get('kargo_id', 'Unknown')} -> {next_stop.get('kargo_id', 'Unknown')})")
+            self._debug(f"🔍 Distance {i} -> {i+1}: {distance:.2f} km ({current_stop.get('kargo_id', 'Unknown')} -> {next_stop.get('kargo_id', 'Unknown')})")
             
             # Alert for suspiciously large distances
             if distance > 50:
-                print(f"⚠️  SUSPICIOUS DISTANCE: {distance:.2f} km!")
-                print(f"   From: {current_stop.get('kargo_id')} at ({current_stop['latitude']}, {current_stop['longitude']})")
-                print(f"   To: {next_stop.get('kargo_id')} at ({next_stop['latitude']}, {next_stop['longitude']})")
+                self._debug(f"⚠️  SUSPICIOUS DISTANCE: {distance:.2f} km!")
+                self._debug(f"   From: {current_stop.get('kargo_id')} at ({current_stop['latitude']}, {current_stop['longitude']})")
+                self._debug(f"   To: {next_stop.get('kargo_id')} at ({next_stop['latitude']}, {next_stop['longitude']})")
             
         # Add return to depot distance
         if len(route_stops) > 1:
@@ -388,9 +511,9 @@ class RouteOptimizer:
                 depot['latitude'], depot['longitude']
             )
             total_distance += return_distance
-            print(f"🔍 Return to depot: {return_distance:.2f} km")
+            self._debug(f"🔍 Return to depot: {return_distance:.2f} km")
             
-        print(f"🔍 TOTAL DISTANCE: {total_distance:.2f} km")
+        self._debug(f"🔍 TOTAL DISTANCE: {total_distance:.2f} km")
         return total_distance
 
 
@@ -408,7 +531,8 @@ class RouteOptimizer:
         )
         routing = pywrapcp.RoutingModel(manager)
         
-    def ortools_optimization(self, locations: List[Dict]) -> Dict[str, Any]:
+    def ortools_optimization(self, locations: List[Dict], lower_bound_km: float = None, time_limit_s: float = None,
+                             cancel_token=None) -> Dict[str, Any]:
         """Use OR-Tools for route optimization with delivery type constraints"""
         # Create distance matrix
         distance_matrix = self.create_distance_matrix(locations)
@@ -430,10 +554,19 @@ class RouteOptimizer:
         transit_callback_index = routing.RegisterTransitCallback(distance_callback)
         routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
         
-        # Add TIME WINDOW constraints for SCHEDULED deliveries
+        # Travel time in minutes (30 km/h city speed) plus 15 minutes service per delivery
+        def time_callback(from_index, to_index):
+            from_node = manager.IndexToNode(from_index)
+            to_node = manager.IndexToNode(to_index)
+            service_time = 15 if from_node > 0 else 0
+            return distance_matrix[from_node][to_node] // 500 + service_time
+        
+        time_callback_index = routing.RegisterTransitCallback(time_callback)
+        
+        # Add TIME WINDOW constraints for SCHEDULED deliveries (cumul 0 = 08:00)
         time_dimension_name = 'Time'
         routing.AddDimension(
-            transit_callback_index,
+            time_callback_index,
             30,    # allow waiting time (30 min slack)
             480,   # maximum time per vehicle (8 hours)
             False, # Don't force start cumul to zero
@@ -457,8 +590,10 @@ class RouteOptimizer:
                 
             elif delivery_type == 'scheduled':
                 # Scheduled: Must respect time windows
-                start_time = self.time_to_minutes(location.get('time_window_start', '09:00'))
-                end_time = self.time_to_minutes(location.get('time_window_end', '17:00'))
+                start_time = self.time_to_minutes(location.get('time_window_start') or '09:00') - 8 * 60
+                end_time = self.time_to_minutes(location.get('time_window_end') or '17:00') - 8 * 60
+                start_time = min(max(start_time, 0), 480)
+                end_time = min(max(end_time, start_time), 480)
                 time_dimension.CumulVar(node_index).SetRange(start_time, end_time)
                 # High penalty for not delivering
                 routing.AddDisjunction([node_index], 30000)
@@ -493,11 +628,23 @@ class RouteOptimizer:
         search_parameters.local_search_metaheuristic = (
             routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
         )
-        search_parameters.time_limit.FromSeconds(45)  # More time for complex optimization
+        # More time for complex optimization (45 s) unless the caller has a tighter budget
+        search_parameters.time_limit.FromMilliseconds(int((time_limit_s or 45) * 1000))
+        
+        # Stop as soon as the solution is provably close enough to optimal
+        if lower_bound_km:
+            self.add_gap_early_stop(routing, lower_bound_km * 1000, settings.OPTIMALITY_GAP_THRESHOLD)
+        
+        # Abandon the search as soon as the caller cancels
+        if cancel_token:
+            cancel_limit = self.add_cancellation_limit(routing, cancel_token)
         
         # Solve the problem
         solution = routing.SolveWithParameters(search_parameters)
         
+        if cancel_token:
+            cancel_token.raise_if_cancelled()
+        
         if solution:
             return self.extract_solution(manager, routing, solution, locations)
         else:
@@ -506,6 +653,29 @@ class RouteOptimizer:
             depot_location = locations[0]  # Get depot
             return self.fallback_optimization(packages, depot_location)
     
+    def add_gap_early_stop(self, routing, lower_bound_m: float, gap_threshold: float):
+        """Finish the OR-Tools search once the incumbent is within gap_threshold of the lower bound"""
+        
+        def on_solution():
+            objective = routing.CostVar().Max()
+            gap = optimality_gap(objective, lower_bound_m)
+            if gap is not None and gap <= gap_threshold:
+                self._debug(f"🎯 OR-Tools early stop: gap {gap * 100:.2f}% <= {gap_threshold * 100:.2f}%")
+                routing.solver().FinishCurrentSearch()
+        
+        routing.AddAtSolutionCallback(on_solution)
+    
+    def add_cancellation_limit(self, routing, cancel_token):
+        """
+        Search limit polled by OR-Tools throughout the search (unlike solution
+        callbacks, it also fires while no improving solution is found)
+        
+        The caller must keep the returned limit alive until the solve returns.
+        """
+        limit = routing.solver().CustomLimit(lambda: cancel_token.cancelled)
+        routing.AddSearchMonitor(limit)
+        return limit
+    
     def extract_solution(self, manager, routing, solution, locations) -> Dict[str, Any]:
         """Extract optimized route from OR-Tools solution"""
         route_stops = []
@@ -0,0 +1,292 @@
+"""
+Route Planner
+Shared route building/saving for the routes API, and batch pre-planning of
+routes for every courier for a target date across a process pool
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import or_
+
+from config import settings
+from models.package import Package, PackageStatus
+from models.delivery_route import DeliveryRoute
+from models.route_stop import DeliveryRouteStop, bulk_insert_route_stops
+from .route_versioning import package_set_version, route_fingerprint
+from .route_snapshot import encode_route_data, duplicate_of_latest
+from .event_broker import event_broker, ROUTE_UPDATED
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DEPOT = {
+    'latitude': 41.0082,
+    'longitude': 28.9784,
+    'address': 'Istanbul Merkez Depo'
+}
+
+
+def route_packages(db, courier_id: int, route_date: date) -> List[Package]:
+    """Active packages of a courier due on route_date (undated packages are due any day)"""
+    return db.query(Package).filter(
+        Package.courier_id == courier_id,
+        Package.status.in_([PackageStatus.PENDING, PackageStatus.IN_TRANSIT]),
+        or_(Package.delivery_date.is_(None), Package.delivery_date == route_date)
+    ).order_by(Package.id).all()
+
+
+def packages_to_optimizer_input(packages: List[Package]) -> List[Dict]:
+    """Optimizer package dicts; packages without coordinates are skipped"""
+    package_data = []
+    for pkg in packages:
+        if pkg.latitude and pkg.longitude:
+            package_data.append({
+                'id': pkg.id,
+                'kargo_id': pkg.kargo_id,
+                'address': pkg.address,
+                'recipient_name': pkg.recipient_name,
+                'delivery_type': pkg.delivery_type.value,
+                'time_window_start': pkg.time_window_start,
+                'time_window_end': pkg.time_window_end,
+                'latitude': pkg.latitude,
+                'longitude': pkg.longitude,
+                'weight': getattr(pkg, 'weight', 1),
+                'volume': getattr(pkg, 'volume', 1),
+                'scheduled_hour': getattr(pkg, 'scheduled_hour', 10)
+            })
+        else:
+            print(f"Warning: Package {pkg.kargo_id} has no coordinates")
+    return package_data
+
+
+def build_route(optimized_result: Dict, depot_location: Dict) -> Dict:
+    """Route dict (depot stop first) from a hybrid optimizer result"""
+    optimized_route = {
+        'stops': [],
+        'total_distance': optimized_result['total_distance_km'],
+        'total_distance_km': optimized_result['total_distance_km'],
+        'estimated_duration': int(optimized_result['total_duration_minutes']),
+        'optimization_metadata': {
+            **optimized_result.get('optimization_metadata', {}),
+            **optimized_result.get('hybrid_metadata', {})
+        },
+        'algorithm_details': optimized_result.get('algorithm_details', {}),
+        'api_used': optimized_result.get('api_used')
+    }
+
+    # Add depot as starting point
+    optimized_route['stops'].append({
+        'id': 0,
+        'kargo_id': 'DEPOT-START',
+        'address': depot_location['address'],
+        'recipient_name': 'Başlangıç Noktası',
+        'delivery_type': 'depot',
+        'latitude': depot_location['latitude'],
+        'longitude': depot_location['longitude'],
+        'sequence': 0,
+        'arrival_time': '08:00',
+        'departure_time': '08:00',
+        'distance_from_previous': 0,
+        'duration_from_previous': 0
+    })
+
+    for stop_data in optimized_result['optimized_stops']:
+        package = stop_data['package']
+        optimized_route['stops'].append({
+            'id': package['id'],
+            'kargo_id': package['kargo_id'],
+            'address': package['address'],
+            'recipient_name': package['recipient_name'],
+            'delivery_type': package['delivery_type'],
+            'latitude': package['latitude'],
+            'longitude': package['longitude'],
+            'sequence': stop_data.get('sequence', len(optimized_route['stops'])),
+            'arrival_time': stop_data.get('arrival_time'),
+            'departure_time': stop_data.get('departure_time'),
+            'estimated_arrival': stop_data.get('arrival_time'),
+            'time_window_start': package.get('time_window_start'),
+            'time_window_end': package.get('time_window_end'),
+            'distance_from_previous': stop_data.get('distance_from_previous_m', 0) / 1000,
+            'duration_from_previous': stop_data.get('duration_from_previous_s', 0) / 60
+        })
+    return optimized_route
+
+
+def save_route(db, courier_id: int, route_date: date, optimized_route: Dict, package_version: str) -> DeliveryRoute:
+    """
+    Store a route (stops go to route_stops, the compressed JSON keeps only
+    metadata) and notify the courier
+
+    A route identical to the courier's latest one for the day is not stored
+    again; the existing row is returned.
+    """
+    route_datetime = datetime.combine(route_date, datetime.min.time())
+    fingerprint = route_fingerprint(optimized_route['stops'])
+    existing = duplicate_of_latest(db, courier_id, route_datetime, fingerprint, package_version)
+    if existing:
+        return existing
+
+    db_route = DeliveryRoute(
+        courier_id=courier_id,
+        route_data_compressed=encode_route_data(
+            {key: value for key, value in optimized_route.items() if key != 'stops'}
+        ),
+        total_distance=optimized_route['total_distance'],
+        estimated_duration=optimized_route['estimated_duration'],
+        route_date=route_datetime,
+        fingerprint=fingerprint,
+        package_set_version=package_version
+    )
+    db.add(db_route)
+    db.flush()  # Assigns db_route.id for the stop rows
+    bulk_insert_route_stops(db, db_route.id, optimized_route['stops'])
+    db.commit()
+
+    # Only channels opened in this process are reached (no-op inside planner workers)
+    event_broker.publish(courier_id, ROUTE_UPDATED, {
+        'route_id': db_route.id,
+        'version': db_route.fingerprint,
+        'route_date': route_date.isoformat(),
+        'total_distance': db_route.total_distance,
+        'estimated_duration': db_route.estimated_duration,
+        'stop_count': len(optimized_route['stops'])
+    })
+    return db_route
+
+
+def latest_route_for_version(db, courier_id: int, route_date: date, package_version: str,
+                             start_lat: float, start_lng: float) -> Optional[DeliveryRoute]:
+    """Newest stored route built from this package set and starting at the given depot"""
+    route = db.query(DeliveryRoute).filter(
+        DeliveryRoute.courier_id == courier_id,
+        DeliveryRoute.route_date == datetime.combine(route_date, datetime.min.time())
+    ).order_by(DeliveryRoute.created_at.desc(), DeliveryRoute.id.desc()).first()
+    if not route or route.package_set_version != package_version:
+        return None
+    depot = db.query(DeliveryRouteStop).filter(
+        DeliveryRouteStop.route_id == route.id, DeliveryRouteStop.sequence == 0
+    ).first()
+    if not depot or abs(depot.latitude - start_lat) > 1e-6 or abs(depot.longitude - start_lng) > 1e-6:
+        return None
+    return route
+
+
+# Planner worker state (one optimizer per worker process)
+_worker_optimizer = None
+
+
+def _init_planner_worker():
+    global _worker_optimizer
+    from database import engine
+    from .hybrid_optimizer import HybridRouteOptimizer
+    engine.dispose(close=False)  # Fresh pool even if the worker was forked; never reuse the parent's connections
+    _worker_optimizer = HybridRouteOptimizer(verbose=False)
+
+
+def _plan_courier(args) -> Dict:
+    """Plan and store one courier's route; skips couriers whose stored route is current"""
+    courier_id, route_date, depot = args
+    from database import SessionLocal
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        packages = route_packages(db, courier_id, route_date)
+        if not packages:
+            return {'courier_id': courier_id, 'status': 'empty'}
+
+        package_version = package_set_version(packages)
+        if latest_route_for_version(db, courier_id, route_date, package_version,
+                                    depot['latitude'], depot['longitude']):
+            return {'courier_id': courier_id, 'status': 'current'}
+
+        package_data = packages_to_optimizer_input(packages)
+        if not package_data:
+            return {'courier_id': courier_id, 'status': 'empty'}
+
+        result = _worker_optimizer.optimize_route(package_data, depot)
+        db_route = save_route(db, courier_id, route_date, build_route(result, depot), package_version)
+        return {
+            'courier_id': courier_id,
+            'status': 'planned',
+            'route_id': db_route.id,
+            'stops': len(package_data),
+            'algorithm': result.get('hybrid_metadata', {}).get('algorithm_used'),
+            'seconds': round(time.perf_counter() - started, 2)
+        }
+    except Exception as e:
+        db.rollback()
+        return {'courier_id': courier_id, 'status': 'failed', 'error': str(e)}
+    finally:
+        db.close()
+
+
+def plan_routes_for_date(route_date: date, workers: int = None, courier_ids: List[int] = None,
+                         depot: Dict = None) -> Dict:
+    """
+    Precompute and store routes for all couriers with packages due on route_date
+
+    Couriers are solved in parallel worker processes; routes still current
+    for the courier's package set are left alone, so re-running is cheap.
+    """
+    from database import SessionLocal
+
+    depot = depot or DEFAULT_DEPOT
+    workers = workers or settings.BATCH_PLANNING_WORKERS
+    db = SessionLocal()
+    try:
+        if courier_ids is None:
+            courier_ids = [row[0] for row in db.query(Package.courier_id).filter(
+                Package.status.in_([PackageStatus.PENDING, PackageStatus.IN_TRANSIT]),
+                or_(Package.delivery_date.is_(None), Package.delivery_date == route_date)
+            ).distinct().all()]
+    finally:
+        db.close()
+
+    started = time.perf_counter()
+    print(f"🗓️ Batch planning {len(courier_ids)} couriers for {route_date} on {workers} workers...")
+    if not courier_ids:
+        results = []
+    else:
+        # Spawned, not forked: the server process holds gRPC channels and pooled
+        # database connections that must not be shared with children
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_planner_worker,
+                                 mp_context=multiprocessing.get_context('spawn')) as pool:
+            results = list(pool.map(_plan_courier, [(courier_id, route_date, depot) for courier_id in courier_ids]))
+
+    summary = {'route_date': route_date.isoformat(), 'couriers': len(courier_ids)}
+    for state in ('planned', 'current', 'empty', 'failed'):
+        summary[state] = sum(1 for result in results if result['status'] == state)
+    summary['seconds'] = round(time.perf_counter() - started, 2)
+    for result in results:
+        if result['status'] == 'failed':
+            logger.warning(f"⚠️ Planning failed for courier {result['courier_id']}: {result['error']}")
+    print(f"✅ Batch planning done: {summary}")
+    return {'summary': summary, 'results': results}
+
+
+def _next_run(now: datetime, run_at: str) -> datetime:
+    hour, minute = (int(part) for part in run_at.split(':'))
+    candidate = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    return candidate if candidate > now else candidate + timedelta(days=1)
+
+
+async def run_scheduled_planning():
+    """Background job: every day at BATCH_PLANNING_TIME, plan the next day's routes"""
+    if not settings.BATCH_PLANNING_TIME:
+        return
+    loop = asyncio.get_running_loop()
+    while True:
+        next_run = _next_run(datetime.now(), settings.BATCH_PLANNING_TIME)
+        print(f"🗓️ Next batch planning run at {next_run:%Y-%m-%d %H:%M}")
+        await asyncio.sleep((next_run - datetime.now()).total_seconds())
+        target = (datetime.now() + timedelta(days=1)).date()
+        try:
+            await loop.run_in_executor(None, plan_routes_for_date, target)
+        except Exception as e:
+            logger.error(f"❌ Scheduled batch planning failed: {e}")
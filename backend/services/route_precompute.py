@@ -0,0 +1,182 @@
+"""
+Speculative Route Precomputation
+Plans a courier's route for today in the background right after login and
+after (debounced) package scans, so the first /api/routes/ call is served
+from the stored route instead of waiting on a solve. Edits, status changes
+and deletions re-solve the route in the repair lane, ahead of full plans
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Dict, Optional
+
+from config import settings
+from .route_planner import (
+    DEFAULT_DEPOT, route_packages, packages_to_optimizer_input, build_route, save_route, latest_route_for_version
+)
+from .route_versioning import package_set_version
+from .admission_control import optimizer_admission, AdmissionRejected, LANES, LANE_BACKGROUND
+from .cancellation import optimization_registry, OptimizationCancelled
+
+logger = logging.getLogger(__name__)
+
+
+class RoutePrecomputer:
+    """
+    Low-priority, cancellable background planner
+
+    Work runs on a small dedicated pool so it never takes the request
+    threadpool. A new trigger for a courier replaces a pending (not yet
+    started) one, which is how a burst of scans collapses into one solve.
+    """
+
+    def __init__(self, enabled: bool = True, debounce_s: float = 3.0, max_workers: int = 1):
+        self.enabled = enabled
+        self.debounce_s = debounce_s
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="route-precompute")
+        self._pending: Dict[int, asyncio.TimerHandle] = {}
+        self._pending_lanes: Dict[int, str] = {}
+        self._inflight: Dict[int, asyncio.Future] = {}
+        self._solving = set()  # Couriers whose precompute holds an optimizer slot
+        self._optimizer = None
+        self._optimizer_lock = threading.Lock()
+        self.stats = {
+            'scheduled': 0, 'superseded': 0, 'cancelled': 0, 'rejected': 0, 'planned': 0, 'current': 0, 'failed': 0
+        }
+
+    def schedule(self, courier_id: int, delay_s: Optional[float] = None, lane: str = LANE_BACKGROUND):
+        """
+        Plan the courier's route after delay_s (default: debounce window) in
+        the given admission lane; call from the event loop. Collapsed triggers
+        keep the highest-priority lane among them.
+        """
+        if not self.enabled:
+            return
+        loop = asyncio.get_running_loop()
+        previous = self._pending.pop(courier_id, None)
+        if previous:
+            previous.cancel()
+            self.stats['superseded'] += 1
+            lane = min(lane, self._pending_lanes.get(courier_id, lane), key=LANES.index)
+        delay = self.debounce_s if delay_s is None else delay_s
+        self._pending_lanes[courier_id] = lane
+        self._pending[courier_id] = loop.call_later(delay, self._start, courier_id, loop)
+        self.stats['scheduled'] += 1
+
+    def cancel(self, courier_id: int) -> bool:
+        """Drop a pending precompute; a running solve is stopped through optimization_registry"""
+        handle = self._pending.pop(courier_id, None)
+        self._pending_lanes.pop(courier_id, None)
+        if handle:
+            handle.cancel()
+            self.stats['cancelled'] += 1
+        return handle is not None
+
+    async def wait(self, courier_id: int, timeout_s: float) -> bool:
+        """
+        Wait for an in-flight precompute of this courier; True if one finished
+        in time. A precompute still queued for an optimizer slot is cancelled
+        instead, since the caller would get an interactive slot sooner.
+        """
+        future = self._inflight.get(courier_id)
+        if future is None:
+            return False
+        if courier_id not in self._solving:
+            future.cancel()
+            self.stats['cancelled'] += 1
+            return False
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=timeout_s)
+            return True
+        except Exception:
+            return False
+
+    def _start(self, courier_id: int, loop: asyncio.AbstractEventLoop):
+        self._pending.pop(courier_id, None)
+        if courier_id in self._inflight:
+            # Still solving for an earlier trigger; try again once the window passes
+            self._pending[courier_id] = loop.call_later(self.debounce_s, self._start, courier_id, loop)
+            return
+        lane = self._pending_lanes.pop(courier_id, LANE_BACKGROUND)
+        task = loop.create_task(self._run(courier_id, lane))
+        self._inflight[courier_id] = task
+        task.add_done_callback(lambda _: self._inflight.pop(courier_id, None))
+
+    async def _run(self, courier_id: int, lane: str = LANE_BACKGROUND) -> str:
+        """Solve once admitted to the lane"""
+        try:
+            ticket = await optimizer_admission.acquire(courier_id, lane=lane)
+        except AdmissionRejected:
+            self.stats['rejected'] += 1
+            return 'rejected'
+        self._solving.add(courier_id)
+        cancel_token = optimization_registry.register(courier_id)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.executor, self._precompute, courier_id, date.today(), cancel_token
+            )
+        finally:
+            optimization_registry.unregister(courier_id, cancel_token)
+            self._solving.discard(courier_id)
+            optimizer_admission.release(ticket)
+
+    def _get_optimizer(self):
+        with self._optimizer_lock:
+            if self._optimizer is None:
+                from .hybrid_optimizer import HybridRouteOptimizer
+                self._optimizer = HybridRouteOptimizer(verbose=False)
+            return self._optimizer
+
+    def _precompute(self, courier_id: int, route_date: date, cancel_token=None) -> str:
+        from database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            packages = route_packages(db, courier_id, route_date)
+            package_version = package_set_version(packages)
+            if not packages or latest_route_for_version(
+                db, courier_id, route_date, package_version, DEFAULT_DEPOT['latitude'], DEFAULT_DEPOT['longitude']
+            ):
+                self.stats['current'] += 1
+                return 'current'
+            package_data = packages_to_optimizer_input(packages)
+            if not package_data:
+                self.stats['current'] += 1
+                return 'current'
+
+            result = self._get_optimizer().optimize_route(package_data, DEFAULT_DEPOT, cancel_token=cancel_token)
+            save_route(db, courier_id, route_date, build_route(result, DEFAULT_DEPOT), package_version)
+            self.stats['planned'] += 1
+            logger.info(f"🔮 Precomputed route for courier {courier_id} ({len(package_data)} stops)")
+            return 'planned'
+        except OptimizationCancelled:
+            self.stats['cancelled'] += 1
+            logger.info(f"🛑 Route precompute cancelled for courier {courier_id}")
+            return 'cancelled'
+        except Exception as e:
+            db.rollback()
+            self.stats['failed'] += 1
+            logger.warning(f"⚠️ Route precompute failed for courier {courier_id}: {e}")
+            return 'failed'
+        finally:
+            db.close()
+
+    def status(self) -> Dict:
+        return {
+            'enabled': self.enabled,
+            'pending': len(self._pending),
+            'in_flight': len(self._inflight),
+            **self.stats
+        }
+
+
+# Global instance
+route_precomputer = RoutePrecomputer(
+    enabled=settings.PRECOMPUTE_ENABLED,
+    debounce_s=settings.PRECOMPUTE_DEBOUNCE_S,
+    max_workers=settings.PRECOMPUTE_MAX_WORKERS
+)
@@ -0,0 +1,117 @@
+"""
+Route Snapshot Storage
+Compressed encoding of the stored route JSON (zstd when installed, zlib
+otherwise) and retention of the last N route versions per courier per day
+"""
+
+import asyncio
+import json
+import logging
+import zlib
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import func
+
+from config import settings
+from models.delivery_route import DeliveryRoute
+from models.route_stop import DeliveryRouteStop
+
+# Try to import zstandard, fallback to zlib if not available
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'  # Every zstd frame starts with this; zlib streams never do
+
+
+def encode_route_data(route_data: Dict) -> bytes:
+    """Compact JSON, zstd- or zlib-compressed"""
+    raw = json.dumps(route_data, separators=(',', ':')).encode('utf-8')
+    if ZSTD_AVAILABLE:
+        return zstandard.ZstdCompressor(level=settings.ROUTE_SNAPSHOT_ZSTD_LEVEL).compress(raw)
+    return zlib.compress(raw, settings.ROUTE_SNAPSHOT_ZLIB_LEVEL)
+
+
+def decode_route_data(blob: bytes) -> Dict:
+    if blob[:4] == ZSTD_MAGIC:
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("Route snapshot is zstd-compressed but zstandard is not installed")
+        raw = zstandard.ZstdDecompressor().decompress(blob)
+    else:
+        raw = zlib.decompress(blob)
+    return json.loads(raw)
+
+
+def load_route_data(route: DeliveryRoute) -> Dict:
+    """Route JSON of a stored route (compressed snapshot, or the legacy text column)"""
+    if route.route_data_compressed:
+        return decode_route_data(route.route_data_compressed)
+    return json.loads(route.route_data) if route.route_data else {}
+
+
+def duplicate_of_latest(db, courier_id: int, route_date: datetime, fingerprint: str,
+                        package_version: str) -> Optional[DeliveryRoute]:
+    """The courier's latest route for the day if it is the same route (same fingerprint and package set)"""
+    latest = db.query(DeliveryRoute).filter(
+        DeliveryRoute.courier_id == courier_id,
+        DeliveryRoute.route_date == route_date
+    ).order_by(DeliveryRoute.created_at.desc(), DeliveryRoute.id.desc()).first()
+    if latest and latest.fingerprint == fingerprint and latest.package_set_version == package_version:
+        return latest
+    return None
+
+
+def prune_route_snapshots(db, keep: int = None, courier_id: int = None) -> int:
+    """
+    Delete all but the newest `keep` routes per courier per route date
+
+    Stops are deleted explicitly (SQLite does not enforce the cascade).
+    Returns the number of routes deleted.
+    """
+    keep = keep or settings.ROUTE_SNAPSHOT_KEEP_VERSIONS
+    rank = func.row_number().over(
+        partition_by=(DeliveryRoute.courier_id, DeliveryRoute.route_date),
+        order_by=(DeliveryRoute.created_at.desc(), DeliveryRoute.id.desc())
+    ).label('rank')
+    ranked = db.query(DeliveryRoute.id.label('id'), rank)
+    if courier_id is not None:
+        ranked = ranked.filter(DeliveryRoute.courier_id == courier_id)
+    ranked = ranked.subquery()
+    expired_ids = [row[0] for row in db.query(ranked.c.id).filter(ranked.c.rank > keep).all()]
+
+    for start in range(0, len(expired_ids), 500):
+        batch = expired_ids[start:start + 500]
+        db.query(DeliveryRouteStop).filter(DeliveryRouteStop.route_id.in_(batch)).delete(synchronize_session=False)
+        db.query(DeliveryRoute).filter(DeliveryRoute.id.in_(batch)).delete(synchronize_session=False)
+    db.commit()
+    return len(expired_ids)
+
+
+async def run_snapshot_retention():
+    """Background job (opt-in): prune old route versions every ROUTE_SNAPSHOT_RETENTION_INTERVAL_S"""
+    from database import SessionLocal
+
+    def prune() -> int:
+        db = SessionLocal()
+        try:
+            return prune_route_snapshots(db)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            deleted = await loop.run_in_executor(None, prune)
+            if deleted:
+                logger.info(f"🧹 Pruned {deleted} old route versions")
+        except Exception as e:
+            logger.error(f"❌ Route snapshot retention failed: {e}")
+        await asyncio.sleep(settings.ROUTE_SNAPSHOT_RETENTION_INTERVAL_S)
@@ -0,0 +1,118 @@
+"""
+Route Versioning
+Package-set versions, route fingerprints and strong ETags for conditional
+GETs, plus the stop diff between two stored routes
+"""
+
+import bisect
+import hashlib
+import json
+from typing import List, Dict, Optional
+
+
+def _digest(payload) -> str:
+    encoded = json.dumps(payload, separators=(',', ':'), default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:32]
+
+
+def package_set_version(packages) -> str:
+    """
+    Version of a courier's package set: changes whenever a package is added,
+    removed, or has a field the optimizer or the client list depends on edited
+    """
+    rows = sorted(
+        (
+            package.id,
+            package.status.value if package.status else None,
+            package.delivery_type.value if package.delivery_type else None,
+            package.latitude,
+            package.longitude,
+            package.time_window_start,
+            package.time_window_end,
+            package.address,
+            package.recipient_name,
+            package.updated_at.isoformat() if package.updated_at else None
+        )
+        for package in packages
+    )
+    return _digest(rows)
+
+
+def route_fingerprint(stops: List[Dict]) -> str:
+    """Fingerprint of a route's visiting order, stop positions and ETAs"""
+    return _digest([
+        (
+            stop.get('id') or 0,
+            round(stop.get('latitude') or 0.0, 6),
+            round(stop.get('longitude') or 0.0, 6),
+            stop.get('estimated_arrival') or stop.get('arrival_time')
+        )
+        for stop in stops
+    ])
+
+
+def strong_etag(*parts) -> str:
+    """Quoted strong entity tag over the given version parts"""
+    return f'"{_digest(parts)}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match evaluation (weak comparison, as RFC 9110 prescribes for it)"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    if '*' in candidates:
+        return True
+    bare = etag[2:] if etag.startswith('W/') else etag
+    return any((tag[2:] if tag.startswith('W/') else tag) == bare for tag in candidates)
+
+
+def _longest_increasing_run(values: List[int]) -> set:
+    """Indexes of one longest strictly increasing subsequence (patience sorting)"""
+    tails, tail_indexes, previous = [], [], [None] * len(values)
+    for index, value in enumerate(values):
+        position = bisect.bisect_left(tails, value)
+        if position == len(tails):
+            tails.append(value)
+            tail_indexes.append(index)
+        else:
+            tails[position] = value
+            tail_indexes[position] = index
+        previous[index] = tail_indexes[position - 1] if position else None
+    kept = set()
+    index = tail_indexes[-1] if tail_indexes else None
+    while index is not None:
+        kept.add(index)
+        index = previous[index]
+    return kept
+
+
+def diff_stops(old_stops: List[Dict], new_stops: List[Dict]) -> Dict:
+    """
+    Stops added, removed or moved between two routes, keyed by package id
+
+    Stops are dicts with package_id and sequence. A stop counts as moved only
+    if its order relative to the other surviving stops changed (the minimal
+    set, via a longest increasing subsequence), so one insertion does not
+    report every later stop. Moved entries carry the new position and ETA so
+    a client can patch its cached copy in place.
+    """
+    old_by_package = {stop['package_id']: stop for stop in old_stops}
+    new_by_package = {stop['package_id']: stop for stop in new_stops}
+
+    added = [stop for stop in new_stops if stop['package_id'] not in old_by_package]
+    removed = [stop['package_id'] for stop in old_stops if stop['package_id'] not in new_by_package]
+
+    common = [stop for stop in new_stops if stop['package_id'] in old_by_package]
+    in_order = _longest_increasing_run([old_by_package[stop['package_id']]['sequence'] for stop in common])
+    moved = [
+        {
+            'package_id': stop['package_id'],
+            'from_sequence': old_by_package[stop['package_id']]['sequence'],
+            'to_sequence': stop['sequence'],
+            'estimated_arrival': stop.get('estimated_arrival')
+        }
+        for index, stop in enumerate(common)
+        if index not in in_order
+    ]
+    return {'added': added, 'removed': removed, 'moved': moved}
@@ -0,0 +1,77 @@
+"""
+Fleet Routing retry loop: a cancel must hand the circuit breaker slot back,
+including one that arrives during the retry backoff
+"""
+
+import asyncio
+
+import pytest
+
+google_exceptions = pytest.importorskip("google.api_core.exceptions")
+
+from services import google_cloud_optimizer
+from services.circuit_breaker import CircuitBreaker, OPEN, HALF_OPEN
+from services.google_cloud_optimizer import GoogleCloudRouteOptimizer
+
+
+class UnavailableClient:
+    """Async Fleet Routing client whose every call fails with a retryable error"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def optimize_tours(self, request=None, timeout=None, retry=None):
+        self.calls += 1
+        raise google_exceptions.ServiceUnavailable("backend unavailable")
+
+
+def half_open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker('test', open_duration_s=0)
+    with breaker._lock:
+        breaker._transition(OPEN)
+    assert breaker.state == HALF_OPEN
+    return breaker
+
+
+def test_cancel_during_backoff_releases_half_open_slot(monkeypatch):
+    breaker = half_open_breaker()
+    client = UnavailableClient()
+    monkeypatch.setattr(google_cloud_optimizer, 'fleet_routing_breaker', breaker)
+    monkeypatch.setattr(google_cloud_optimizer, 'get_shared_async_client', lambda: client)
+
+    optimizer = GoogleCloudRouteOptimizer.__new__(GoogleCloudRouteOptimizer)
+    optimizer.max_retries = 3
+    monkeypatch.setattr(optimizer, '_retry_delay', lambda attempt: 5.0)
+
+    async def cancel_in_backoff():
+        task = asyncio.create_task(optimizer._optimize_tours_with_retry_async(request=None, deadline_s=30))
+        await asyncio.sleep(0.05)  # First call failed, now sleeping before the retry
+        assert client.calls == 1
+        assert breaker._half_open_in_flight == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_in_backoff())
+
+    assert breaker._half_open_in_flight == 0
+    assert breaker.state == HALF_OPEN
+    assert breaker.acquire()  # The trial slot is usable again
+
+
+def test_exhausted_retries_open_the_circuit(monkeypatch):
+    breaker = half_open_breaker()
+    client = UnavailableClient()
+    monkeypatch.setattr(google_cloud_optimizer, 'fleet_routing_breaker', breaker)
+    monkeypatch.setattr(google_cloud_optimizer, 'get_shared_async_client', lambda: client)
+
+    optimizer = GoogleCloudRouteOptimizer.__new__(GoogleCloudRouteOptimizer)
+    optimizer.max_retries = 1
+    monkeypatch.setattr(optimizer, '_retry_delay', lambda attempt: 0.01)
+
+    with pytest.raises(google_exceptions.ServiceUnavailable):
+        asyncio.run(optimizer._optimize_tours_with_retry_async(request=None, deadline_s=30))
+
+    assert client.calls == 2
+    assert breaker._half_open_in_flight == 0
+    assert breaker._state == OPEN
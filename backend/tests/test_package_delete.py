@@ -0,0 +1,77 @@
+"""
+Deleting a package that appears in a stored route must not trip the
+route_stops foreign key, also on tables created before it was SET NULL
+"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models import courier, package, delivery_route, route_stop
+from models.courier import Courier
+from models.delivery_route import DeliveryRoute
+from models.package import Package, DeliveryType
+from models.route_stop import DeliveryRouteStop, bulk_insert_route_stops
+from routers import packages
+
+
+def enforcing_engine(legacy_route_stops: bool):
+    """In-memory SQLite with foreign keys enforced, as PostgreSQL does"""
+    engine = create_engine("sqlite://")
+
+    @event.listens_for(engine, "connect")
+    def enable_foreign_keys(connection, record):
+        connection.execute("PRAGMA foreign_keys=ON")
+
+    Base.metadata.create_all(bind=engine)
+    if legacy_route_stops:
+        # route_stops as first deployed: packages.id foreign key without ON DELETE
+        with engine.begin() as connection:
+            connection.execute(text("DROP TABLE route_stops"))
+            connection.execute(text(
+                "CREATE TABLE route_stops ("
+                "id INTEGER PRIMARY KEY, "
+                "route_id INTEGER NOT NULL REFERENCES delivery_routes(id) ON DELETE CASCADE, "
+                "sequence INTEGER NOT NULL, "
+                "package_id INTEGER REFERENCES packages(id), "
+                "kargo_id VARCHAR, address VARCHAR, recipient_name VARCHAR, delivery_type VARCHAR, "
+                "time_window_start VARCHAR, time_window_end VARCHAR, latitude FLOAT, longitude FLOAT, "
+                "eta VARCHAR, leg_distance_km FLOAT, leg_duration_min FLOAT)"
+            ))
+    return engine
+
+
+@pytest.mark.parametrize("legacy_route_stops", [False, True])
+def test_delete_package_in_stored_route(legacy_route_stops):
+    db = sessionmaker(bind=enforcing_engine(legacy_route_stops))()
+    owner = Courier(email="kurye@example.com", hashed_password="x", full_name="Kurye")
+    db.add(owner)
+    db.flush()
+    parcel = Package(
+        kargo_id="KRG-1", courier_id=owner.id, recipient_name="Alıcı",
+        address="Kadıköy, İstanbul", delivery_type=DeliveryType.STANDARD,
+        latitude=40.99, longitude=29.03
+    )
+    db.add(parcel)
+    db.flush()
+    route = DeliveryRoute(courier_id=owner.id, route_date=datetime(2026, 1, 5))
+    db.add(route)
+    db.flush()
+    bulk_insert_route_stops(db, route.id, [
+        {'delivery_type': 'depot', 'address': 'Depo'},
+        {'id': parcel.id, 'kargo_id': parcel.kargo_id, 'address': parcel.address, 'delivery_type': 'standard'},
+    ])
+    db.commit()
+
+    result = asyncio.run(packages.delete_package(parcel.id, current_user=owner, db=db))
+
+    assert result == {"message": "Package deleted successfully"}
+    assert db.query(Package).count() == 0
+    stop = db.query(DeliveryRouteStop).filter(DeliveryRouteStop.sequence == 1).one()
+    assert stop.package_id is None
+    assert stop.kargo_id == "KRG-1"
+    db.close()
@@ -0,0 +1,93 @@
+"""
+Cancelling a route request while it waits for an optimizer slot must not
+leak the slot, even when the slot is granted during the disconnect check,
+and a cancelled solve must not carry on in its fallback paths
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from routers import routes
+from services.admission_control import AdmissionController
+from services.cancellation import CancellationToken, OptimizationCancelled
+from services.route_optimizer import RouteOptimizer
+
+
+class SlowDisconnectRequest:
+    """Disconnect check that yields long enough for a queued acquire to be granted"""
+
+    async def is_disconnected(self):
+        await asyncio.sleep(0.2)
+        return True
+
+
+def test_slot_granted_during_disconnect_check_is_released(monkeypatch):
+    monkeypatch.setattr(routes.settings, 'OPTIMIZER_DISCONNECT_POLL_S', 0.05)
+    admission = AdmissionController(max_concurrent=1, max_queue=10, max_queued_per_courier=5, max_wait_s=30)
+    outcome = {}
+
+    async def disconnect_while_queued():
+        holder = await admission.acquire(1)
+        # The holder finishes while the waiting request is inside is_disconnected()
+        asyncio.get_running_loop().call_later(0.1, admission.release, holder)
+        try:
+            await routes._until_cancelled(
+                admission.acquire(2), SlowDisconnectRequest(), CancellationToken(),
+                on_abandoned=admission.release
+            )
+        except OptimizationCancelled as e:
+            outcome['reason'] = str(e)
+        await asyncio.sleep(0.05)
+
+    asyncio.run(disconnect_while_queued())
+
+    assert outcome['reason'] == 'client disconnected'
+    assert admission.active == 0
+    assert admission.queued == 0
+
+
+def test_explicit_cancel_stops_the_awaited_task(monkeypatch):
+    monkeypatch.setattr(routes.settings, 'OPTIMIZER_DISCONNECT_POLL_S', 0.05)
+
+    class ConnectedRequest:
+        async def is_disconnected(self):
+            return False
+
+    async def cancel_midway():
+        token = CancellationToken()
+        work = asyncio.ensure_future(asyncio.sleep(10))
+        asyncio.get_running_loop().call_later(0.1, token.cancel, 'cancelled by client')
+        try:
+            await routes._until_cancelled(work, ConnectedRequest(), token)
+        except OptimizationCancelled as e:
+            await asyncio.sleep(0)
+            return str(e), work.cancelled()
+
+    assert asyncio.run(cancel_midway()) == ('cancelled by client', True)
+
+
+def test_cancel_during_failed_strategy_skips_fallback_search(monkeypatch):
+    optimizer = RouteOptimizer(verbose=False)
+    token = CancellationToken()
+
+    def failing_strategy(*args, **kwargs):
+        token.cancel('client disconnected')
+        raise ValueError('clustering failed')
+
+    def unexpected_fallback(*args, **kwargs):
+        raise AssertionError('simple fallback ran for a cancelled request')
+
+    monkeypatch.setattr(optimizer, 'hybrid_smart_optimization', failing_strategy)
+    monkeypatch.setattr(optimizer, 'fallback_optimization', unexpected_fallback)
+    packages = [
+        {'id': i, 'kargo_id': f'KRG-{i}', 'delivery_type': 'standard',
+         'latitude': 40.98 + i * 0.01, 'longitude': 29.02 + i * 0.01}
+        for i in range(1, 6)
+    ]
+
+    started = time.perf_counter()
+    with pytest.raises(OptimizationCancelled, match='client disconnected'):
+        optimizer.optimize_route(packages, time_limit_s=30, cancel_token=token)
+    assert time.perf_counter() - started < 5
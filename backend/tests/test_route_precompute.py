@@ -0,0 +1,47 @@
+"""
+Precompute triggers from package edits are admitted in the repair lane,
+ahead of full daily plans, and keep that lane when collapsed with scans
+"""
+
+import asyncio
+
+from services import route_precompute
+from services.admission_control import AdmissionRejected, LANE_BACKGROUND, LANE_REPAIR
+from services.route_precompute import RoutePrecomputer
+
+
+class RecordingAdmission:
+    """Records the requested lane and rejects, so no solve runs"""
+
+    def __init__(self):
+        self.lanes = []
+
+    async def acquire(self, courier_id, lane=None):
+        self.lanes.append(lane)
+        raise AdmissionRejected('test', 1.0)
+
+
+def run_triggers(monkeypatch, *lanes):
+    admission = RecordingAdmission()
+    monkeypatch.setattr(route_precompute, 'optimizer_admission', admission)
+    precomputer = RoutePrecomputer(debounce_s=0.01)
+
+    async def trigger():
+        for lane in lanes:
+            precomputer.schedule(7, lane=lane)
+        await asyncio.sleep(0.1)
+
+    asyncio.run(trigger())
+    return admission.lanes, precomputer.stats
+
+
+def test_scan_is_planned_in_background_lane(monkeypatch):
+    lanes, stats = run_triggers(monkeypatch, LANE_BACKGROUND)
+    assert lanes == [LANE_BACKGROUND]
+    assert stats['rejected'] == 1
+
+
+def test_collapsed_triggers_keep_repair_lane(monkeypatch):
+    lanes, stats = run_triggers(monkeypatch, LANE_REPAIR, LANE_BACKGROUND)
+    assert lanes == [LANE_REPAIR]
+    assert stats['superseded'] == 1